@@ -14,7 +14,12 @@ from nowcasting_datamodel.read.read import update_latest_input_data_last_updated
 
 import satip
 from satip import utils
+from satip.compression import CODECS, SHUFFLES, set_output_compression
+from satip.daily_store import get_daily_store, set_daily_store_dir
 from satip.eumetsat import EUMETSATDownloadManager
+from satip.geospatial import set_osgb_grid_cache_dir
+from satip.manifest import Manifest
+from satip.pipeline import run_pipeline
 
 log = structlog.stdlib.get_logger()
 
@@ -97,6 +102,104 @@ log = structlog.stdlib.get_logger()
     help="Set the maximum number of dataset to load, default gets them all",
     type=click.INT,
 )
+@click.option(
+    "--download-concurrency",
+    envvar="DOWNLOAD_CONCURRENCY",
+    default=1,
+    help="Number of RSS datasets, or Data Tailor outputs with the backup, to download in parallel",
+    type=click.INT,
+)
+@click.option(
+    "--catalogue-cache-path",
+    envvar="CATALOGUE_CACHE_PATH",
+    default=None,
+    help="Local SQLite file to cache EUMETSAT catalogue searches in, defaults to no caching",
+    type=click.STRING,
+)
+@click.option(
+    "--use-async-download",
+    envvar="USE_ASYNC_DOWNLOAD",
+    default=False,
+    help="Download RSS datasets with the asyncio engine, using --download-concurrency",
+    type=click.BOOL,
+)
+@click.option(
+    "--osgb-cache-dir",
+    envvar="OSGB_CACHE_DIR",
+    default=None,
+    help="Local directory to cache the OSGB coordinates of the cropped areas in",
+    type=click.STRING,
+)
+@click.option(
+    "--conversion-workers",
+    envvar="CONVERSION_WORKERS",
+    default=1,
+    help="Number of native files converted to zarr in parallel, also used by --use-pipeline",
+    type=click.INT,
+)
+@click.option(
+    "--conversion-worker-memory-mb",
+    envvar="CONVERSION_WORKER_MEMORY_MB",
+    default=None,
+    help="Maximum memory of each conversion process in MB",
+    type=click.INT,
+)
+@click.option(
+    "--use-pipeline",
+    envvar="USE_PIPELINE",
+    default=False,
+    help="Convert and upload each dataset as soon as it is downloaded",
+    type=click.BOOL,
+)
+@click.option(
+    "--incremental-collation",
+    envvar="INCREMENTAL_COLLATION",
+    default=False,
+    help="Append new timesteps to appendable latest zarr stores instead of rewriting the zips",
+    type=click.BOOL,
+)
+@click.option(
+    "--use-manifest",
+    envvar="USE_MANIFEST",
+    default=False,
+    help="Check which timesteps are saved in a manifest file instead of listing save_dir",
+    type=click.BOOL,
+)
+@click.option(
+    "--daily-store-dir",
+    envvar="DAILY_STORE_DIR",
+    default=None,
+    help="Write the data into daily Zarr stores in this directory, instead of zarr.zip files",
+    type=click.STRING,
+)
+@click.option(
+    "--daily-store-retention-days",
+    envvar="DAILY_STORE_RETENTION_DAYS",
+    default=2,
+    help="Number of days of daily Zarr stores to keep",
+    type=click.INT,
+)
+@click.option(
+    "--compression-codec",
+    envvar="COMPRESSION_CODEC",
+    default="default",
+    help="Compressor of the saved zarr files, zarr's default one by default",
+    type=click.Choice(CODECS),
+)
+@click.option(
+    "--compression-level",
+    envvar="COMPRESSION_LEVEL",
+    default=5,
+    help="Compression level of the saved zarr files, from 1 to 9",
+    type=click.IntRange(1, 9),
+)
+@click.option(
+    "--compression-shuffle",
+    envvar="COMPRESSION_SHUFFLE",
+    default="byte",
+    help="Shuffle filter of the blosc compressors of the saved zarr files",
+    type=click.Choice(list(SHUFFLES)),
+)
 def run(
     api_key,
     api_secret,
@@ -109,6 +212,20 @@ def run(
     cleanup: bool = False,
     use_backup: bool = False,
     maximum_n_datasets: int = -1,
+    download_concurrency: int = 1,
+    catalogue_cache_path: Optional[str] = None,
+    use_async_download: bool = False,
+    osgb_cache_dir: Optional[str] = None,
+    conversion_workers: int = 1,
+    conversion_worker_memory_mb: Optional[int] = None,
+    use_pipeline: bool = False,
+    incremental_collation: bool = False,
+    use_manifest: bool = False,
+    daily_store_dir: Optional[str] = None,
+    daily_store_retention_days: int = 2,
+    compression_codec: str = "default",
+    compression_level: int = 5,
+    compression_shuffle: str = "byte",
 ):
     """Run main application
 
@@ -124,9 +241,36 @@ def run(
         cleanup: Cleanup Data Tailor
         use_backup: use 15 min data, not RSS
         maximum_n_datasets: Set the maximum number of dataset to load, default gets them all
+        download_concurrency: Number of RSS datasets to download in parallel, or of Data
+            Tailor outputs when using the backup, whose customisations always use all the
+            3 Data Tailor slots
+        catalogue_cache_path: Local file to cache catalogue searches in
+        use_async_download: Download RSS datasets with the asyncio engine
+        osgb_cache_dir: Local directory to cache the OSGB coordinates of the cropped areas in
+        conversion_workers: Number of native files converted to zarr in parallel processes,
+            or in parallel threads of the pipeline when using `use_pipeline`
+        conversion_worker_memory_mb: Maximum memory of each conversion process in MB
+        use_pipeline: Convert and upload each dataset as soon as it is downloaded, with
+            the download, conversion and upload stages running concurrently
+        incremental_collation: Append only the new timesteps to the appendable
+            `latest.zarr` and `hrv_latest.zarr` stores, instead of rewriting the whole
+            `latest.zarr.zip` and `hrv_latest.zarr.zip` files
+        use_manifest: Check which timesteps are already saved in the manifest of save_dir,
+            loaded once, instead of listing save_dir for every check
+        daily_store_dir: Write each timestep into its slot of daily Zarr stores in this
+            directory, instead of saving zarr.zip files in save_dir, moving them around
+            and collating them into the latest files
+        daily_store_retention_days: Number of days of daily Zarr stores to keep
+        compression_codec: Compressor of the saved zarr files, one of "default", "blosc2",
+            "zstd", "lz4" and "bz2"
+        compression_level: Compression level of the saved zarr files
+        compression_shuffle: Shuffle filter of the blosc compressors, "none", "byte" or "bit"
     """
 
     utils.setupLogging()
+    set_osgb_grid_cache_dir(osgb_cache_dir)
+    set_daily_store_dir(daily_store_dir)
+    set_output_compression(compression_codec, compression_level, compression_shuffle)
 
     try:
         if save_dir != "./":
@@ -151,6 +295,9 @@ def run(
                 user_secret=api_secret,
                 data_dir=tmpdir,
                 native_file_dir=save_dir_native,
+                catalogue_cache_path=catalogue_cache_path,
+                # Older windows are out of the history searched by the next runs
+                catalogue_cache_retention=pd.Timedelta(history),
             )
             if cleanup:
                 log.debug("Running Data Tailor Cleanup", memory=utils.get_memory())
@@ -179,7 +326,15 @@ def run(
                 use_backup = True
             # Filter out ones that already exist
             # if both final files don't exist, then we should make sure we run the whole process
-            datasets = utils.filter_dataset_ids_on_current_files(datasets, save_dir)
+            daily_store, manifest = None, None
+            if daily_store_dir is not None:
+                # The written timesteps are read from the daily stores
+                daily_store = get_daily_store(hrv=False, using_backup=use_backup)
+            elif use_manifest:
+                manifest = Manifest.load(save_dir)
+            datasets = utils.filter_dataset_ids_on_current_files(
+                datasets, save_dir, manifest=manifest, daily_store=daily_store
+            )
             log.info(
                 f"Files to download after filtering: {len(datasets)}", memory=utils.get_memory()
             )
@@ -196,54 +351,104 @@ def run(
                     datasets = datasets[0:maximum_n_datasets]
                 random.shuffle(datasets)  # Shuffle so subsequent runs might download different data
                 updated_data = True
-                if use_backup:
-                    # Check before downloading each tailored dataset, as it can take awhile
-                    for dset in datasets:
-                        dset = utils.filter_dataset_ids_on_current_files([dset], save_dir)
-                        if len(dset) > 0:
-                            download_manager.download_tailored_datasets(
-                                dset,
-                                product_id="EO:EUM:DAT:MSG:HRSEVIRI",
-                            )
+                if use_pipeline:
+                    # Convert and upload each file as soon as it is downloaded
+                    saved_files = run_pipeline(
+                        download_manager,
+                        datasets,
+                        save_dir=save_dir,
+                        product_id=(
+                            "EO:EUM:DAT:MSG:HRSEVIRI" if use_backup else "EO:EUM:DAT:MSG:MSG15-RSS"
+                        ),
+                        use_rescaler=use_rescaler,
+                        download_concurrency=download_concurrency,
+                        conversion_workers=conversion_workers,
+                        use_daily_stores=daily_store is not None,
+                    )
                 else:
-                    # Check before downloading each tailored dataset, as it can take awhile
-                    for dset in datasets:
-                        dset = utils.filter_dataset_ids_on_current_files([dset], save_dir)
-                        if len(dset) > 0:
-                            download_manager.download_datasets(
-                                dset,
-                                product_id="EO:EUM:DAT:MSG:MSG15-RSS",
+                    if use_backup:
+                        # Keep all the Data Tailor slots busy with the queued datasets
+                        download_manager.download_tailored_datasets(
+                            datasets,
+                            product_id="EO:EUM:DAT:MSG:HRSEVIRI",
+                            concurrency=download_concurrency,
+                        )
+                    elif use_async_download:
+                        download_manager.download_datasets_async(
+                            datasets,
+                            product_id="EO:EUM:DAT:MSG:MSG15-RSS",
+                            concurrency=download_concurrency,
+                        )
+                    elif download_concurrency > 1:
+                        download_manager.download_datasets(
+                            datasets,
+                            product_id="EO:EUM:DAT:MSG:MSG15-RSS",
+                            concurrency=download_concurrency,
+                        )
+                    else:
+                        # Check before downloading each tailored dataset, as it can take awhile
+                        for dset in datasets:
+                            dset = utils.filter_dataset_ids_on_current_files(
+                                [dset], save_dir, manifest=manifest, daily_store=daily_store
                             )
+                            if len(dset) > 0:
+                                download_manager.download_datasets(
+                                    dset,
+                                    product_id="EO:EUM:DAT:MSG:MSG15-RSS",
+                                )
 
-                # 2. Load nat files to one Xarray Dataset
-                native_files = (
-                    list(glob.glob(os.path.join(tmpdir, "*.nat")))
-                    if not use_backup
-                    else list(glob.glob(os.path.join(tmpdir, "*HRSEVIRI*")))
-                )
-                log.debug(
-                    "Saving native files to Zarr: " + native_files.__str__(),
-                    memory=utils.get_memory(),
-                )
-                # Save to S3
-                utils.save_native_to_zarr(
-                    native_files,
-                    save_dir=save_dir,
-                    use_rescaler=use_rescaler,
-                    using_backup=use_backup,
-                )
-                # Move around files into and out of latest
-                utils.move_older_files_to_different_location(
-                    save_dir=save_dir, history_time=(start_date - pd.Timedelta("30 min"))
-                )
+                    # 2. Load nat files to one Xarray Dataset
+                    native_files = (
+                        list(glob.glob(os.path.join(tmpdir, "*.nat")))
+                        if not use_backup
+                        else list(glob.glob(os.path.join(tmpdir, "*HRSEVIRI*")))
+                    )
+                    log.debug(
+                        "Saving native files to Zarr: " + native_files.__str__(),
+                        memory=utils.get_memory(),
+                    )
+                    # Save to S3
+                    saved_files = utils.save_native_to_zarr(
+                        native_files,
+                        save_dir=save_dir,
+                        use_rescaler=use_rescaler,
+                        using_backup=use_backup,
+                        num_workers=conversion_workers,
+                        worker_memory_limit_mb=conversion_worker_memory_mb,
+                    )
+                if daily_store is not None:
+                    log.debug(f"Wrote {len(saved_files)} timesteps into the daily stores")
+                else:
+                    if manifest is not None:
+                        manifest.add_files(saved_files)
+                        # Files over 2 days old are deleted when moving files around
+                        manifest.prune(
+                            start_date - pd.Timedelta("30 min") - pd.Timedelta("2 days")
+                        )
+                        manifest.save()
+                    # Move around files into and out of latest
+                    utils.move_older_files_to_different_location(
+                        save_dir=save_dir, history_time=(start_date - pd.Timedelta("30 min"))
+                    )
 
-        if not utils.check_both_final_files_exists(save_dir=save_dir, using_backup=use_backup):
+        if daily_store_dir is not None:
+            # The daily stores are read directly, so there is nothing to collate
+            for hrv in [True, False]:
+                get_daily_store(
+                    hrv=hrv, using_backup=use_backup, retention_days=daily_store_retention_days
+                ).apply_retention(pd.Timestamp(start_time))
+        elif not utils.check_both_final_files_exists(
+            save_dir=save_dir, using_backup=use_backup, incremental=incremental_collation
+        ):
             updated_data = True
 
         if updated_data:
-            # Collate files into single NetCDF file
-            utils.collate_files_into_latest(save_dir=save_dir, using_backup=use_backup)
-            log.debug("Collated files", memory=utils.get_memory())
+            if daily_store_dir is None:
+                # Collate files into single NetCDF file
+                utils.collate_files_into_latest(
+                    save_dir=save_dir, using_backup=use_backup, incremental=incremental_collation
+                )
+                log.debug("Collated files", memory=utils.get_memory())
 
             # 4. update table to show when this data has been pulled
             if db_url is not None:
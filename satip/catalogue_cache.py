@@ -0,0 +1,223 @@
+"""Local on-disk cache of EUMETSAT catalogue searches.
+
+Search results for closed time windows, i.e. windows old enough that no more products
+will be published for them, are stored in a SQLite database keyed by product ID and
+time window. Those windows are never queried from the search API again; only the
+parts of a search that are not cached yet, and the open "recent" edge, are.
+
+With a retention, windows and features older than the retention before the start of
+each search are pruned, so the cache of a live deployment does not grow without limit.
+
+Usage example:
+  from satip.catalogue_cache import CatalogueCache
+  cache = CatalogueCache("catalogue.sqlite", retention=pd.Timedelta("1 day"))
+  # search(start_date, end_date, product_id=...) returns the features and the total results
+  datasets = cache.search(start_date, end_date, product_id, search=search)
+"""
+
+import json
+import sqlite3
+from typing import Callable, List, Optional, Tuple
+
+import pandas as pd
+import structlog
+
+from satip.utils import format_dt_str
+
+log = structlog.stdlib.get_logger()
+
+# Windows ending longer than this ago are assumed to have all their products published
+CLOSED_WINDOW_DELAY = pd.Timedelta("30 min")
+
+
+def _to_utc(datetime_string) -> pd.Timestamp:
+    """Parses a datetime, assuming UTC if it has no timezone"""
+    timestamp = pd.Timestamp(datetime_string)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize("UTC")
+    return timestamp.tz_convert("UTC")
+
+
+def _merge_intervals(intervals: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Merges overlapping or touching intervals of sortable datetime strings"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _subtract_intervals(
+    interval: Tuple[str, str], covered: List[Tuple[str, str]]
+) -> List[Tuple[str, str]]:
+    """Returns the parts of `interval` not covered by the merged, sorted `covered` intervals"""
+    start, end = interval
+    gaps = []
+    for covered_start, covered_end in covered:
+        if covered_end <= start or covered_start >= end:
+            continue
+        if covered_start > start:
+            gaps.append((start, covered_start))
+        start = max(start, covered_end)
+    if start < end:
+        gaps.append((start, end))
+    return gaps
+
+
+class CatalogueCache:
+    """SQLite cache of the features returned by EUMETSAT catalogue searches."""
+
+    def __init__(
+        self,
+        path: str,
+        closed_window_delay: pd.Timedelta = CLOSED_WINDOW_DELAY,
+        retention: Optional[pd.Timedelta] = None,
+    ):
+        """Catalogue cache initialisation
+
+        Args:
+            path: Local path of the SQLite database, created if it does not exist
+            closed_window_delay: Windows ending longer ago than this are cached, anything
+                more recent is always searched again
+            retention: Windows and features ending longer than this before the start of a
+                search are pruned after it, e.g. the search horizon of a live deployment.
+                Defaults to keeping everything, e.g. for backfills searching into the past
+        """
+        self.path = path
+        self.closed_window_delay = pd.Timedelta(closed_window_delay)
+        self.retention = pd.Timedelta(retention) if retention is not None else None
+
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS features ("
+                "product_id TEXT, dataset_id TEXT, start TEXT, end TEXT, feature TEXT, "
+                "PRIMARY KEY (product_id, dataset_id))"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS windows (product_id TEXT, start TEXT, end TEXT)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Opens a new connection, so the cache can be used from several threads and processes"""
+        return sqlite3.connect(self.path, timeout=30)
+
+    def cached_windows(self, product_id: str) -> List[Tuple[str, str]]:
+        """Returns the merged time windows which have been cached for a product"""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT start, end FROM windows WHERE product_id = ?", (product_id,)
+            ).fetchall()
+        return _merge_intervals([tuple(row) for row in rows])
+
+    def add(self, product_id: str, start_date, end_date, features: list):
+        """Stores the complete search results for a closed time window
+
+        Args:
+            product_id: ID of the EUMETSAT product searched
+            start_date: Start of the searched window
+            end_date: End of the searched window
+            features: All the features returned by the search
+        """
+        rows = []
+        for feature in features:
+            feature_start, feature_end = feature["properties"]["date"].split("/")
+            rows.append(
+                (
+                    product_id,
+                    feature["id"],
+                    format_dt_str(feature_start),
+                    format_dt_str(feature_end),
+                    json.dumps(feature),
+                )
+            )
+        with self._connect() as connection:
+            connection.executemany("INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?, ?)", rows)
+            connection.execute(
+                "INSERT INTO windows VALUES (?, ?, ?)",
+                (product_id, format_dt_str(start_date), format_dt_str(end_date)),
+            )
+
+    def prune(self, before):
+        """Removes the cached windows and features ending before a time
+
+        Windows straddling the time are clipped to start at it, so the remaining windows
+        only claim times whose features are all still cached.
+
+        Args:
+            before: Time before which the cache is pruned, for all the products
+        """
+        before = format_dt_str(before)
+        with self._connect() as connection:
+            connection.execute("DELETE FROM windows WHERE end <= ?", (before,))
+            connection.execute("UPDATE windows SET start = ? WHERE start < ?", (before, before))
+            num_features = connection.execute(
+                "DELETE FROM features WHERE end < ?", (before,)
+            ).rowcount
+        log.debug(f"Pruned {num_features} cached features ending before {before}")
+
+    def get_features(self, product_id: str, start_date, end_date) -> list:
+        """Returns the cached features overlapping a time window"""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT feature FROM features WHERE product_id = ? AND start <= ? AND end >= ?",
+                (product_id, format_dt_str(end_date), format_dt_str(start_date)),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def search(self, start_date, end_date, product_id: str, search: Callable) -> list:
+        """Searches for the available datasets, only querying the API for uncached windows
+
+        Args:
+            start_date: Start of the query period
+            end_date: End of the query period
+            product_id: ID of the EUMETSAT product requested
+            search: Function doing the actual catalogue search, called as
+                `search(start_date, end_date, product_id=product_id)`, and returning the
+                features found and the total number of results of the search. A window is
+                only cached if all its results were listed, so a truncated listing is
+                searched again next time
+
+        Returns:
+            List of features, newest first, as returned by the search function
+        """
+        start = _to_utc(start_date)
+        end = _to_utc(end_date)
+        closed_edge = min(end, pd.Timestamp.now(tz="UTC") - self.closed_window_delay)
+
+        features = []
+        if start < closed_edge:
+            gaps = _subtract_intervals(
+                (format_dt_str(start), format_dt_str(closed_edge)),
+                self.cached_windows(product_id),
+            )
+            log.debug(
+                f"Searching {len(gaps)} uncached windows between {start} and {closed_edge}",
+                productID=product_id,
+            )
+            for gap_start, gap_end in gaps:
+                gap_features, total_results = search(gap_start, gap_end, product_id=product_id)
+                if len(gap_features) >= total_results:
+                    self.add(product_id, gap_start, gap_end, gap_features)
+                else:
+                    log.warn(
+                        f"Not caching {gap_start} to {gap_end}, only {len(gap_features)} / "
+                        f"{total_results} features were listed",
+                        productID=product_id,
+                    )
+                    features += gap_features
+            features += self.get_features(product_id, start, closed_edge)
+
+        if closed_edge < end:
+            # The recent edge may still get new products, so is always searched
+            recent_features, _ = search(
+                format_dt_str(max(start, closed_edge)), format_dt_str(end), product_id=product_id
+            )
+            features += recent_features
+
+        if self.retention is not None:
+            self.prune(start - self.retention)
+
+        features = list({feature["id"]: feature for feature in features}.values())
+        return sorted(features, key=lambda feature: feature["properties"]["date"], reverse=True)
@@ -0,0 +1,171 @@
+"""Compression codecs and chunking of the saved zarr files.
+
+The live outputs, the per-timestep zarr.zip files, the latest files and the daily stores,
+are encoded following an `EncodingPolicy`: the dtype, the compressor and the chunk shape
+of each variable. The policy of the HRV and of the non-HRV data is set once per run,
+by default matching the files saved so far, int16 with zarr's default compressor in
+512x512 and 256x256 chunks.
+
+Usage example:
+  from satip.compression import EncodingPolicy
+  policy = EncodingPolicy(codec="zstd", clevel=5, shuffle="byte")
+  dataset = policy.chunk(dataset)
+  dataset.to_zarr(store, encoding=policy.encoding(dataset))
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numcodecs
+import xarray as xr
+from numcodecs import Blosc
+from ocf_blosc2 import Blosc2
+
+# Names of the codecs: zarr's default compressor, blosc2 with zstd as in
+# `save_dataarray_to_zarr`, blosc with zstd or lz4, and bz2
+CODECS = ("default", "blosc2", "zstd", "lz4", "bz2")
+
+# Shuffle filters of the blosc codecs. Shuffling the bytes of int16 values puts all the
+# high bytes, which change slowly across pixels, next to each other, so they compress better
+SHUFFLES = {"none": Blosc.NOSHUFFLE, "byte": Blosc.SHUFFLE, "bit": Blosc.BITSHUFFLE}
+
+# Chunk sizes of the data of each timestep, which are cropped to the UK
+HRV_CHUNKS = {"time": 1, "y_geostationary": 512, "x_geostationary": 512, "variable": 1}
+NONHRV_CHUNKS = {"time": 1, "y_geostationary": 256, "x_geostationary": 256, "variable": 1}
+
+
+class EncodingPolicy:
+    """Dtype, compressor and chunk shape of the variables of the saved zarr files"""
+
+    def __init__(
+        self,
+        codec: str = "default",
+        clevel: int = 5,
+        shuffle: str = "byte",
+        chunks: Optional[Dict[str, Dict[str, int]]] = None,
+        dtypes: Optional[Dict[str, str]] = None,
+    ):
+        """Init
+
+        Args:
+            codec: Name of the compressor, one of `CODECS`
+            clevel: Compression level, from 1 to 9
+            shuffle: Shuffle filter of the blosc codecs, one of `SHUFFLES`
+            chunks: Chunk size along each dimension, per variable, dimensions not given
+                being in one chunk. Defaults to `NONHRV_CHUNKS` for the `data` variable
+            dtypes: Dtype each variable is saved as, defaults to int16 for `data`
+        """
+        if codec not in CODECS:
+            raise ValueError(f"`codec` must be one of {CODECS}, not '{codec}'")
+        if shuffle not in SHUFFLES:
+            raise ValueError(f"`shuffle` must be one of {list(SHUFFLES)}, not '{shuffle}'")
+        self.codec = codec
+        self.clevel = clevel
+        self.shuffle = shuffle
+        self.chunks = chunks if chunks is not None else {"data": NONHRV_CHUNKS}
+        self.dtypes = dtypes if dtypes is not None else {"data": "int16"}
+
+    def __repr__(self) -> str:
+        return (
+            f"EncodingPolicy(codec={self.codec!r}, clevel={self.clevel}, "
+            f"shuffle={self.shuffle!r}, chunks={self.chunks}, dtypes={self.dtypes})"
+        )
+
+    def compressor(self) -> Optional[numcodecs.abc.Codec]:
+        """The compressor, None for zarr's default one"""
+        if self.codec == "default":
+            return None
+        if self.codec == "blosc2":
+            # The bytes are shuffled by blosc2 itself
+            return Blosc2(cname="zstd", clevel=self.clevel)
+        if self.codec == "bz2":
+            return numcodecs.get_codec(dict(id="bz2", level=self.clevel))
+        return Blosc(cname=self.codec, clevel=self.clevel, shuffle=SHUFFLES[self.shuffle])
+
+    def _chunk_sizes(self, variable: xr.DataArray, name: str) -> Optional[Dict[str, int]]:
+        """Chunk size along each dimension of a variable, None if it has no policy"""
+        if name not in self.chunks:
+            return None
+        return {
+            dim: min(self.chunks[name].get(dim, size), size)
+            for dim, size in variable.sizes.items()
+        }
+
+    def chunk(self, dataset: xr.Dataset) -> xr.Dataset:
+        """
+        Rechunk the variables of a dataset to their chunk shape, as needed by `encoding`
+
+        Args:
+            dataset: Dataset to save
+
+        Returns:
+            The dataset with its variables chunked as they will be saved
+        """
+        for name, variable in dataset.data_vars.items():
+            chunk_sizes = self._chunk_sizes(variable, name)
+            if chunk_sizes is not None:
+                dataset[name] = variable.chunk(chunk_sizes)
+        return dataset
+
+    def encoding(self, dataset: xr.Dataset) -> Dict[str, dict]:
+        """
+        The encoding to save a dataset with, as given to `Dataset.to_zarr`
+
+        Args:
+            dataset: Dataset to save, chunked by `chunk`
+
+        Returns:
+            The encoding of each variable of the dataset with a policy
+        """
+        compressor = self.compressor()
+        encoding = {}
+        for name, variable in dataset.data_vars.items():
+            chunk_sizes = self._chunk_sizes(variable, name)
+            if name not in self.dtypes and chunk_sizes is None:
+                continue
+            encoding[name] = {}
+            if name in self.dtypes:
+                encoding[name]["dtype"] = self.dtypes[name]
+            if chunk_sizes is not None:
+                encoding[name]["chunks"] = tuple(chunk_sizes[dim] for dim in variable.dims)
+            if compressor is not None:
+                encoding[name]["compressor"] = compressor
+        return encoding
+
+
+# The codec of the live outputs, as set by `set_output_compression`
+_output_compression = ("default", 5, "byte")
+
+
+def set_output_compression(codec: str = "default", clevel: int = 5, shuffle: str = "byte"):
+    """
+    Set the compression of the live outputs, see `EncodingPolicy`
+
+    Args:
+        codec: Name of the compressor, one of `CODECS`
+        clevel: Compression level, from 1 to 9
+        shuffle: Shuffle filter of the blosc codecs, one of `SHUFFLES`
+    """
+    global _output_compression
+    EncodingPolicy(codec=codec, clevel=clevel, shuffle=shuffle)  # Checks the arguments
+    _output_compression = (codec, clevel, shuffle)
+
+
+def get_output_compression() -> Tuple[str, int, str]:
+    """Get the codec, level and shuffle of the live outputs"""
+    return _output_compression
+
+
+def get_encoding_policy(hrv: bool) -> EncodingPolicy:
+    """
+    Get the encoding policy of the live HRV or non-HRV outputs
+
+    Args:
+        hrv: Whether the policy is for the HRV data, or else the non-HRV data
+    """
+    codec, clevel, shuffle = _output_compression
+    return EncodingPolicy(
+        codec=codec,
+        clevel=clevel,
+        shuffle=shuffle,
+        chunks={"data": HRV_CHUNKS if hrv else NONHRV_CHUNKS},
+    )
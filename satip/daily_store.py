@@ -0,0 +1,304 @@
+"""Time-partitioned Zarr stores, one per day, as an alternative to per-timestep zarr.zip files.
+
+Each day of data is kept in one Zarr directory store, local or on any fsspec backend, with
+a slot for every timestep of the day, e.g. 288 slots for the 5 minutely RSS data. The store
+is created with consolidated metadata when its first timestep is written, then every
+timestep is written into its own slot with a region write. A timestep is one chunk along
+time, so timesteps can be written by parallel processes, out of order, or written again,
+without touching each other. Slots not written yet have a NaT time, and are dropped when
+reading. Retention removes whole daily stores, so there is nothing to list, zip, move or
+collate per timestep.
+
+Usage example:
+  from satip.daily_store import DailyZarrStore
+  store = DailyZarrStore("s3://bucket/satellite", name="nonhrv")
+  store.write(dataset)
+  dataset = store.open(start, end)
+  store.apply_retention(now)
+"""
+
+from typing import List, Optional
+
+import dask.array as da
+import fsspec
+import numpy as np
+import pandas as pd
+import structlog
+import xarray as xr
+import zarr
+
+log = structlog.stdlib.get_logger()
+
+# Interval between the timesteps of the RSS, and of the 15 minutely backup data
+RSS_FREQUENCY = "5min"
+BACKUP_FREQUENCY = "15min"
+
+
+class DailyZarrStore:
+    """
+    Zarr stores of the timesteps of each day, written in place by region writes
+
+    The stores are named `{root}/{name}_{YYYYMMDD}.zarr`.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        name: str = "nonhrv",
+        frequency: str = RSS_FREQUENCY,
+        retention_days: Optional[int] = None,
+    ):
+        """Init
+
+        Args:
+            root: Directory of the daily stores, with backend prefix, e.g. s3://bucket/data
+            name: Name of the data, to keep the HRV and non-HRV data in different stores
+            frequency: Interval between the timesteps, which sets the slots of each day
+            retention_days: Number of days of stores kept by `apply_retention`
+        """
+        self.root = root.rstrip("/")
+        self.name = name
+        self.frequency = pd.Timedelta(frequency)
+        self.retention_days = retention_days
+        self.filesystem = fsspec.open(self.root).fs
+        self._written_times = {}
+
+    def path(self, day: pd.Timestamp) -> str:
+        """Path of the store of a day"""
+        return f"{self.root}/{self.name}_{pd.Timestamp(day):%Y%m%d}.zarr"
+
+    @property
+    def num_slots(self) -> int:
+        """Number of timesteps of a day"""
+        return int(pd.Timedelta("1 day") / self.frequency)
+
+    def _exists(self, path: str) -> bool:
+        """Whether a store is created, its consolidated metadata being written last"""
+        return self.filesystem.exists(f"{path}/.zmetadata")
+
+    def _create(self, path: str, dataset: xr.Dataset, encoding: Optional[dict] = None):
+        """
+        Creates the store of a day for timesteps like those of `dataset`
+
+        Only the metadata and the coordinates which are not along time are written, and
+        the slots are written by `write`. The times of the slots are not written at all,
+        but read as NaT from the fill value of the time array, so a process creating the
+        store at the same time as another one writes the same metadata again, but never
+        overwrites the time of a slot already written by the other one.
+
+        Args:
+            path: Path of the store
+            dataset: Timestep to create the store for
+            encoding: Encoding of the data variables, by default int16 data
+        """
+        num_slots = self.num_slots
+        timestep = dataset.isel(time=0, drop=True)
+        template = xr.Dataset(
+            coords={
+                **{name: coord for name, coord in timestep.coords.items()},
+                "time": np.full(num_slots, np.datetime64("NaT"), dtype="datetime64[ns]"),
+            },
+            attrs=dataset.attrs,
+        )
+        store_encoding = {
+            "time": {
+                "units": "nanoseconds since 1970-01-01",
+                "dtype": "int64",
+                "chunks": (1,),
+                # NaT, for the slots not written yet
+                "_FillValue": np.iinfo(np.int64).min,
+            }
+        }
+        for name, variable in dataset.data_vars.items():
+            chunks = (1,) + tuple(
+                variable.chunksizes[dim][0] if variable.chunks else size
+                for dim, size in variable.sizes.items()
+                if dim != "time"
+            )
+            shape = (num_slots,) + tuple(s for d, s in variable.sizes.items() if d != "time")
+            # Never computed, only the metadata of the data variables is written
+            template[name] = (
+                ("time",) + tuple(d for d in variable.dims if d != "time"),
+                da.zeros(shape, dtype=variable.dtype, chunks=chunks),
+                variable.attrs,
+            )
+            if encoding is not None and name in encoding:
+                store_encoding[name] = encoding[name]
+            else:
+                # Same encoding as the zarr.zip files
+                store_encoding[name] = {"dtype": "int16"} if name == "data" else {}
+
+        log.debug(f"Creating daily store {path}")
+        staged = zarr.storage.MemoryStore()
+        template.to_zarr(
+            staged, mode="w-", compute=False, encoding=store_encoding, consolidated=True
+        )
+        store = fsspec.get_mapper(path)
+        for key in sorted(staged, key=lambda key: key == ".zmetadata"):
+            name, _, chunk = key.rpartition("/")
+            if name == "time" and not chunk.startswith(".z"):
+                continue
+            # The consolidated metadata is written last, as `_exists` checks for it
+            store[key] = staged[key]
+
+    def write(self, dataset: xr.Dataset, encoding: Optional[dict] = None) -> List[str]:
+        """
+        Writes the timesteps of a dataset into their slots of the daily stores
+
+        Args:
+            dataset: Timesteps to write, with times on the timesteps of the day
+            encoding: Encoding of the data variables when creating a store, see
+                `EncodingPolicy.encoding`
+
+        Returns:
+            The paths of the daily stores written to
+        """
+        dataset = dataset.assign_coords({"variable": dataset.coords["variable"].astype(str)})
+        paths = []
+        for time_value in dataset.time.values:
+            timestep = dataset.sel(time=[time_value])
+            time_value = pd.Timestamp(time_value)
+            day = time_value.floor("1D")
+            slot, remainder = divmod(time_value - day, self.frequency)
+            if remainder:
+                raise ValueError(f"{time_value} is not a timestep every {self.frequency}")
+
+            path = self.path(day)
+            if not self._exists(path):
+                self._create(path, timestep, encoding)
+
+            log.debug(f"Writing {time_value} into slot {slot} of {path}")
+            # Only the variables along time are written, the others are in the store already
+            timestep = timestep.drop_vars(
+                [name for name, var in timestep.variables.items() if "time" not in var.dims]
+            )
+            timestep.attrs = {}
+            timestep.to_zarr(fsspec.get_mapper(path), region={"time": slice(slot, slot + 1)})
+            if day in self._written_times:
+                self._written_times[day].add(time_value)
+            if path not in paths:
+                paths.append(path)
+        return paths
+
+    def written_times(self, day: pd.Timestamp) -> set:
+        """
+        Times of the timesteps written in the store of a day
+
+        Read once per day from the store, then kept up to date by `write`.
+
+        Args:
+            day: Day of the store
+        """
+        day = pd.Timestamp(day).tz_localize(None).floor("1D")
+        if day not in self._written_times:
+            path = self.path(day)
+            times = set()
+            if self._exists(path):
+                store_times = xr.open_zarr(fsspec.get_mapper(path), consolidated=True).time
+                times = set(pd.DatetimeIndex(store_times.values).dropna())
+            self._written_times[day] = times
+        return self._written_times[day]
+
+    def __contains__(self, time_value) -> bool:
+        """Whether the timestep at a time is written, so a store can be used as a manifest"""
+        time_value = pd.Timestamp(time_value).tz_localize(None)
+        return time_value in self.written_times(time_value)
+
+    def __len__(self) -> int:
+        """Number of timesteps written in the stores of the days read so far"""
+        return sum(len(times) for times in self._written_times.values())
+
+    def open(self, start: pd.Timestamp, end: pd.Timestamp) -> Optional[xr.Dataset]:
+        """
+        Opens the timesteps written between two times, lazily
+
+        Args:
+            start: Time of the first timestep, inclusive
+            end: Time of the last timestep, inclusive
+
+        Returns:
+            The timesteps, or None if there are none
+        """
+        start, end = pd.Timestamp(start).tz_localize(None), pd.Timestamp(end).tz_localize(None)
+        datasets = []
+        for day in pd.date_range(start.floor("1D"), end.floor("1D"), freq="1D"):
+            path = self.path(day)
+            if not self._exists(path):
+                continue
+            dataset = xr.open_zarr(fsspec.get_mapper(path), consolidated=True)
+            written = dataset.time.notnull().values
+            dataset = dataset.isel(time=np.flatnonzero(written))
+            datasets.append(dataset.sel(time=slice(start, end)))
+        datasets = [dataset for dataset in datasets if dataset.time.size > 0]
+        if not datasets:
+            return None
+        return xr.concat(datasets, dim="time", data_vars="minimal", coords="minimal")
+
+    def apply_retention(self, now: pd.Timestamp) -> List[str]:
+        """
+        Removes the daily stores older than `retention_days` before now
+
+        Args:
+            now: Current time
+
+        Returns:
+            The paths of the removed stores
+        """
+        if self.retention_days is None:
+            return []
+        oldest = pd.Timestamp(now).tz_localize(None).floor("1D") - pd.Timedelta(
+            days=self.retention_days
+        )
+        to_remove = []
+        for path in self.filesystem.glob(f"{self.root}/{self.name}_*.zarr"):
+            day = pd.to_datetime(path.split("/")[-1][len(self.name) + 1 : -len(".zarr")])
+            if day < oldest:
+                to_remove.append(path)
+        if to_remove:
+            log.info(f"Removing {len(to_remove)} daily stores before {oldest}")
+            self.filesystem.rm(to_remove, recursive=True)
+        return to_remove
+
+
+# The root directory of the daily stores used by the conversion, None to save zarr.zip files
+_daily_store_dir: Optional[str] = None
+
+
+def set_daily_store_dir(root: Optional[str]):
+    """
+    Set the directory of the daily stores the converted data is written to
+
+    Args:
+        root: Directory of the daily stores, None to save per-timestep zarr.zip files
+    """
+    global _daily_store_dir
+    _daily_store_dir = root
+
+
+def get_daily_store_dir() -> Optional[str]:
+    """Get the directory of the daily stores, None if per-timestep zarr.zip files are saved"""
+    return _daily_store_dir
+
+
+def get_daily_store(
+    hrv: bool, using_backup: bool = False, retention_days: Optional[int] = None
+) -> Optional[DailyZarrStore]:
+    """
+    Get the daily store of the HRV or non-HRV data, if the daily stores are used
+
+    Args:
+        hrv: Whether the store is for the HRV data, or else the non-HRV data
+        using_backup: Whether the data is the 15 minutely backup data or not
+        retention_days: Number of days of stores kept by `apply_retention`
+
+    Returns:
+        The store, or None if the converted data is saved as per-timestep zarr.zip files
+    """
+    if _daily_store_dir is None:
+        return None
+    return DailyZarrStore(
+        _daily_store_dir,
+        name=f"{'15_' if using_backup else ''}{'hrv' if hrv else 'nonhrv'}",
+        frequency=BACKUP_FREQUENCY if using_backup else RSS_FREQUENCY,
+        retention_days=retention_days,
+    )
@@ -0,0 +1,467 @@
+"""Scheduler keeping the EUMETSAT Data Tailor customisation quota fully used.
+
+The Data Tailor only runs 3 customisations per account at a time. Rather than every
+download racing for a slot and polling its own customisation, the scheduler keeps a
+queue of pending (dataset, chain) jobs, submits a new one whenever a slot is free,
+polls all active customisations from one loop and downloads each output as soon as
+its customisation is done, while the other jobs keep running.
+
+Statuses are polled by a `CustomisationPoller`, which lists all the customisations of
+the account in a single call per tick, instead of one request per customisation, and
+resolves a future per watched customisation once it has finished. It polls quickly
+right after a submission, when short jobs finish, and slowly while jobs are queued.
+
+Usage example:
+  from satip.data_tailor_scheduler import DataTailorScheduler
+  scheduler = DataTailorScheduler(download_manager)
+  for product in products:
+      scheduler.submit(product, tailor_id="HRSEVIRI")
+  jobs = scheduler.run()
+"""
+
+import collections
+import datetime
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List
+
+import eumdac
+import structlog
+
+from satip.eumetsat import DATA_TAILOR_TIMEOUT_LIMIT_MINUTES, EUMETSATDownloadManager
+
+log = structlog.stdlib.get_logger()
+
+# Number of customisations the Data Tailor runs at once for an account
+DATA_TAILOR_MAX_CUSTOMISATIONS = 3
+
+# Seconds between two status checks of the running customisations
+DATA_TAILOR_POLL_INTERVAL_SECONDS = 5
+
+# Seconds between two status checks right after a submission
+DATA_TAILOR_FAST_POLL_INTERVAL_SECONDS = 1
+
+# Seconds after a submission during which the status is checked quickly
+DATA_TAILOR_FAST_POLL_PERIOD_SECONDS = 20
+
+# Seconds between two status checks while all the customisations are queued
+DATA_TAILOR_QUEUED_POLL_INTERVAL_SECONDS = 15
+
+# Seconds customisations keep failing to be created before the pending jobs are failed
+DATA_TAILOR_CREATION_TIMEOUT_SECONDS = 600
+
+# Seconds customisations keep failing to be listed before the active and pending jobs are failed
+DATA_TAILOR_LISTING_TIMEOUT_SECONDS = 600
+
+# Number of customisation outputs downloaded at once
+DATA_TAILOR_DOWNLOAD_WORKERS = DATA_TAILOR_MAX_CUSTOMISATIONS
+
+RUNNING_STATUSES = ["RUNNING", "QUEUED", "INACTIVE"]
+FAILED_STATUSES = ["FAILED", "KILLED", "ERROR", "DELETED"]
+FINISHED_STATUSES = ["DONE"] + FAILED_STATUSES
+
+
+def _listed_status(customisation) -> str:
+    """Status of a customisation returned by a listing, without requesting it again
+
+    `eumdac` refreshes the properties of a customisation on access once they are older
+    than half a second, which would make one request per customisation again.
+    """
+    return customisation._properties["status"]
+
+
+class CustomisationPoller:
+    """Polls the status of many customisations with a single listing call per tick."""
+
+    def __init__(
+        self,
+        datatailor,
+        poll_interval: float = DATA_TAILOR_POLL_INTERVAL_SECONDS,
+        fast_poll_interval: float = DATA_TAILOR_FAST_POLL_INTERVAL_SECONDS,
+        fast_poll_period: float = DATA_TAILOR_FAST_POLL_PERIOD_SECONDS,
+        queued_poll_interval: float = DATA_TAILOR_QUEUED_POLL_INTERVAL_SECONDS,
+    ):
+        """Customisation poller initialisation
+
+        Args:
+            datatailor: `eumdac.DataTailor` to list the customisations from
+            poll_interval: Seconds between two polls while customisations are running
+            fast_poll_interval: Seconds between two polls right after a submission
+            fast_poll_period: Seconds after a submission during which polls are fast
+            queued_poll_interval: Seconds between two polls while customisations are queued
+        """
+        self.datatailor = datatailor
+        self.poll_interval = poll_interval
+        self.fast_poll_interval = fast_poll_interval
+        self.fast_poll_period = fast_poll_period
+        self.queued_poll_interval = queued_poll_interval
+
+        self.watched: Dict[str, dict] = {}
+        self.customisations = []
+
+    def watch(self, customisation) -> Future:
+        """Watches a customisation until it has finished
+
+        Returns:
+            Future resolved with the final status of the customisation
+        """
+        future = Future()
+        self.watched[customisation._id] = {
+            "future": future,
+            "status": "QUEUED",
+            "submitted_at": time.monotonic(),
+        }
+        return future
+
+    def unwatch(self, customisation):
+        """Stops watching a customisation, cancelling its future"""
+        watch = self.watched.pop(customisation._id, None)
+        if watch is not None:
+            watch["future"].cancel()
+
+    @property
+    def num_running(self) -> int:
+        """Number of customisations of the account running at the last poll"""
+        return sum(
+            _listed_status(customisation) in RUNNING_STATUSES
+            for customisation in self.customisations
+        )
+
+    def poll(self) -> list:
+        """Lists the customisations once, resolving the futures of the finished ones
+
+        Returns:
+            All the customisations of the account
+        """
+        self.customisations = self.datatailor.customisations
+        statuses = {
+            customisation._id: _listed_status(customisation)
+            for customisation in self.customisations
+        }
+
+        for customisation_id, watch in list(self.watched.items()):
+            # A customisation missing from the listing has been deleted
+            watch["status"] = statuses.get(customisation_id, "DELETED")
+            log.debug(
+                f"Status of ID {customisation_id} is {watch['status']}", parent="DownloadManager"
+            )
+            if watch["status"] in FINISHED_STATUSES:
+                del self.watched[customisation_id]
+                watch["future"].set_result(watch["status"])
+
+        return self.customisations
+
+    def next_interval(self) -> float:
+        """Seconds to wait before the next poll, depending on the watched customisations"""
+        if not self.watched:
+            return self.poll_interval
+
+        now = time.monotonic()
+        intervals = []
+        for watch in self.watched.values():
+            if now - watch["submitted_at"] < self.fast_poll_period:
+                intervals.append(self.fast_poll_interval)
+            elif watch["status"] == "QUEUED":
+                intervals.append(self.queued_poll_interval)
+            else:
+                intervals.append(self.poll_interval)
+        return min(intervals)
+
+
+class DataTailorJob:
+    """A dataset to tailor with a chain, and the state of its customisation."""
+
+    def __init__(self, dataset_id, tailor_id: str, chain: eumdac.tailor_models.Chain):
+        """Data Tailor job initialisation
+
+        Args:
+            dataset_id: Data Store product of the dataset to tailor
+            tailor_id: Data Tailor product ID
+            chain: Chain of the customisation
+        """
+        self.dataset_id = dataset_id
+        self.tailor_id = tailor_id
+        self.chain = chain
+
+        self.attempts = 0
+        self.customisation = None
+        self.future = None
+        self.submitted_at = None
+        self.status = "PENDING"
+        self.filename = None
+        self.error = None
+
+    def __repr__(self) -> str:
+        return f"DataTailorJob({self.dataset_id}, {self.tailor_id}, status={self.status})"
+
+
+class DataTailorScheduler:
+    """Runs queued Data Tailor jobs, keeping all the free customisation slots in use."""
+
+    def __init__(
+        self,
+        download_manager: EUMETSATDownloadManager,
+        download_workers: int = DATA_TAILOR_DOWNLOAD_WORKERS,
+        poll_interval: float = DATA_TAILOR_POLL_INTERVAL_SECONDS,
+        timeout_minutes: float = DATA_TAILOR_TIMEOUT_LIMIT_MINUTES,
+        creation_timeout_seconds: float = DATA_TAILOR_CREATION_TIMEOUT_SECONDS,
+        listing_timeout_seconds: float = DATA_TAILOR_LISTING_TIMEOUT_SECONDS,
+    ):
+        """Data Tailor scheduler initialisation
+
+        The customisations are always run on all the free slots of the Data Tailor quota,
+        whatever the number of download workers.
+
+        Args:
+            download_manager: Download manager holding the Data Tailor and data directories
+            download_workers: Number of customisation outputs downloaded at the same time
+            poll_interval: Seconds between two status checks of the running customisations,
+                polls are faster right after a submission and slower while queued
+            timeout_minutes: Minutes after which a customisation which is not done is killed
+            creation_timeout_seconds: Seconds customisations can keep failing to be created,
+                e.g. with bad credentials or during an outage, before the pending jobs are
+                marked as failed
+            listing_timeout_seconds: Seconds customisations can keep failing to be listed
+                before the active and pending jobs are marked as failed
+        """
+        self.download_manager = download_manager
+        self.datatailor = download_manager.datatailor
+        self.download_workers = max(download_workers, 1)
+        self.poller = CustomisationPoller(
+            self.datatailor,
+            poll_interval=poll_interval,
+            fast_poll_interval=min(poll_interval, DATA_TAILOR_FAST_POLL_INTERVAL_SECONDS),
+            queued_poll_interval=max(poll_interval, DATA_TAILOR_QUEUED_POLL_INTERVAL_SECONDS),
+        )
+        self.timeout = datetime.timedelta(minutes=timeout_minutes)
+        self.creation_timeout_seconds = creation_timeout_seconds
+        self.listing_timeout_seconds = listing_timeout_seconds
+        self._creation_failing_since = None
+        self._listing_failing_since = None
+
+        self.jobs: List[DataTailorJob] = []
+        self.pending = collections.deque()
+        self.active: List[DataTailorJob] = []
+
+    def submit(
+        self,
+        dataset_id,
+        tailor_id: str = "HRSEVIRI",
+        roi: str = None,
+        file_format: str = "hrit",
+        projection: str = None,
+        compression: dict = {"format": "zip"},
+    ) -> DataTailorJob:
+        """Queues a dataset to be tailored, unless it is already in the native file store
+
+        Args:
+            dataset_id: Data Store product of the dataset to tailor
+            tailor_id: Data Tailor product ID
+            roi: Region of Interest, None if want the whole original area
+            file_format: File format to request
+            projection: Projection of the stored data
+            compression: Compression of the output
+
+        Returns:
+            The job, which holds the filename or error once the scheduler has run
+        """
+        chain = eumdac.tailor_models.Chain(
+            product=tailor_id,
+            format=file_format,
+            projection=projection,
+            roi=roi,
+            compression=compression,
+        )
+        job = DataTailorJob(dataset_id, tailor_id, chain)
+        self.jobs.append(job)
+
+        # check data store, if its there use this instead
+        job.filename = self.download_manager.copy_from_native_file_store(dataset_id, tailor_id)
+        if job.filename is not None:
+            job.status = "COPIED"
+        else:
+            self.pending.append(job)
+
+        return job
+
+    def _clear_stuck_customisations(self):
+        """Clears the inactive customisations of the account which are not watched"""
+        for customisation in self.poller.customisations:
+            if (
+                _listed_status(customisation) in ["INACTIVE"]
+                and customisation._id not in self.poller.watched
+            ):
+                try:
+                    customisation.kill()
+                    customisation.delete()
+                    customisation._properties["status"] = "DELETED"
+                except Exception as e:
+                    log.debug(f"Failed removing customisation {customisation}: {e}")
+
+    def _submit_pending(self):
+        """Creates customisations for pending jobs while there are free slots"""
+        free_slots = DATA_TAILOR_MAX_CUSTOMISATIONS - max(
+            self.poller.num_running, len(self.active)
+        )
+
+        while self.pending and free_slots > 0:
+            job = self.pending.popleft()
+            try:
+                job.customisation = self.datatailor.new_customisation(
+                    job.dataset_id, chain=job.chain
+                )
+            except Exception as e:
+                # The slot may have been taken by another process, try again next tick
+                log.debug(f"Customisation for {job} not made successfully: {e}")
+                self.pending.appendleft(job)
+                self._check_creation_timeout(e)
+                return
+
+            self._creation_failing_since = None
+            log.debug(f"Customisation: {job.customisation} for {job}", parent="DownloadManager")
+            job.attempts += 1
+            job.submitted_at = datetime.datetime.now(tz=datetime.timezone.utc)
+            job.status = "QUEUED"
+            job.future = self.poller.watch(job.customisation)
+            self.active.append(job)
+            free_slots -= 1
+
+    def _check_creation_timeout(self, error: Exception):
+        """Fails all the pending jobs once customisations have failed to be created for long
+
+        The timeout is shared by the jobs, as each creation is tried for the job at the
+        head of the queue, so a persistent error would otherwise be waited on once per job.
+        """
+        now = time.monotonic()
+        if self._creation_failing_since is None:
+            self._creation_failing_since = now
+        if now - self._creation_failing_since < self.creation_timeout_seconds:
+            return
+
+        log.error(
+            f"Customisations not made for {self.creation_timeout_seconds} seconds, "
+            f"failing {len(self.pending)} pending jobs: {error}",
+            parent="DownloadManager",
+        )
+        self._fail_pending(error)
+        self._creation_failing_since = None
+
+    def _check_listing_timeout(self, error: Exception):
+        """Fails all the active and pending jobs once customisations have failed to be listed
+
+        While the listing fails, the statuses of the active customisations are unknown and no
+        slot is known to be free, so the jobs could otherwise wait forever.
+        """
+        now = time.monotonic()
+        if self._listing_failing_since is None:
+            self._listing_failing_since = now
+        if now - self._listing_failing_since < self.listing_timeout_seconds:
+            return
+
+        log.error(
+            f"Customisations not listed for {self.listing_timeout_seconds} seconds, failing "
+            f"{len(self.active)} active and {len(self.pending)} pending jobs: {error}",
+            parent="DownloadManager",
+        )
+        while self.active:
+            self._fail(self.active.pop(), error, attempts=0)
+        self._fail_pending(error)
+        self._listing_failing_since = None
+
+    def _fail_pending(self, error: Exception):
+        """Marks all the pending jobs as failed"""
+        while self.pending:
+            job = self.pending.popleft()
+            job.status = "FAILED"
+            job.error = error
+
+    def _fail(self, job: DataTailorJob, error: Exception, attempts: int):
+        """Retries a job whose customisation failed, or marks it as failed"""
+        self.poller.unwatch(job.customisation)
+        try:
+            job.customisation.kill()
+            job.customisation.delete()
+        except Exception as e:
+            log.debug(f"Failed removing customisation {job.customisation}: {e}")
+
+        if job.attempts < attempts:
+            log.info(f"Retrying {job} after error: {error}", parent="DownloadManager")
+            job.status = "PENDING"
+            self.pending.append(job)
+        else:
+            job.status = "FAILED"
+            job.error = error
+
+    def _download(self, job: DataTailorJob):
+        """Downloads the output of a done job"""
+        try:
+            job.filename = self.download_manager.download_customisation_output(
+                job.customisation, job.dataset_id, job.tailor_id
+            )
+            job.status = "DOWNLOADED"
+        except Exception as e:
+            job.status = "FAILED"
+            job.error = e
+
+    def _check_active(self, executor: ThreadPoolExecutor, attempts: int) -> list:
+        """Starts downloads for the finished customisations, and retries the failed ones"""
+        downloads = []
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        for job in list(self.active):
+            if job.future.done():
+                job.status = job.future.result()
+                self.active.remove(job)
+                if job.status == "DONE":
+                    job.status = "DOWNLOADING"
+                    downloads.append(executor.submit(self._download, job))
+                else:
+                    self._fail(job, RuntimeError(f"Customisation {job.status}"), attempts)
+            elif now - job.submitted_at > self.timeout:
+                self.active.remove(job)
+                self._fail(
+                    job,
+                    TimeoutError(
+                        f"Data tailor service took more than {self.timeout} for {job}"
+                    ),
+                    attempts,
+                )
+        return downloads
+
+    def _tick(self, executor: ThreadPoolExecutor, attempts: int) -> list:
+        """Polls all the customisations once, then updates the jobs and submits new ones"""
+        try:
+            self.poller.poll()
+        except Exception as e:
+            log.debug(f"Could not list the customisations: {e}")
+            # The active jobs still time out, and all the jobs fail if the listing keeps failing
+            downloads = self._check_active(executor, attempts)
+            self._check_listing_timeout(e)
+            return downloads
+
+        self._listing_failing_since = None
+        self._clear_stuck_customisations()
+        downloads = self._check_active(executor, attempts)
+        self._submit_pending()
+        return downloads
+
+    def run(self, attempts: int = 2) -> List[DataTailorJob]:
+        """Runs all the queued jobs until their outputs are downloaded or they have failed
+
+        Args:
+            attempts: Number of customisations made per job before it is marked as failed
+
+        Returns:
+            All the submitted jobs, with their filename or error
+        """
+        downloads = []
+        with ThreadPoolExecutor(max_workers=self.download_workers) as executor:
+            while self.pending or self.active:
+                downloads += self._tick(executor, attempts)
+                if self.pending or self.active:
+                    time.sleep(self.poller.next_interval())
+
+        for job in self.jobs:
+            if job.error is not None:
+                log.error(f"Failed to download {job}: {job.error}", parent="DownloadManager")
+
+        return self.jobs
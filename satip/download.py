@@ -11,6 +11,7 @@ Usage example:
 Author(s): Jacob Bieker
 """
 
+import functools
 import math
 import multiprocessing
 import os
@@ -67,6 +68,9 @@ def download_eumetsat_data(
     number_of_processes: int = 0,
     product: Union[str, List[str]] = ["rss", "cloud"],
     enforce_full_days: bool = True,
+    catalogue_cache_path: Optional[str] = None,
+    use_async: bool = False,
+    download_concurrency: int = 1,
 ):
     """Downloads EUMETSAT RSS and Cloud Masks
 
@@ -89,6 +93,10 @@ def download_eumetsat_data(
                            i.e. no matter how you set the time of the end_date,
                            you will always get a full day. Set to False to get
                            incomplete days to strictly adhere to your start/end_date set.
+        catalogue_cache_path: Local SQLite file to cache catalogue searches in, so days
+                              that were already searched are not queried again
+        use_async: Whether to download with the asyncio engine instead of threads
+        download_concurrency: Number of files to download at the same time for each time range
 
     """
     # Get authentication
@@ -111,7 +119,13 @@ def download_eumetsat_data(
         end_date = datetime.now()
 
     # Download the data
-    dm = EUMETSATDownloadManager(user_key, user_secret, download_directory, download_directory)
+    dm = EUMETSATDownloadManager(
+        user_key,
+        user_secret,
+        download_directory,
+        download_directory,
+        catalogue_cache_path=catalogue_cache_path,
+    )
     products_to_use = []
     if "rss" in product:
         products_to_use.append(RSS_ID)
@@ -120,6 +134,10 @@ def download_eumetsat_data(
     if "seviri" in product:
         products_to_use.append(SEVIRI_ID)
 
+    download_time_range = functools.partial(
+        _download_time_range, concurrency=download_concurrency, use_async=use_async
+    )
+
     for product_id in products_to_use:
         # Do this to clear out any partially downloaded days
         _sanity_check_files_and_move_to_directory(
@@ -137,7 +155,7 @@ def download_eumetsat_data(
         if number_of_processes > 0:
             pool = multiprocessing.Pool(processes=number_of_processes)
             for _ in pool.imap_unordered(
-                _download_time_range,
+                download_time_range,
                 zip(
                     reversed(times_to_use),
                     repeat(product_id),
@@ -152,7 +170,7 @@ def download_eumetsat_data(
             # Want to go from most recent into the past
             for time_range in reversed(times_to_use):
                 inputs = [time_range, product_id, dm]
-                _download_time_range(inputs)
+                download_time_range(inputs)
                 # Sanity check, able to open/right size and move to correct directory
                 _sanity_check_files_and_move_to_directory(
                     directory=download_directory, product_id=product_id
@@ -160,7 +178,9 @@ def download_eumetsat_data(
 
 
 def _download_time_range(
-    x: Tuple[Tuple[datetime, datetime], str, EUMETSATDownloadManager]
+    x: Tuple[Tuple[datetime, datetime], str, EUMETSATDownloadManager],
+    concurrency: int = 1,
+    use_async: bool = False,
 ) -> None:
     time_range, product_id, download_manager = x
     start_time, end_time = time_range
@@ -174,6 +194,8 @@ def _download_time_range(
                 format_dt_str(start_time),
                 format_dt_str(end_time),
                 product_id=product_id,
+                concurrency=concurrency,
+                use_async=use_async,
             )
             complete = True
         except requests.exceptions.ConnectionError:
@@ -183,6 +205,8 @@ def _download_time_range(
                 format_dt_str(start_time),
                 format_dt_str(end_time),
                 product_id=product_id,
+                concurrency=concurrency,
+                use_async=use_async,
             )
             complete = True
         except Exception as e:
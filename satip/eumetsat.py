@@ -12,22 +12,31 @@ Usage example:
 
 import datetime
 import fnmatch
+import functools
+import math
 import os
 import re
 import shutil
+import tempfile
+import threading
 import time
 import urllib
 import zipfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from io import BytesIO
+from typing import List, Optional, Tuple
 from urllib.error import HTTPError
 
 import eumdac
 import fsspec
+import pandas as pd
 import requests
 import structlog
+from eumdac.token import BaseToken, HTTPBearerAuth, URLs
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from satip import utils
+from satip.catalogue_cache import CatalogueCache
 from satip.data_store import dateset_it_to_filename
 
 log = structlog.stdlib.get_logger()
@@ -47,31 +56,191 @@ API_TAILORED_DOWNLOAD_ENDPOINT = API_ENDPOINT + "/epcs/download"
 # Data Tailor time out
 DATA_TAILOR_TIMEOUT_LIMIT_MINUTES = 15
 
+# Size of the chunks read from the response when streaming a Data Store product
+DOWNLOAD_CHUNK_SIZE_BYTES = 1024 * 1024
 
-def _request_access_token(user_key, user_secret):
+# Products smaller than this are buffered in memory, larger ones spill over to a temporary file
+DOWNLOAD_SPOOL_MAX_SIZE_BYTES = 16 * 1024 * 1024
+
+# Defaults for the pooled HTTP session shared by all requests of a download manager
+HTTP_POOL_SIZE = 10
+HTTP_RETRIES = 3
+HTTP_BACKOFF_FACTOR = 0.5
+HTTP_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Maximum number of features the search API returns per page
+SEARCH_PAGE_SIZE = 500
+
+# Number of catalogue search requests made in parallel
+SEARCH_CONCURRENCY = 4
+
+# Access tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 60
+
+
+def make_session(
+    pool_size: int = HTTP_POOL_SIZE,
+    retries: int = HTTP_RETRIES,
+    backoff_factor: float = HTTP_BACKOFF_FACTOR,
+) -> requests.Session:
+    """Creates a HTTP session with a keep-alive connection pool and retries
+
+    Args:
+        pool_size: Number of connections kept alive per host
+        retries: Number of retries on connection errors and retryable status codes
+        backoff_factor: Backoff factor between retries, see `urllib3.util.retry.Retry`
+
+    Returns:
+        session: The configured `requests.Session`
     """
-    Requests an access token from the EUMETSAT data API
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=HTTP_RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "POST"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+def _request_access_token_data(user_key, user_secret, session: requests.Session = None) -> dict:
+    """
+    Requests an access token, and its lifetime, from the EUMETSAT data API
 
     Args:
         user_key: EUMETSAT API key
         user_secret: EUMETSAT API secret
+        session: HTTP session to make the request with, defaults to a new connection
 
     Returns:
-        access_token: API access token
+        token_data: JSON response containing `access_token` and `expires_in`
 
     """
 
     token_url = "https://api.eumetsat.int/token"
 
-    r = requests.post(
+    r = (session or requests).post(
         token_url,
         auth=requests.auth.HTTPBasicAuth(user_key, user_secret),
         data={"grant_type": "client_credentials"},
         headers={"Content-Type": "application/x-www-form-urlencoded"},
     )
-    access_token = r.json()["access_token"]
+    r.raise_for_status()
+
+    return r.json()
+
+
+def _request_access_token(user_key, user_secret, session: requests.Session = None):
+    """
+    Requests an access token from the EUMETSAT data API
+
+    Args:
+        user_key: EUMETSAT API key
+        user_secret: EUMETSAT API secret
+        session: HTTP session to make the request with, defaults to a new connection
+
+    Returns:
+        access_token: API access token
+
+    """
+
+    return _request_access_token_data(user_key, user_secret, session=session)["access_token"]
+
 
-    return access_token
+class AccessTokenProvider(BaseToken):
+    """Thread-safe EUMETSAT API access token which is refreshed shortly before it expires.
+
+    The token is cached together with its expiry time and only requested again
+    once it is within `refresh_margin` seconds of expiring. As it implements the
+    `eumdac` token interface, one provider can be shared between the plain requests
+    made by satip and the `eumdac.DataStore` and `eumdac.DataTailor` objects.
+    """
+
+    def __init__(
+        self,
+        user_key: str,
+        user_secret: str,
+        session: requests.Session = None,
+        refresh_margin: float = TOKEN_REFRESH_MARGIN_SECONDS,
+    ):
+        """Token provider initialisation
+
+        Args:
+            user_key: EUMETSAT API key
+            user_secret: EUMETSAT API secret
+            session: HTTP session to request the tokens with
+            refresh_margin: Seconds before expiry at which the token is refreshed
+        """
+        self.user_key = user_key
+        self.user_secret = user_secret
+        self.session = session
+        self.refresh_margin = refresh_margin
+        self.urls = URLs()
+
+        self._access_token = None
+        self._expiration = 0.0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        """Drop the lock when pickling, e.g. when sent to a multiprocessing pool"""
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        """Recreate the lock when unpickling"""
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return self.access_token
+
+    def _refresh(self):
+        """Requests a new token, must be called with the lock held"""
+        now = time.time()
+        token_data = _request_access_token_data(
+            self.user_key, self.user_secret, session=self.session
+        )
+        self._access_token = token_data["access_token"]
+        self._expiration = now + token_data.get("expires_in", 3600)
+        log.debug(
+            "Requested a new EUMETSAT access token",
+            expiration=datetime.datetime.fromtimestamp(self._expiration).isoformat(),
+            parent="AccessTokenProvider",
+        )
+
+    def refresh(self):
+        """Forces a new access token to be requested, e.g. if the current one was revoked"""
+        with self._lock:
+            self._refresh()
+
+    def _get_token(self) -> Tuple[str, float]:
+        """Returns the cached token and its expiry, refreshing it if it is about to expire"""
+        with self._lock:
+            if self._expiration - time.time() < self.refresh_margin:
+                self._refresh()
+            return self._access_token, self._expiration
+
+    @property
+    def access_token(self) -> str:
+        """The cached token string, refreshed if it is about to expire"""
+        return self._get_token()[0]
+
+    @property
+    def expiration(self) -> datetime.datetime:
+        """Expiration of the current token string"""
+        return datetime.datetime.fromtimestamp(self._get_token()[1])
+
+    @property
+    def auth(self) -> HTTPBearerAuth:
+        """Bearer authentication with the current token, as used by `eumdac`"""
+        return HTTPBearerAuth(self.access_token)
 
 
 def query_data_products(
@@ -80,6 +249,7 @@ def query_data_products(
     start_index: int = 0,
     num_features: int = 10_000,
     product_id: str = "EO:EUM:DAT:MSG:MSG15-RSS",
+    session: requests.Session = None,
 ) -> requests.models.Response:
     """Queries the EUMETSAT-API for the specified product and date-range.
 
@@ -95,6 +265,7 @@ def query_data_products(
         start_index: Starting index of returned entries
         num_features: Number of returned entries
         product_id: ID of the EUMETSAT product requested
+        session: HTTP session to make the request with, defaults to a new connection
 
     Returns:
         r: Response from the request
@@ -112,70 +283,211 @@ def query_data_products(
         "dtend": utils.format_dt_str(end_date),
     }
 
-    r = requests.get(search_url, params=params)
+    r = (session or requests).get(search_url, params=params)
     r.raise_for_status()
 
     return r
 
 
+def _split_time_range(start_date, end_date, num_windows: int) -> List[Tuple[str, str]]:
+    """Splits a time range into equally long consecutive sub-windows
+
+    Args:
+        start_date: Start of the time range
+        end_date: End of the time range
+        num_windows: Number of sub-windows
+
+    Returns:
+        List of (start, end) formatted datetime strings
+    """
+    boundaries = pd.date_range(
+        pd.to_datetime(start_date), pd.to_datetime(end_date), num_windows + 1
+    )
+    return [
+        (utils.format_dt_str(start), utils.format_dt_str(end))
+        for start, end in zip(boundaries[:-1], boundaries[1:])
+    ]
+
+
+def _next_search_windows(
+    start_date: str, end_date: str, r_json: dict, product_id: str
+) -> List[Tuple[str, str]]:
+    """Sub-windows of a searched time range to search next, if its results did not fit in a page
+
+    Shared by the threaded and the asyncio searches, which only differ in how they make
+    the requests.
+
+    Args:
+        start_date: Start of the searched time range
+        end_date: End of the searched time range
+        r_json: Response of the search of the time range
+        product_id: ID of the EUMETSAT product requested
+
+    Returns:
+        List of (start, end) sub-windows, empty if all the results were listed, or if the
+        time range is too short to be split
+    """
+    if len(r_json["features"]) >= r_json["totalResults"]:
+        return []
+
+    if pd.to_datetime(end_date) - pd.to_datetime(start_date) < pd.Timedelta("1 min"):
+        log.warn(
+            f"Too many features to list between {start_date} and {end_date}, "
+            f"only got {len(r_json['features'])} / {r_json['totalResults']}",
+            productID=product_id,
+        )
+        return []
+
+    # Split into twice as many windows as pages needed, so most windows fit into a single page
+    num_windows = 2 * math.ceil(r_json["totalResults"] / SEARCH_PAGE_SIZE)
+    return _split_time_range(start_date, end_date, num_windows)
+
+
+def _merge_search_results(
+    feature_lists: List[list], num_total_results: int, product_id: str
+) -> list:
+    """Merges the features found in the sub-windows of a search, newest first
+
+    Args:
+        feature_lists: Features found in each sub-window
+        num_total_results: Number of results of the search of the whole time range
+        product_id: ID of the EUMETSAT product requested
+
+    Returns:
+        List of the features, without duplicates
+    """
+    # Products overlapping a window boundary are returned for both windows
+    datasets = list(
+        {feature["id"]: feature for features in feature_lists for feature in features}.values()
+    )
+    datasets = sorted(datasets, key=lambda feature: feature["properties"]["date"], reverse=True)
+
+    if num_total_results != len(datasets):
+        log.warn(
+            f"Some features have not been appended - {len(datasets)} / {num_total_results}",
+            productID=product_id,
+        )
+    return datasets
+
+
+def _search_time_range(
+    start_date: str,
+    end_date: str,
+    product_id: str,
+    session: requests.Session = None,
+) -> list:
+    """Gets all the features in a time range, splitting the range until each part fits in a page
+
+    Args:
+        start_date: Start of the query period
+        end_date: End of the query period
+        product_id: ID of the EUMETSAT product requested
+        session: HTTP session to make the requests with
+
+    Returns:
+        List of features, possibly containing duplicates at the window boundaries
+    """
+    r_json = query_data_products(
+        start_date,
+        end_date,
+        num_features=SEARCH_PAGE_SIZE,
+        product_id=product_id,
+        session=session,
+    ).json()
+
+    windows = _next_search_windows(start_date, end_date, r_json, product_id)
+    if not windows:
+        return r_json["features"]
+    return [
+        feature
+        for window in windows
+        for feature in _search_time_range(*window, product_id, session)
+    ]
+
+
 def identify_available_datasets(
-    start_date: str, end_date: str, product_id: str = "EO:EUM:DAT:MSG:MSG15-RSS"
+    start_date: str,
+    end_date: str,
+    product_id: str = "EO:EUM:DAT:MSG:MSG15-RSS",
+    session: requests.Session = None,
+    concurrency: int = SEARCH_CONCURRENCY,
+    catalogue_cache: CatalogueCache = None,
 ):
     """Identifies available datasets from the EUMETSAT data API
 
     Identified available dataset for the specified data product and date-range.
     The dates will accept any format that can be interpreted by `pd.to_datetime`.
 
+    If there are more results than fit in one page of the search API, the date-range
+    is split into sub-windows which are searched in parallel, and the results are
+    merged and de-duplicated on their `id`.
+
     Args:
         start_date: Start of the query period
         end_date: End of the query period
         product_id: ID of the EUMETSAT product requested
-        log: logger to send log messages to, set to None for no logging
+        session: HTTP session to make the requests with, defaults to a new connection per request
+        concurrency: Number of sub-windows searched in parallel
+        catalogue_cache: Local cache of previous searches, only windows which are not
+            cached yet, and the recent edge, are then searched in the API
 
     Returns:
         JSON-formatted response from the request
     """
+    if catalogue_cache is not None:
+        return catalogue_cache.search(
+            start_date,
+            end_date,
+            product_id=product_id,
+            search=functools.partial(
+                _identify_available_datasets, session=session, concurrency=concurrency
+            ),
+        )
+
+    datasets, _ = _identify_available_datasets(
+        start_date, end_date, product_id, session=session, concurrency=concurrency
+    )
+    return datasets
+
+
+def _identify_available_datasets(
+    start_date: str,
+    end_date: str,
+    product_id: str,
+    session: requests.Session = None,
+    concurrency: int = SEARCH_CONCURRENCY,
+) -> Tuple[list, int]:
+    """Searches the available datasets, see `identify_available_datasets`
+
+    Returns:
+        2-tuple of the features, newest first, and of the number of results of the search,
+        which is more than the number of features if some could not be listed
+    """
     log.info(
         f"Identifying which dataset are available for {start_date} {end_date} {product_id}",
         productID=product_id,
     )
 
-    r_json = query_data_products(start_date, end_date, product_id=product_id).json()
+    r_json = query_data_products(
+        start_date, end_date, num_features=SEARCH_PAGE_SIZE, product_id=product_id, session=session
+    ).json()
 
     num_total_results = r_json["totalResults"]
     if log:
         log.info(f"Found {num_total_results} EUMETSAT dataset files", productID=product_id)
 
-    if num_total_results < 500:
-        return r_json["features"]
-
-    datasets = r_json["features"]
-
-    # need to loop in batches of 10_000 until all results are found
-    extra_loops_needed = num_total_results // 500
-
-    new_end_date = datasets[-1]["properties"]["date"].split("/")[1]
-
-    for i in range(extra_loops_needed):
-        # ensure the last loop we only get the remaining assets
-        if i + 1 < extra_loops_needed:
-            num_features = 500
-        else:
-            num_features = num_total_results - len(datasets)
+    windows = _next_search_windows(start_date, end_date, r_json, product_id)
+    if not windows:
+        return r_json["features"], num_total_results
 
-        batch_r_json = query_data_products(
-            start_date, new_end_date, num_features=num_features, product_id=product_id
-        ).json()
-        new_end_date = batch_r_json["features"][-1]["properties"]["date"].split("/")[1]
-        datasets = datasets + batch_r_json["features"]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(_search_time_range, *window, product_id, session)
+            for window in windows
+        ]
+        feature_lists = [future.result() for future in futures]
 
-    if num_total_results != len(datasets):
-        log.warn(
-            f"Some features have not been appended - {len(datasets)} / {num_total_results}",
-            productID=product_id,
-        )
-
-    return datasets
+    return _merge_search_results(feature_lists, num_total_results, product_id), num_total_results
 
 
 # TODO: Passing the access token is redundant, as we call the API with the token in params-arg.
@@ -197,6 +509,34 @@ def dataset_id_to_link(collection_id, data_id, access_token):
         + access_token
     )
 
+def tailor_ids_for_product(product_id: str) -> List[str]:
+    """Returns the Data Tailor product IDs to request for a Data Store product ID
+
+    The 15 minutely SEVIRI data needs both the non-HRV and HRV products.
+
+    Args:
+        product_id: ID of the EUMETSAT Data Store product
+
+    Returns:
+        List of the Data Tailor product IDs
+    """
+    SEVIRI = "HRSEVIRI"
+    SEVIRI_HRV = "HRSEVIRI_HRV"
+    RSS_ID = "HRSEVIRI_RSS"
+    CLM_ID = "MSGCLMK"
+
+    if product_id == "EO:EUM:DAT:MSG:MSG15-RSS":
+        return [RSS_ID]
+    elif product_id == "EO:EUM:DAT:MSG:MSG15":
+        return [SEVIRI_HRV, SEVIRI]
+    elif product_id == "EO:EUM:DAT:MSG:HRSEVIRI":
+        return [SEVIRI_HRV, SEVIRI]
+    elif product_id == "EO:EUM:DAT:MSG:RSS-CLM":
+        return [CLM_ID]
+    else:
+        raise ValueError(f"Product ID {product_id} not recognized, ending now")
+
+
 def get_filesize_megabytes(filename):
     """Returns filesize in megabytes"""
     filesize_bytes = os.path.getsize(filename)
@@ -240,11 +580,18 @@ class EUMETSATDownloadManager:
         user_secret: str,
         data_dir: str,
         native_file_dir: str = ".",
+        download_chunk_size: int = DOWNLOAD_CHUNK_SIZE_BYTES,
+        http_pool_size: int = HTTP_POOL_SIZE,
+        http_retries: int = HTTP_RETRIES,
+        http_backoff_factor: float = HTTP_BACKOFF_FACTOR,
+        catalogue_cache_path: str = None,
+        catalogue_cache_retention: Optional[pd.Timedelta] = None,
     ):
         """Download manager initialisation
 
         Initialises the download manager by:
-        * Requesting an API access token
+        * Creating a pooled HTTP session used for all the API requests
+        * Requesting an API access token, shared with the eumdac Data Store and Data Tailor
         * Configuring the download directory
         * Adding satip helper functions
 
@@ -253,11 +600,24 @@ class EUMETSATDownloadManager:
             user_secret: EUMETSAT API secret
             data_dir: Path to the directory where the satellite data will be saved
             native_file_dir: this is where the native files are saved
+            download_chunk_size: Size in bytes of the chunks streamed to disk when
+                downloading a product from the Data Store
+            http_pool_size: Number of keep-alive connections in the HTTP session pool
+            http_retries: Number of retries on connection errors and retryable status codes
+            http_backoff_factor: Backoff factor between HTTP retries
+            catalogue_cache_path: Local path of a SQLite catalogue cache, so closed time
+                windows are only searched once. Defaults to no caching
+            catalogue_cache_retention: Cached windows ending longer than this before the
+                start of a search are pruned, see `CatalogueCache`. Defaults to keeping them
 
         Returns:
             download_manager: Instance of the DownloadManager class
         """
 
+        self.session = make_session(
+            pool_size=http_pool_size, retries=http_retries, backoff_factor=http_backoff_factor
+        )
+
         # Requesting the API access token
         self.user_key = user_key
         self.user_secret = user_secret
@@ -267,6 +627,7 @@ class EUMETSATDownloadManager:
         # Configuring the data directory
         self.data_dir = data_dir
         self.native_file_dir = native_file_dir
+        self.download_chunk_size = download_chunk_size
 
         if not os.path.exists(self.data_dir):
             try:
@@ -274,19 +635,35 @@ class EUMETSATDownloadManager:
             except PermissionError:
                 raise PermissionError(f"No permission to create {self.data_dir}.")
 
-        # Adding satip helper functions
-        self.identify_available_datasets = identify_available_datasets
-        self.query_data_products = query_data_products
+        self.catalogue_cache = (
+            CatalogueCache(catalogue_cache_path, retention=catalogue_cache_retention)
+            if catalogue_cache_path is not None
+            else None
+        )
+
+        # Adding satip helper functions, bound to the pooled session and catalogue cache
+        self.identify_available_datasets = functools.partial(
+            identify_available_datasets,
+            session=self.session,
+            catalogue_cache=self.catalogue_cache,
+        )
+        self.query_data_products = functools.partial(query_data_products, session=self.session)
 
         return
 
+    @property
+    def access_token(self) -> str:
+        """The current API access token, refreshed shortly before it expires"""
+        return self.token.access_token
+
     def request_access_token(self, user_key=None, user_secret=None):
         """Requests an access token from the EUMETSAT data API.
 
         If no key or secret are provided then they will default
         to the values provided in the download manager initialisation.
 
-        The requested token is stored in the respective class field.
+        The requested token is stored in the token provider of the download manager,
+        which afterwards refreshes it by itself before it expires.
 
         Args:
             user_key: EUMETSAT API key
@@ -298,31 +675,61 @@ class EUMETSATDownloadManager:
         if user_secret is None:
             user_secret = self.user_secret
 
-        self.access_token = _request_access_token(user_key, user_secret)
+        token = getattr(self, "token", None)
+        if token is None or (token.user_key, token.user_secret) != (user_key, user_secret):
+            self.token = AccessTokenProvider(user_key, user_secret, session=self.session)
+            self.datastore = eumdac.DataStore(self.token)
+            self.datatailor = eumdac.DataTailor(self.token)
+
+        # Requesting the token straight away checks the credentials are valid
+        self.token.refresh()
 
         return
 
-    def download_single_dataset(self, data_link: str):
+    def download_single_dataset(self, data_link: str, chunk_size: int = None) -> List[str]:
         """Downloads a single dataset from the EUMETSAT API
 
+        The zipped product is streamed in chunks into a spooled temporary file,
+        so only a small buffer is held in memory no matter the size of the product,
+        and is then extracted into the data directory.
+
         Args:
             data_link: Url link for the relevant dataset
+            chunk_size: Size in bytes of the streamed chunks, defaults to the
+                value given at initialisation
+
+        Returns:
+            List of the extracted filenames
         """
 
         log.info(f"Downloading one file: {data_link}", parent="DownloadManager")
 
+        if chunk_size is None:
+            chunk_size = self.download_chunk_size
+
         params = {"access_token": self.access_token}
 
-        r = requests.get(data_link, params=params)
-        r.raise_for_status()
+        with self.session.get(data_link, params=params, stream=True) as r:
+            r.raise_for_status()
 
-        zipped_files = zipfile.ZipFile(BytesIO(r.content))
-        zipped_files.extractall(f"{self.data_dir}")
+            with tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_MAX_SIZE_BYTES) as f:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                f.seek(0)
 
-        return
+                with zipfile.ZipFile(f) as zipped_files:
+                    zipped_files.extractall(f"{self.data_dir}")
+                    names = zipped_files.namelist()
+
+        return [os.path.join(self.data_dir, name) for name in names]
 
     def download_date_range(
-        self, start_date: str, end_date: str, product_id="EO:EUM:DAT:MSG:MSG15-RSS"
+        self,
+        start_date: str,
+        end_date: str,
+        product_id="EO:EUM:DAT:MSG:MSG15-RSS",
+        concurrency: int = 1,
+        use_async: bool = False,
     ):
         """Downloads a date-range-specific dataset from the EUMETSAT API
 
@@ -330,17 +737,54 @@ class EUMETSATDownloadManager:
             start_date: Start of the requested data period
             end_date: End of the requested data period
             product_id: ID of the EUMETSAT product requested
+            concurrency: Number of datasets to download in parallel, defaults to 1
+            use_async: Whether to search and download with the asyncio engine
+                in `satip.eumetsat_async` instead of threads
         """
 
-        datasets = identify_available_datasets(start_date, end_date, product_id=product_id)
-        self.download_datasets(datasets, product_id=product_id)
+        if use_async:
+            from satip.eumetsat_async import run_download_date_range
 
-    def download_datasets(self, datasets, product_id="EO:EUM:DAT:MSG:MSG15-RSS"):
+            run_download_date_range(
+                self, start_date, end_date, product_id=product_id, concurrency=concurrency
+            )
+            return
+
+        datasets = self.identify_available_datasets(start_date, end_date, product_id=product_id)
+        self.download_datasets(datasets, product_id=product_id, concurrency=concurrency)
+
+    def download_single_dataset_with_retry(self, dataset_id, product_id) -> List[str]:
+        """Downloads a single dataset, refreshing the access token and retrying on an HTTP error
+
+        Args:
+            dataset_id: Dataset ID to download
+            product_id: Product ID to determine the link for the request
+
+        Returns:
+            List of the extracted filenames
+        """
+        log.debug(f"Downloading: {dataset_id}", parent="DownloadManager")
+        dataset_link = dataset_id_to_link(product_id, dataset_id, access_token=self.access_token)
+        # Download the raw data
+        try:
+            return self.download_single_dataset(dataset_link)
+        except (HTTPError, requests.exceptions.HTTPError):
+            log.debug("The EUMETSAT access token has been refreshed", parent="DownloadManager")
+            self.request_access_token()
+            dataset_link = dataset_id_to_link(
+                product_id, dataset_id, access_token=self.access_token
+            )
+            return self.download_single_dataset(dataset_link)
+
+    def download_datasets(
+        self, datasets, product_id="EO:EUM:DAT:MSG:MSG15-RSS", concurrency: int = 1
+    ):
         """Downloads a product-id- and date-range-specific dataset from the EUMETSAT API
 
         Args:
             datasets: list of datasets returned by `identify_available_datasets`
             product_id: ID of the EUMETSAT product requested
+            concurrency: Number of datasets to download in parallel, defaults to 1
         """
 
         # Identifying dataset ids to download
@@ -354,27 +798,44 @@ class EUMETSATDownloadManager:
             )
             return
 
-        for dataset_id in dataset_ids:
-            log.debug(f"Downloading: {dataset_id}", parent="DownloadManager")
-            dataset_link = dataset_id_to_link(
-                product_id, dataset_id, access_token=self.access_token
-            )
-            # Download the raw data
-            try:
-                self.download_single_dataset(dataset_link)
-            except HTTPError:
-                log.debug("The EUMETSAT access token has been refreshed", parent="DownloadManager")
-                self.request_access_token()
-                dataset_link = dataset_id_to_link(
-                    product_id, dataset_id, access_token=self.access_token
-                )
-                self.download_single_dataset(dataset_link)
-            except Exception as e:
-                log.error(
-                    f"Error downloading dataset with id {dataset_id}: {e}",
-                    exc_info=True,
-                    parent="DownloadManager",
-                )
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {
+                executor.submit(
+                    self.download_single_dataset_with_retry,
+                    dataset_id,
+                    product_id,
+                ): dataset_id
+                for dataset_id in dataset_ids
+            }
+
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    log.error(
+                        f"Error downloading dataset with id {futures[future]}: {e}",
+                        exc_info=True,
+                        parent="DownloadManager",
+                    )
+
+    def download_datasets_async(
+        self, datasets, product_id="EO:EUM:DAT:MSG:MSG15-RSS", concurrency: int = 16
+    ):
+        """Downloads datasets with the asyncio engine, keeping `concurrency` downloads in flight
+
+        Args:
+            datasets: list of datasets returned by `identify_available_datasets`
+            product_id: ID of the EUMETSAT product requested
+            concurrency: Number of datasets downloaded at the same time
+
+        Returns:
+            List of the extracted filenames
+        """
+        from satip.eumetsat_async import run_download_datasets
+
+        return run_download_datasets(
+            self, datasets, product_id=product_id, concurrency=concurrency
+        )
 
     def download_tailored_date_range(
         self,
@@ -399,7 +860,7 @@ class EUMETSATDownloadManager:
             projection: Projection of the stored data, defaults to 'geographic'
         """
 
-        datasets = identify_available_datasets(start_date, end_date, product_id=product_id)
+        datasets = self.identify_available_datasets(start_date, end_date, product_id=product_id)
         self.download_tailored_datasets(
             datasets, product_id=product_id, file_format=file_format, projection=projection, roi=roi
         )
@@ -413,7 +874,7 @@ class EUMETSATDownloadManager:
         projection,
         attempts=2,
     ):
-        """Attempts to download a dataset, retrying once if an exception occurs
+        """Attempts to download a dataset, retrying if an exception occurs
 
         Args:
             dataset_id: Dataset ID to download
@@ -422,25 +883,26 @@ class EUMETSATDownloadManager:
             file_format: File format of the output, defaults to 'geotiff'
             projection: Projection for the output, defaults to native projection of 'geographic'
             attempts: Number of attempts to make (1 attempt + retries)
+
+        Returns:
+            List of the downloaded filenames
         """
         for attempt in range(attempts):
             try:
-                self._download_single_tailored_dataset(
+                return self._download_single_tailored_dataset(
                     dataset_id,
                     product_id,
                     roi,
                     file_format,
                     projection,
                 )
-                break  # Break if the download succeeds
             except Exception as e:
                 if attempt < attempts - 1:
-                    # Log and retry, possibly refreshing the token
+                    # Log and retry, the token provider refreshes the token if it is expiring
                     log.debug(
-                        "Attempting to refresh the EUMETSAT access token and retry download",
+                        f"Retrying download of {dataset_id} after error: {e}",
                         parent="DownloadManager"
                     )
-                    self.request_access_token()
                 else:
                     # Final attempt failed, raise exception
                     raise e
@@ -463,10 +925,16 @@ class EUMETSATDownloadManager:
             roi: Region of Interest, None if want the whole original area
             file_format: File format to request, multiple options, primarily 'netcdf4' and 'geotiff'
             projection: Projection of the stored data, defaults to 'geographic'
-            concurrency: concurrency for parallel download, defaults to 1. concurrency should not
-                exceed 3 because the data tailor only takes 3 jobs at a time
+            concurrency: Number of customisation outputs downloaded at the same time,
+                defaults to 1. The customisations always use all the free slots of the
+                Data Tailor, which only takes 3 jobs at a time
+
+        Returns:
+            List of the downloaded filenames
         """
 
+        from satip.data_tailor_scheduler import DataTailorScheduler
+
         # Identifying dataset ids to download
         dataset_ids = sorted([dataset["id"] for dataset in datasets])
         log.debug(f"Dataset IDS: {dataset_ids}", parent="DownloadManager")
@@ -477,26 +945,27 @@ class EUMETSATDownloadManager:
                 parent="DownloadManager",
             )
             return
-        with ThreadPoolExecutor(max_workers=concurrency) as executor:
-            futures = [
-                executor.submit(
-                    self.download_single_tailored_dataset_with_retry,
-                    dataset_id,
-                    product_id,
-                    roi,
-                    file_format,
-                    projection,
-                ) for dataset_id in dataset_ids
-            ]
 
-            for future in as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    log.error(
-                        f"Failed to download dataset after retrying: {e}",
-                        parent="DownloadManager"
-                    )
+        # Queue all the customisations, so a new one starts as soon as a slot is free
+        tailor_ids = tailor_ids_for_product(product_id)
+        scheduler = DataTailorScheduler(self, download_workers=concurrency)
+        for dataset_id in dataset_ids:
+            try:
+                product = self.datastore.get_product("EO:EUM:DAT:MSG:HRSEVIRI", dataset_id)
+            except Exception as e:
+                log.error(f"Failed to get product {dataset_id}: {e}", parent="DownloadManager")
+                continue
+            for tailor_id in tailor_ids:
+                scheduler.submit(
+                    product,
+                    tailor_id=tailor_id,
+                    roi=roi,
+                    file_format=file_format,
+                    projection=projection,
+                )
+
+        jobs = scheduler.run(attempts=2)
+        return [job.filename for job in jobs if job.filename is not None]
 
     def _download_single_tailored_dataset(
         self,
@@ -516,56 +985,26 @@ class EUMETSATDownloadManager:
             file_format: File format of the output, defaults to 'geotiff'
             projection: Projection for the output, defaults to native projection of 'geographic'
 
-        return string where the dataset has been saved
+        return list of strings where the datasets have been saved
         """
 
-        SEVIRI = "HRSEVIRI"
-        SEVIRI_HRV = "HRSEVIRI_HRV"
-        RSS_ID = "HRSEVIRI_RSS"
-        CLM_ID = "MSGCLMK"
-
-        if product_id == "EO:EUM:DAT:MSG:MSG15-RSS":
-            tailor_id = RSS_ID
-        elif product_id == "EO:EUM:DAT:MSG:MSG15":
-            tailor_id = SEVIRI
-        elif product_id == "EO:EUM:DAT:MSG:HRSEVIRI":
-            tailor_id = SEVIRI
-        elif product_id == "EO:EUM:DAT:MSG:RSS-CLM":
-            tailor_id = CLM_ID
-        else:
-            raise ValueError(f"Product ID {product_id} not recognized, ending now")
-
-        if tailor_id == SEVIRI:  # Also do HRV
-            credentials = (self.user_key, self.user_secret)
-            token = eumdac.AccessToken(credentials)
-            datastore = eumdac.DataStore(token)
-            product_id = datastore.get_product("EO:EUM:DAT:MSG:HRSEVIRI", dataset_id)
+        tailor_ids = tailor_ids_for_product(product_id)
+        product = self.datastore.get_product("EO:EUM:DAT:MSG:HRSEVIRI", dataset_id)
+
+        return [
             self.create_and_download_datatailor_data(
-                dataset_id=product_id,
-                tailor_id=SEVIRI_HRV,
+                dataset_id=product,
+                tailor_id=tailor_id,
                 roi=roi,
                 file_format=file_format,
                 projection=projection,
             )
-
-        credentials = (self.user_key, self.user_secret)
-        token = eumdac.AccessToken(credentials)
-        datastore = eumdac.DataStore(token)
-        product_id = datastore.get_product("EO:EUM:DAT:MSG:HRSEVIRI", dataset_id)
-        self.create_and_download_datatailor_data(
-            dataset_id=product_id,
-            tailor_id=tailor_id,
-            roi=roi,
-            file_format=file_format,
-            projection=projection,
-        )
+            for tailor_id in tailor_ids
+        ]
 
     def cleanup_datatailor(self):
         """Remove all Data Tailor runs"""
-        credentials = (self.user_key, self.user_secret)
-        token = eumdac.AccessToken(credentials)
-        datatailor = eumdac.DataTailor(token)
-        for customisation in datatailor.customisations:
+        for customisation in self.datatailor.customisations:
             try:
                 if customisation.status in ['INACTIVE']:
                     customisation.kill()
@@ -577,6 +1016,7 @@ class EUMETSATDownloadManager:
                     customisation.delete()
             except Exception as e:
                 log.debug(f"Failed customization delete because of: {e}")
+
     def create_and_download_datatailor_data(
         self,
         dataset_id,
@@ -588,136 +1028,111 @@ class EUMETSATDownloadManager:
     ):
         """
         Create and download a single data tailor call
+
+        The customisation is run through a `DataTailorScheduler`, which waits for
+        a free Data Tailor slot, polls the customisation and downloads its output.
+
+        return string where the dataset has been saved
         """
+        from satip.data_tailor_scheduler import DataTailorScheduler
+
+        scheduler = DataTailorScheduler(self, download_workers=1)
+        job = scheduler.submit(
+            dataset_id,
+            tailor_id=tailor_id,
+            roi=roi,
+            file_format=file_format,
+            projection=projection,
+            compression=compression,
+        )
+        scheduler.run(attempts=1)
+
+        if job.error is not None:
+            raise job.error
+        return job.filename
+
+    def copy_from_native_file_store(self, dataset_id, tailor_id: str) -> Optional[str]:
+        """Copies a tailored dataset from the native file store into the data directory
 
-        # check data store, if its there use this instead
+        Args:
+            dataset_id: Data Store product of the dataset
+            tailor_id: Data Tailor product ID the dataset was tailored to
+
+        Returns:
+            The local filename, or None if the dataset is not in the native file store
+        """
         data_store_filename_remote = dateset_it_to_filename(
             dataset_id, tailor_id, self.native_file_dir
         )
         data_store_filename_local = dateset_it_to_filename(dataset_id, tailor_id, self.data_dir)
 
         fs = fsspec.open(data_store_filename_remote).fs
-        if fs.exists(data_store_filename_remote):
-            # copy to 'data_dir'
-            log.debug(
-                f"Copying file from {data_store_filename_remote} to {data_store_filename_local}",
-                parent="DownloadManager",
-            )
-            fs.get(data_store_filename_remote, data_store_filename_local)
-
-        else:
+        if not fs.exists(data_store_filename_remote):
             log.debug(
                 f"{data_store_filename_remote} does not exist, so will download it",
                 parent="DownloadManager",
             )
+            return None
 
-            log.debug("Making customisation, this can take ~1 minute", parent="DownloadManager")
-            chain = eumdac.tailor_models.Chain(
-                product=tailor_id,
-                format=file_format,
-                projection=projection,
-                roi=roi,
-                compression=compression,
-            )
+        # copy to 'data_dir'
+        log.debug(
+            f"Copying file from {data_store_filename_remote} to {data_store_filename_local}",
+            parent="DownloadManager",
+        )
+        fs.get(data_store_filename_remote, data_store_filename_local)
+        return data_store_filename_local
 
-            datatailor = eumdac.DataTailor(eumdac.AccessToken((self.user_key, self.user_secret)))
+    def download_customisation_output(self, customisation, dataset_id, tailor_id: str) -> str:
+        """Downloads the output of a finished customisation, then deletes the customisation
 
-            # sometimes the customisation fails first time, so we try twice
-            # This is from Data Tailor only allowing 3 customizations at once
-            # So this should then continue until it is created successfully
-            created_customization = False
-            # 5 minute timeout here
-            start = datetime.datetime.now()
-            while not created_customization and (datetime.datetime.now() - start).seconds < 600:
-                try:
-                    num_running_customizations = 0
-                    for customisation in datatailor.customisations:
-                        if customisation.status in ['INACTIVE']: # Clear stuck ones
-                            customisation.kill()
-                            customisation.delete()
-                        if customisation.status in ['RUNNING','QUEUED', 'INACTIVE']:
-                            num_running_customizations += 1
-                    if num_running_customizations < 3:
-                        customisation = datatailor.new_customisation(dataset_id, chain=chain)
-                        created_customization = True
-                except Exception:
-                    log.debug("Customization not made successfully, so "
-                              "trying again after less than 3 customizations")
-                    time.sleep(3)
-                    continue
-
-            sleep_time = 5  # seconds
-            log.debug(f"Customisation: {customisation}", parent="DownloadManager")
-            # Customisation Loop
-            now = datetime.datetime.now(tz=datetime.timezone.utc)
-            start = datetime.datetime.now(tz=datetime.timezone.utc)
-            status = datatailor.get_customisation(customisation._id).status
-            while (status != "DONE") & (
-                now - start < datetime.timedelta(minutes=DATA_TAILOR_TIMEOUT_LIMIT_MINUTES)
-            ):
-
-                log.debug(
-                    f"Checking if the file has been downloaded. Started at {start}. "
-                    f"Time out is {DATA_TAILOR_TIMEOUT_LIMIT_MINUTES} minutes",
-                    parent="DownloadManager",
-                )
+        The output is saved in the data directory and copied to the native file store.
 
-                # Get the status of the ongoing customisation
-                status = datatailor.get_customisation(customisation._id).status
-                now = datetime.datetime.now(tz=datetime.timezone.utc)
-                log.info(f"Status of ID {customisation._id} is {status}", parent="DownloadManager")
-
-                if "DONE" == status:
-                    break
-                elif "ERROR" in status or "KILLED" in status:
-                    log.info("UNSUCCESS, exiting", parent="DownloadManager")
-                    break
-
-                time.sleep(sleep_time)
-
-            if status != "DONE":
-                log.info(
-                    f"UNSUCCESS, data tailor service took more that "
-                    f"{DATA_TAILOR_TIMEOUT_LIMIT_MINUTES} minutes. "
-                    f"The service may fail later on now",
-                    parent="DownloadManager",
-                )
-            else:
-                log.info("Customisation as been made", parent="DownloadManager")
+        Args:
+            customisation: The finished `eumdac` customisation
+            dataset_id: Data Store product of the dataset
+            tailor_id: Data Tailor product ID the dataset was tailored to
+
+        Returns:
+            The local filename of the output
+        """
+        data_store_filename_remote = dateset_it_to_filename(
+            dataset_id, tailor_id, self.native_file_dir
+        )
 
-            customisation = datatailor.get_customisation(customisation._id)
-            (out,) = fnmatch.filter(customisation.outputs, "*")
-            jobID = customisation._id
+        (out,) = fnmatch.filter(customisation.outputs, "*")
+        jobID = customisation._id
+        log.info(
+            f"Downloading outputs from Data Tailor job {jobID}. This can take ~2 minutes",
+            parent="DownloadManager",
+        )
+
+        with customisation.stream_output(
+            out,
+        ) as stream, open(os.path.join(self.data_dir, stream.name), mode="wb") as fdst:
+            filename = os.path.join(self.data_dir, stream.name)
+            shutil.copyfileobj(stream, fdst)
+            log.debug(f"Saved file to {filename}", parent="DownloadManager")
+
+        # save to native file data store
+        log.debug(
+            f"Copying file from {filename} to {data_store_filename_remote}",
+            parent="DownloadManager",
+        )
+        fs = fsspec.open(data_store_filename_remote).fs
+        fs.put(filename, data_store_filename_remote)
+        log.debug(
+            f"Copied file from {filename} to {data_store_filename_remote}",
+            parent="DownloadManager",
+        )
+
+        try:
             log.info(
-                f"Downloading outputs from Data Tailor job {jobID}. This can take ~2 minutes",
+                f"Deleting job {jobID} from Data Tailor storage. This can take ~1 minute",
                 parent="DownloadManager",
             )
+            customisation.delete()
 
-            with customisation.stream_output(
-                out,
-            ) as stream, open(os.path.join(self.data_dir, stream.name), mode="wb") as fdst:
-                filename = os.path.join(self.data_dir, stream.name)
-                shutil.copyfileobj(stream, fdst)
-                log.debug(f"Saved file to {filename}", parent="DownloadManager")
-
-                # save to native file data store
-                log.debug(
-                    f"Copying file from {filename} to {data_store_filename_remote}",
-                    parent="DownloadManager",
-                )
-                fs = fsspec.open(data_store_filename_remote).fs
-                fs.put(filename, data_store_filename_remote)
-                log.debug(
-                    f"Copied file from {filename} to {data_store_filename_remote}",
-                    parent="DownloadManager",
-                )
-
-            try:
-                log.info(
-                    f"Deleting job {jobID} from Data Tailor storage. This can take ~1 minute",
-                    parent="DownloadManager",
-                )
-                customisation.delete()
+        except Exception as e:
+            log.warn(f"Failed deleting customization {jobID}: {e}", exc_info=True)
 
-            except Exception as e:
-                log.warn(f"Failed deleting customization {jobID}: {e}", exc_info=True)
+        return filename
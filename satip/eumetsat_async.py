@@ -0,0 +1,356 @@
+"""Asynchronous download engine for the EUMETSAT Data Store.
+
+Searches the catalogue and streams products from the Data Store with `aiohttp`,
+so one process can keep many downloads in flight without threads or multiprocessing.
+The number of concurrent downloads is bounded by a semaphore, and the extracted files
+are written through `fsspec`, so the data directory can be on any backend.
+
+Usage example:
+  from satip.eumetsat import EUMETSATDownloadManager
+  from satip.eumetsat_async import run_download_date_range
+  dm = EUMETSATDownloadManager(user_key, user_secret, download_directory)
+  run_download_date_range(dm, start_date, end_date, product_id, concurrency=16)
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import List
+
+import aiohttp
+import fsspec
+import structlog
+
+from satip import utils
+from satip.eumetsat import (
+    API_ENDPOINT,
+    DOWNLOAD_SPOOL_MAX_SIZE_BYTES,
+    HTTP_BACKOFF_FACTOR,
+    HTTP_RETRIES,
+    HTTP_RETRY_STATUS_CODES,
+    SEARCH_CONCURRENCY,
+    SEARCH_PAGE_SIZE,
+    EUMETSATDownloadManager,
+    _merge_search_results,
+    _next_search_windows,
+    dataset_id_to_link,
+)
+
+log = structlog.stdlib.get_logger()
+
+# Number of products downloaded at the same time
+DOWNLOAD_CONCURRENCY = 16
+
+
+async def _get_with_retries(session: aiohttp.ClientSession, url: str, **kwargs):
+    """Makes a GET request, retrying with backoff on connection errors and retryable statuses
+
+    Returns:
+        The response, which has to be released by the caller
+    """
+    for attempt in range(HTTP_RETRIES + 1):
+        try:
+            response = await session.get(url, **kwargs)
+            if response.status not in HTTP_RETRY_STATUS_CODES or attempt == HTTP_RETRIES:
+                return response
+            response.release()
+        except aiohttp.ClientConnectionError:
+            if attempt == HTTP_RETRIES:
+                raise
+        await asyncio.sleep(HTTP_BACKOFF_FACTOR * 2**attempt)
+
+
+async def query_data_products(
+    session: aiohttp.ClientSession,
+    start_date: str,
+    end_date: str,
+    start_index: int = 0,
+    num_features: int = SEARCH_PAGE_SIZE,
+    product_id: str = "EO:EUM:DAT:MSG:MSG15-RSS",
+) -> dict:
+    """Queries the EUMETSAT-API for the specified product and date-range.
+
+    Asynchronous version of `satip.eumetsat.query_data_products`.
+
+    Args:
+        session: aiohttp session to make the request with
+        start_date: Start of the query period
+        end_date: End of the query period
+        start_index: Starting index of returned entries
+        num_features: Number of returned entries
+        product_id: ID of the EUMETSAT product requested
+
+    Returns:
+        JSON response of the request
+    """
+    params = {
+        "format": "json",
+        "pi": product_id,
+        "si": start_index,
+        "c": num_features,
+        "sort": "start,time,0",
+        "dtstart": utils.format_dt_str(start_date),
+        "dtend": utils.format_dt_str(end_date),
+    }
+
+    response = await _get_with_retries(
+        session, API_ENDPOINT + "/data/search-products/1.0.0/os", params=params
+    )
+    async with response:
+        response.raise_for_status()
+        return await response.json(content_type=None)
+
+
+async def _search_time_range(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    start_date: str,
+    end_date: str,
+    product_id: str,
+) -> list:
+    """Gets all the features in a time range, splitting the range until each part fits in a page"""
+    async with semaphore:
+        r_json = await query_data_products(
+            session, start_date, end_date, product_id=product_id
+        )
+
+    windows = _next_search_windows(start_date, end_date, r_json, product_id)
+    if not windows:
+        return r_json["features"]
+    results = await asyncio.gather(
+        *[_search_time_range(session, semaphore, *window, product_id) for window in windows]
+    )
+    return [feature for result in results for feature in result]
+
+
+async def identify_available_datasets(
+    session: aiohttp.ClientSession,
+    start_date: str,
+    end_date: str,
+    product_id: str = "EO:EUM:DAT:MSG:MSG15-RSS",
+    concurrency: int = SEARCH_CONCURRENCY,
+) -> list:
+    """Identifies available datasets from the EUMETSAT data API
+
+    Asynchronous version of `satip.eumetsat.identify_available_datasets`, searching
+    sub-windows of the date-range concurrently if the results do not fit in one page.
+
+    Args:
+        session: aiohttp session to make the requests with
+        start_date: Start of the query period
+        end_date: End of the query period
+        product_id: ID of the EUMETSAT product requested
+        concurrency: Number of search requests made at the same time
+
+    Returns:
+        List of features, newest first
+    """
+    log.info(
+        f"Identifying which dataset are available for {start_date} {end_date} {product_id}",
+        productID=product_id,
+    )
+
+    r_json = await query_data_products(session, start_date, end_date, product_id=product_id)
+    num_total_results = r_json["totalResults"]
+    log.info(f"Found {num_total_results} EUMETSAT dataset files", productID=product_id)
+
+    windows = _next_search_windows(start_date, end_date, r_json, product_id)
+    if not windows:
+        return r_json["features"]
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(
+        *[_search_time_range(session, semaphore, *window, product_id) for window in windows]
+    )
+    return _merge_search_results(results, num_total_results, product_id)
+
+
+def _extract_zip(zipped_file, data_dir: str) -> List[str]:
+    """Extracts all the files of a zip file into a directory on any fsspec backend
+
+    Returns:
+        List of the extracted filenames
+    """
+    filenames = []
+    with zipfile.ZipFile(zipped_file) as zipped_files:
+        for name in zipped_files.namelist():
+            filename = os.path.join(data_dir, name)
+            with zipped_files.open(name) as src, fsspec.open(filename, mode="wb") as dst:
+                shutil.copyfileobj(src, dst)
+            filenames.append(filename)
+    return filenames
+
+
+async def download_single_dataset(
+    session: aiohttp.ClientSession,
+    download_manager: EUMETSATDownloadManager,
+    dataset_id: str,
+    product_id: str,
+) -> List[str]:
+    """Streams a single dataset from the Data Store and extracts it into the data directory
+
+    The product is streamed in chunks into a spooled temporary file, and extracted in a
+    worker thread, so the event loop is never blocked by disk or object store writes.
+    The access token is refreshed and the download retried once if it is rejected.
+
+    Args:
+        session: aiohttp session to make the request with
+        download_manager: Download manager holding the access token and data directory
+        dataset_id: Dataset ID to download
+        product_id: Product ID to determine the link for the request
+
+    Returns:
+        List of the extracted filenames
+    """
+    log.debug(f"Downloading: {dataset_id}", parent="DownloadManager")
+
+    for attempt in range(2):
+        access_token = await asyncio.to_thread(lambda: download_manager.access_token)
+        link = dataset_id_to_link(product_id, dataset_id, access_token=access_token)
+
+        response = await _get_with_retries(session, link, params={"access_token": access_token})
+        async with response:
+            if response.status == 401 and attempt == 0:
+                log.debug("The EUMETSAT access token has been refreshed", parent="DownloadManager")
+                await asyncio.to_thread(download_manager.token.refresh)
+                continue
+            response.raise_for_status()
+
+            with tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_SPOOL_MAX_SIZE_BYTES) as f:
+                async for chunk in response.content.iter_chunked(
+                    download_manager.download_chunk_size
+                ):
+                    # Written to disk once the file is larger than the spool size
+                    await asyncio.to_thread(f.write, chunk)
+                f.seek(0)
+
+                return await asyncio.to_thread(_extract_zip, f, download_manager.data_dir)
+
+
+async def download_datasets(
+    session: aiohttp.ClientSession,
+    download_manager: EUMETSATDownloadManager,
+    datasets: list,
+    product_id: str = "EO:EUM:DAT:MSG:MSG15-RSS",
+    concurrency: int = DOWNLOAD_CONCURRENCY,
+) -> List[str]:
+    """Downloads datasets from the Data Store, keeping at most `concurrency` in flight
+
+    Args:
+        session: aiohttp session to make the requests with
+        download_manager: Download manager holding the access token and data directory
+        datasets: list of datasets returned by `identify_available_datasets`
+        product_id: ID of the EUMETSAT product requested
+        concurrency: Number of datasets downloaded at the same time
+
+    Returns:
+        List of the extracted filenames
+    """
+    dataset_ids = sorted([dataset["id"] for dataset in datasets])
+    if not dataset_ids:
+        log.info(
+            "No files will be downloaded. None were found in API search.",
+            parent="DownloadManager",
+        )
+        return []
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _download(dataset_id):
+        async with semaphore:
+            return await download_single_dataset(session, download_manager, dataset_id, product_id)
+
+    results = await asyncio.gather(
+        *[_download(dataset_id) for dataset_id in dataset_ids], return_exceptions=True
+    )
+
+    filenames = []
+    for dataset_id, result in zip(dataset_ids, results):
+        if isinstance(result, Exception):
+            log.error(
+                f"Error downloading dataset with id {dataset_id}: {result}",
+                exc_info=result,
+                parent="DownloadManager",
+            )
+        else:
+            filenames += result
+    return filenames
+
+
+def _make_session(concurrency: int) -> aiohttp.ClientSession:
+    """Creates an aiohttp session with enough connections for the downloads and searches"""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=concurrency + SEARCH_CONCURRENCY),
+        timeout=aiohttp.ClientTimeout(total=None, sock_read=300),
+    )
+
+
+async def _download_datasets(download_manager, datasets, product_id, concurrency):
+    async with _make_session(concurrency) as session:
+        return await download_datasets(
+            session, download_manager, datasets, product_id=product_id, concurrency=concurrency
+        )
+
+
+async def _download_date_range(download_manager, start_date, end_date, product_id, concurrency):
+    async with _make_session(concurrency) as session:
+        if download_manager.catalogue_cache is not None:
+            datasets = await asyncio.to_thread(
+                download_manager.identify_available_datasets,
+                start_date,
+                end_date,
+                product_id=product_id,
+            )
+        else:
+            datasets = await identify_available_datasets(
+                session, start_date, end_date, product_id=product_id
+            )
+        return await download_datasets(
+            session, download_manager, datasets, product_id=product_id, concurrency=concurrency
+        )
+
+
+def run_download_datasets(
+    download_manager: EUMETSATDownloadManager,
+    datasets: list,
+    product_id: str = "EO:EUM:DAT:MSG:MSG15-RSS",
+    concurrency: int = DOWNLOAD_CONCURRENCY,
+) -> List[str]:
+    """Synchronous wrapper running `download_datasets` in a new event loop
+
+    Args:
+        download_manager: Download manager holding the access token and data directory
+        datasets: list of datasets returned by `identify_available_datasets`
+        product_id: ID of the EUMETSAT product requested
+        concurrency: Number of datasets downloaded at the same time
+
+    Returns:
+        List of the extracted filenames
+    """
+    return asyncio.run(_download_datasets(download_manager, datasets, product_id, concurrency))
+
+
+def run_download_date_range(
+    download_manager: EUMETSATDownloadManager,
+    start_date: str,
+    end_date: str,
+    product_id: str = "EO:EUM:DAT:MSG:MSG15-RSS",
+    concurrency: int = DOWNLOAD_CONCURRENCY,
+) -> List[str]:
+    """Synchronous wrapper searching and downloading a date-range in a new event loop
+
+    Args:
+        download_manager: Download manager holding the access token and data directory
+        start_date: Start of the requested data period
+        end_date: End of the requested data period
+        product_id: ID of the EUMETSAT product requested
+        concurrency: Number of datasets downloaded at the same time
+
+    Returns:
+        List of the extracted filenames
+    """
+    return asyncio.run(
+        _download_date_range(download_manager, start_date, end_date, product_id, concurrency)
+    )
@@ -8,13 +8,25 @@ https://epsg.io/27700.
 
   from satip.geospatial import lat_lon_to_osb
   lat_lon_to_osb(numeric_list_of_latitudes, numeric_list_of_longitudes)
+
+The OSGB coordinates of every pixel of an area definition are cached by
+`area_to_osgb`, and the slices cropping an area definition to a region by
+`get_crop_slices`, as the areas are the same from one image to the next.
 """
 
+import collections
+import hashlib
+import os
+import threading
 from numbers import Number
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pyproj
+import structlog
+from pyresample.geometry import AreaDefinition
+
+log = structlog.stdlib.get_logger()
 
 # OSGB is also called "OSGB 1936 / British National Grid -- United
 # Kingdom Ordnance Survey".  OSGB is used in many UK electricity
@@ -28,6 +40,9 @@ OSGB = 27700
 WGS84 = 4326
 WGS84_CRS = f"EPSG:{WGS84}"
 
+# Number of area definitions whose OSGB grids are kept in memory
+OSGB_GRID_CACHE_SIZE = 8
+
 # Geographic bounds for various regions of interest, in order of min_lon, min_lat, max_lon, max_lat
 # (see https://satpy.readthedocs.io/en/stable/_modules/satpy/scene.html)
 GEOGRAPHIC_BOUNDS = {"UK": (-16, 45, 10, 62), "RSS": (-64, 16, 83, 69)}
@@ -62,3 +77,192 @@ def lat_lon_to_osgb(lat: List[Number], lon: List[Number]) -> Tuple[np.ndarray, n
 
     """
     return _transformers.lat_lon_to_osgb.transform(lat, lon)
+
+
+def _area_key(area: AreaDefinition) -> str:
+    """Stable hash of an area definition, the same across processes and runs"""
+    description = f"{area.crs.to_wkt()}|{tuple(area.area_extent)}|{area.shape}"
+    return hashlib.sha1(description.encode()).hexdigest()
+
+
+class OSGBGridCache:
+    """
+    Cache of the OSGB coordinates of the pixels of area definitions.
+
+    The grids are kept in memory for the most recently used areas, and optionally
+    saved as .npy files in a directory, so they are also reused by other processes
+    and later runs.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size: int = OSGB_GRID_CACHE_SIZE):
+        """Init
+
+        Args:
+            cache_dir: Local directory to save the grids in, None to only keep them in memory
+            max_size: Number of area definitions whose grids are kept in memory
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self._grids = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _filenames(self, key: str) -> Tuple[str, str]:
+        return (
+            os.path.join(self.cache_dir, f"{key}_x_osgb.npy"),
+            os.path.join(self.cache_dir, f"{key}_y_osgb.npy"),
+        )
+
+    def _load(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Loads the grids of an area from the cache directory, if they are there"""
+        if self.cache_dir is None:
+            return None
+        filenames = self._filenames(key)
+        if not all(os.path.exists(filename) for filename in filenames):
+            return None
+        return tuple(np.load(filename) for filename in filenames)
+
+    def _save(self, key: str, grids: Tuple[np.ndarray, np.ndarray]):
+        """Saves the grids of an area in the cache directory"""
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for filename, grid in zip(self._filenames(key), grids):
+            # Write then rename, so other processes never read a partial file
+            temp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_filename, "wb") as f:
+                np.save(f, grid)
+            os.replace(temp_filename, filename)
+
+    def get(self, area: AreaDefinition) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the OSGB coordinates of the pixels of an area, computing them if not cached
+
+        Args:
+            area: Area definition of the data
+
+        Return: 2-tuple of read-only float32 x (east-west), y (north-south) arrays.
+        """
+        if not isinstance(area, AreaDefinition):
+            # Stacked areas, such as the full disk HRV, are not cropped images, so not cached
+            lon, lat = area.get_lonlats()
+            osgb_x, osgb_y = lat_lon_to_osgb(lat, lon)
+            return np.float32(osgb_x), np.float32(osgb_y)
+
+        key = _area_key(area)
+        with self._lock:
+            if key in self._grids:
+                self._grids.move_to_end(key)
+                return self._grids[key]
+
+        grids = self._load(key)
+        if grids is None:
+            log.debug(f"Calculating OSGB grid for area {key}")
+            lon, lat = area.get_lonlats()
+            osgb_x, osgb_y = lat_lon_to_osgb(lat, lon)
+            grids = (np.float32(osgb_x), np.float32(osgb_y))
+            self._save(key, grids)
+
+        for grid in grids:
+            grid.flags.writeable = False
+        with self._lock:
+            self._grids[key] = grids
+            if len(self._grids) > self.max_size:
+                self._grids.popitem(last=False)
+        return grids
+
+
+# the cache used by `area_to_osgb`
+osgb_grid_cache = OSGBGridCache()
+
+
+def set_osgb_grid_cache_dir(cache_dir: Optional[str]):
+    """
+    Set the directory the OSGB grids are saved in, None to only keep them in memory
+
+    Args:
+        cache_dir: Local directory to save the grids in
+    """
+    osgb_grid_cache.cache_dir = cache_dir
+
+
+def area_to_osgb(area: AreaDefinition) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the OSGB coordinates of the pixels of an area definition, cached per area
+
+    Args:
+        area: Area definition of the data
+
+    Return: 2-tuple of read-only float32 x (east-west), y (north-south) arrays.
+    """
+    return osgb_grid_cache.get(area)
+
+
+class CropSliceCache:
+    """
+    Cache of the row and column slices cropping area definitions to geographic regions.
+
+    Working out the slices intersects the area with the region's bounds, which is costly
+    and gives the same slices for every image on the same area.
+    """
+
+    def __init__(self):
+        """Init"""
+        self._slices: Dict[Tuple[str, str], Optional[Tuple[slice, slice]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, area, region: str) -> Optional[Tuple[slice, slice]]:
+        """
+        Get the slices cropping an area to a region
+
+        Args:
+            area: Area definition of the data
+            region: Name of the geographic region, a key of `GEOGRAPHIC_BOUNDS`
+
+        Return: 2-tuple of the y (row) and x (column) slices, or None if the area can't be
+            cropped, like stacked areas, and needs to be resampled first.
+        """
+        if not isinstance(area, AreaDefinition):
+            return None
+
+        key = (_area_key(area), region)
+        with self._lock:
+            if key in self._slices:
+                return self._slices[key]
+
+        # Same latlong area as `satpy.Scene.crop(ll_bbox=...)`, so the same slices
+        region_area = AreaDefinition(
+            "crop_area",
+            "crop_area",
+            "crop_latlong",
+            {"proj": "latlong"},
+            100,
+            100,
+            GEOGRAPHIC_BOUNDS[region],
+        )
+        try:
+            x_slice, y_slice = area.get_area_slices(region_area)
+            slices = (y_slice, x_slice)
+        except NotImplementedError:
+            slices = None
+
+        with self._lock:
+            self._slices[key] = slices
+        return slices
+
+
+# the cache used by `get_crop_slices`
+crop_slice_cache = CropSliceCache()
+
+
+def get_crop_slices(area, region: str) -> Optional[Tuple[slice, slice]]:
+    """
+    Get the slices cropping an area definition to a region, cached per area and region
+
+    Args:
+        area: Area definition of the data
+        region: Name of the geographic region, a key of `GEOGRAPHIC_BOUNDS`
+
+    Return: 2-tuple of the y (row) and x (column) slices, or None if the area can't be
+        cropped and needs to be resampled first.
+    """
+    return crop_slice_cache.get(area, region)
@@ -0,0 +1,167 @@
+"""Manifest of the timesteps saved in a save directory.
+
+Checking which timesteps are already saved would otherwise list the save directory and
+its latest directory, and parse every filename, for every check. The manifest is a small
+JSON file in the save directory, mapping each saved timestep to the names of its HRV and
+non-HRV files. It is loaded once per run, looked up in constant time, and written
+atomically whenever files are saved.
+
+Usage example:
+  from satip.manifest import Manifest
+  manifest = Manifest.load(save_dir)
+  if pd.Timestamp("2023-01-01 12:05") not in manifest: ...
+  manifest.add_files(saved_filenames)
+  manifest.save()
+"""
+
+import json
+import os
+import secrets
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+import fsspec
+import pandas as pd
+import structlog
+from fsspec.implementations.local import LocalFileSystem
+
+log = structlog.stdlib.get_logger()
+
+MANIFEST_FILENAME = "manifest.json"
+
+# Format of the timesteps in the filenames, and keys of the manifest
+TIMESTEP_FORMAT = "%Y%m%d%H%M"
+
+
+def filename_to_timestep(filename: str) -> Optional[str]:
+    """
+    Gets the timestep of a saved file from its name, e.g. 15_hrv_202301011205.zarr.zip
+
+    Args:
+        filename: Path or name of the file
+
+    Returns:
+        The timestep as formatted by `TIMESTEP_FORMAT`, or None if it is not a timestep file,
+        such as the collated latest files
+    """
+    name = os.path.basename(filename).split(".zarr.zip")[0]
+    name = name.replace("15_", "").replace("hrv_", "")
+    try:
+        pd.to_datetime(name, format=TIMESTEP_FORMAT)
+    except ValueError:
+        return None
+    return name
+
+
+class Manifest:
+    """
+    Index of the timesteps saved in a save directory, and of their files
+
+    A timestep is complete once its non-HRV file is saved, as checked by
+    `filter_dataset_ids_on_current_files`. The files are recorded by name, as they are
+    moved between the save directory and its latest directory.
+    """
+
+    def __init__(self, save_dir: str, timesteps: Optional[Dict[str, Dict[str, str]]] = None):
+        """Init
+
+        Args:
+            save_dir: Directory where data is being saved, with the manifest file
+            timesteps: Files saved per timestep, as `{timestep: {"hrv"|"nonhrv": name}}`
+        """
+        self.save_dir = save_dir
+        self.path = f"{save_dir.rstrip('/')}/{MANIFEST_FILENAME}"
+        self.timesteps = timesteps if timesteps is not None else {}
+        self._completed = {t for t, files in self.timesteps.items() if "nonhrv" in files}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, save_dir: str) -> "Manifest":
+        """
+        Loads the manifest of a save directory
+
+        If there is no manifest yet, it is built from one listing of the save directory and
+        of its latest directory, and saved.
+
+        Args:
+            save_dir: Directory where data is being saved
+        """
+        manifest = cls(save_dir)
+        filesystem = fsspec.open(manifest.path).fs
+        if filesystem.exists(manifest.path):
+            with filesystem.open(manifest.path, "r") as f:
+                timesteps = json.load(f)["timesteps"]
+            log.debug(f"Loaded manifest of {len(timesteps)} timesteps from {manifest.path}")
+            return cls(save_dir, timesteps)
+
+        from satip.utils import get_latest_subdir_path
+
+        log.debug(f"No manifest in {save_dir}, building it from the saved files")
+        latest_dir = get_latest_subdir_path(save_dir)
+        filenames = filesystem.glob(f"{save_dir}/*.zarr.zip") + filesystem.glob(
+            f"{latest_dir}/*.zarr.zip"
+        )
+        manifest.add_files(filenames)
+        manifest.save()
+        return manifest
+
+    def add_files(self, filenames: Iterable[Optional[str]]):
+        """
+        Records saved files, ignoring the ones which are not timestep files
+
+        Args:
+            filenames: Paths or names of the saved files, None for skipped files
+        """
+        with self._lock:
+            for filename in filenames:
+                if filename is None:
+                    continue
+                timestep = filename_to_timestep(filename)
+                if timestep is None:
+                    continue
+                kind = "hrv" if "hrv_" in os.path.basename(filename) else "nonhrv"
+                self.timesteps.setdefault(timestep, {})[kind] = os.path.basename(filename)
+                if kind == "nonhrv":
+                    self._completed.add(timestep)
+
+    def prune(self, before: pd.Timestamp):
+        """
+        Forgets the timesteps before a time, whose files are deleted
+
+        Args:
+            before: Time of the oldest timestep to keep
+        """
+        before = pd.Timestamp(before).tz_localize(None).strftime(TIMESTEP_FORMAT)
+        with self._lock:
+            for timestep in [t for t in self.timesteps if t < before]:
+                del self.timesteps[timestep]
+                self._completed.discard(timestep)
+
+    def completed_timesteps(self) -> Set[str]:
+        """The complete timesteps, as formatted by `TIMESTEP_FORMAT`"""
+        return set(self._completed)
+
+    def __contains__(self, time) -> bool:
+        """Whether the timestep at a time is complete"""
+        return pd.Timestamp(time).strftime(TIMESTEP_FORMAT) in self._completed
+
+    def __len__(self) -> int:
+        """Number of complete timesteps"""
+        return len(self._completed)
+
+    def save(self):
+        """Saves the manifest, atomically, so it is never read while partially written"""
+        with self._lock:
+            contents = json.dumps({"timesteps": self.timesteps}, sort_keys=True)
+        filesystem = fsspec.open(self.path).fs
+        if isinstance(filesystem, LocalFileSystem):
+            # Write then rename, as a local file could be read while being written
+            temp_path = f"{self.path}.{secrets.token_hex(6)}.tmp"
+            with filesystem.open(temp_path, "w") as f:
+                f.write(contents)
+            filesystem.mv(temp_path, self.path)
+        else:
+            # Objects in object stores are replaced atomically when the upload completes
+            with filesystem.open(self.path, "w") as f:
+                f.write(contents)
+        log.debug(f"Saved manifest of {len(self)} timesteps to {self.path}")
@@ -0,0 +1,213 @@
+"""Pipelined download, conversion and upload of EUMETSAT datasets.
+
+Rather than downloading every dataset, then converting every native file, then
+uploading every zarr file, each stage runs in its own worker threads connected by
+bounded queues: a native file is converted as soon as its download finishes, and a
+zarr file is uploaded as soon as its conversion finishes. Network, CPU and upload
+then overlap, and the newest image is saved after roughly one file's processing time
+instead of the whole batch's. The bounded queues stop a fast stage from filling the
+disk or memory ahead of a slower one.
+
+Usage example:
+  from satip.pipeline import run_pipeline
+  saved_files = run_pipeline(download_manager, datasets, save_dir="s3://bucket/data")
+"""
+
+import os
+import queue
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import fsspec
+import structlog
+
+from satip import utils
+from satip.eumetsat import EUMETSATDownloadManager
+
+log = structlog.stdlib.get_logger()
+
+# Files waiting between two stages, bounding the files held on local disk
+PIPELINE_QUEUE_SIZE = 2
+
+# Marks the end of the files put on a queue
+_STOP = None
+
+
+def _download_stage(
+    download_manager: EUMETSATDownloadManager,
+    datasets: list,
+    product_id: str,
+    native_files: queue.Queue,
+    concurrency: int,
+):
+    """Downloads the datasets, queueing each native file as soon as it is downloaded"""
+    using_backup = product_id == "EO:EUM:DAT:MSG:HRSEVIRI"
+
+    def _download(dataset_id):
+        try:
+            if using_backup:
+                filenames = download_manager.download_single_tailored_dataset_with_retry(
+                    dataset_id,
+                    product_id,
+                    roi=None,
+                    file_format="hrit",
+                    projection=None,
+                )
+            else:
+                filenames = download_manager.download_single_dataset_with_retry(
+                    dataset_id, product_id
+                )
+        except Exception as e:
+            log.error(
+                f"Error downloading dataset with id {dataset_id}: {e}",
+                exc_info=True,
+                parent="DownloadManager",
+            )
+            return
+
+        for filename in filenames:
+            if filename.endswith(".nat") or (using_backup and "HRSEVIRI" in filename):
+                native_files.put(filename)
+
+    dataset_ids = sorted([dataset["id"] for dataset in datasets], reverse=True)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Newest first, so the latest image is available as soon as possible
+        list(executor.map(_download, dataset_ids))
+
+
+def _remove(filename: str):
+    """Removes a staged file, if it is still there"""
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+
+def _convert_worker(
+    native_files: queue.Queue,
+    zarr_files: queue.Queue,
+    staging_dir: str,
+    use_rescaler: bool,
+    using_backup: bool,
+):
+    """Converts native files to zarr files in the local staging directory"""
+    while True:
+        native_file = native_files.get()
+        if native_file is _STOP:
+            return
+        try:
+            for zarr_file in utils.save_native_to_zarr(
+                [native_file],
+                save_dir=staging_dir,
+                use_rescaler=use_rescaler,
+                using_backup=using_backup,
+            ):
+                zarr_files.put(zarr_file)
+        except Exception as e:
+            log.error(f"Error converting {native_file}: {e}", exc_info=True)
+        finally:
+            # The native file is not needed anymore, free the disk space
+            _remove(native_file)
+
+
+def _upload_worker(
+    zarr_files: queue.Queue, save_dir: str, saved_files: List[str], use_daily_stores: bool
+):
+    """Uploads the converted zarr files to the save directory
+
+    The queue is always consumed until the end, even if the save directory can't be
+    opened, so the conversion workers are never blocked on a full queue.
+    """
+    try:
+        filesystem = fsspec.open(save_dir).fs
+    except Exception as e:
+        log.error(f"Error opening {save_dir}, no files will be uploaded: {e}", exc_info=True)
+        filesystem = None
+
+    while True:
+        zarr_file = zarr_files.get()
+        if zarr_file is _STOP:
+            return
+        if use_daily_stores:
+            # Written straight into the daily stores by the conversion, nothing to upload
+            saved_files.append(zarr_file)
+            continue
+        filename = os.path.join(save_dir, os.path.basename(zarr_file))
+        try:
+            if filesystem is not None:
+                log.debug(f"Uploading {zarr_file} to {filename}", memory=utils.get_memory())
+                filesystem.put(zarr_file, filename)
+                saved_files.append(filename)
+        except Exception as e:
+            log.error(f"Error uploading {zarr_file} to {filename}: {e}", exc_info=True)
+        finally:
+            _remove(zarr_file)
+
+
+def run_pipeline(
+    download_manager: EUMETSATDownloadManager,
+    datasets: list,
+    save_dir: str,
+    product_id: str = "EO:EUM:DAT:MSG:MSG15-RSS",
+    use_rescaler: bool = False,
+    download_concurrency: int = 1,
+    conversion_workers: int = 1,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    use_daily_stores: bool = False,
+) -> List[str]:
+    """Downloads, converts and uploads datasets, with the three stages overlapping
+
+    Args:
+        download_manager: Download manager to download the datasets with
+        datasets: list of datasets returned by `identify_available_datasets`
+        save_dir: Directory to save the zarr files in
+        product_id: ID of the EUMETSAT product requested, "EO:EUM:DAT:MSG:HRSEVIRI"
+            for the backup 15 minutely data downloaded with the Data Tailor
+        use_rescaler: Whether to rescale between 0 and 1 or not
+        download_concurrency: Number of datasets downloaded in parallel
+        conversion_workers: Number of native files converted in parallel
+        queue_size: Maximum number of files waiting between two stages
+        use_daily_stores: Whether the conversion writes into the daily stores, see
+            `satip.daily_store.set_daily_store_dir`, so there are no files to upload
+
+    Returns:
+        List of the saved zarr filenames
+    """
+    using_backup = product_id == "EO:EUM:DAT:MSG:HRSEVIRI"
+    native_files = queue.Queue(maxsize=queue_size)
+    zarr_files = queue.Queue(maxsize=queue_size)
+    saved_files = []
+
+    with tempfile.TemporaryDirectory() as staging_dir:
+        converters = [
+            threading.Thread(
+                target=_convert_worker,
+                args=(native_files, zarr_files, staging_dir, use_rescaler, using_backup),
+                daemon=True,
+            )
+            for _ in range(conversion_workers)
+        ]
+        uploader = threading.Thread(
+            target=_upload_worker,
+            args=(zarr_files, save_dir, saved_files, use_daily_stores),
+            daemon=True,
+        )
+        for thread in converters + [uploader]:
+            thread.start()
+
+        try:
+            _download_stage(
+                download_manager, datasets, product_id, native_files, download_concurrency
+            )
+        finally:
+            for _ in converters:
+                native_files.put(_STOP)
+            for converter in converters:
+                converter.join()
+            zarr_files.put(_STOP)
+            uploader.join()
+
+    log.info(f"Pipeline saved {len(saved_files)} files", memory=utils.get_memory())
+    return saved_files
@@ -0,0 +1,170 @@
+"""Data quality statistics of satellite images, computed in one pass over the data.
+
+The zero and NaN fractions, the number of non-finite values and the min, max and mean
+of each channel are reduced together, block by block, so checking the quality of a
+dataset costs a single read of its data, and the statistics can be logged and stored
+with the output file.
+
+Usage example:
+  from satip.quality import compute_quality_stats
+  stats = compute_quality_stats(dataarray)
+  if stats.zero_fraction > 0.9: ...
+  dataset.attrs["quality_stats"] = stats.to_json()
+"""
+
+import json
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+import dask
+import dask.array as da
+import numpy as np
+import xarray as xr
+
+# Values closer to zero than this are counted as zeros, as by `np.isclose(value, 0.0)`
+ZERO_ATOL = 1e-8
+
+# Order of the partial statistics computed per block
+_PARTIALS = ["zeros", "nans", "non_finite", "sum", "min", "max"]
+
+
+@dataclass
+class QualityStats:
+    """Data quality statistics of a DataArray, overall and per channel"""
+
+    size: int
+    zero_fraction: float
+    nan_fraction: float
+    non_finite_count: int
+    variables: List[str]
+    mins: List[float]
+    maxs: List[float]
+    means: List[float]
+
+    @property
+    def is_clean(self) -> bool:
+        """Whether all the values are finite, so neither NaN nor infinite"""
+        return self.non_finite_count == 0
+
+    def to_dict(self) -> dict:
+        """The statistics as a dict of plain Python values"""
+        return asdict(self)
+
+    def to_json(self) -> str:
+        """The statistics as a JSON string, e.g. to store in the attrs of a Zarr file"""
+        # NaN stands for channels without finite values, which JSON has no literal for
+        return json.dumps(self.to_dict(), allow_nan=True)
+
+    @classmethod
+    def from_json(cls, text: str) -> "QualityStats":
+        """Statistics from a JSON string made by `to_json`"""
+        return cls(**json.loads(text))
+
+
+def _block_partials(block: np.ndarray) -> np.ndarray:
+    """
+    Partial statistics of a block, per channel
+
+    Args:
+        block: Data with the channels along the last axis
+
+    Returns:
+        Array of shape (number of partials, number of channels), in the order of `_PARTIALS`
+    """
+    axes = tuple(range(block.ndim - 1))
+    finite = np.isfinite(block)
+    partials = np.empty((len(_PARTIALS), block.shape[-1]), dtype=np.float64)
+    partials[0] = (np.abs(block) <= ZERO_ATOL).sum(axis=axes)
+    partials[1] = np.isnan(block).sum(axis=axes)
+    partials[2] = (~finite).sum(axis=axes)
+    partials[3] = np.where(finite, block, 0).sum(axis=axes, dtype=np.float64)
+    partials[4] = np.where(finite, block, np.inf).min(axis=axes, initial=np.inf)
+    partials[5] = np.where(finite, block, -np.inf).max(axis=axes, initial=-np.inf)
+    return partials
+
+
+def _quality_partials(dataarray: xr.DataArray, variable_dim: str) -> List:
+    """Lazy partial statistics of each block of a DataArray, with their channel offsets"""
+    if variable_dim in dataarray.dims:
+        dataarray = dataarray.transpose(..., variable_dim)
+    else:
+        dataarray = dataarray.expand_dims(variable_dim, axis=-1)
+    values = da.asarray(dataarray.data)
+
+    offsets = np.cumsum((0,) + values.chunks[-1])
+    blocks = values.to_delayed()
+    return [
+        (offsets[index[-1]], dask.delayed(_block_partials)(blocks[index]))
+        for index in np.ndindex(blocks.shape)
+    ]
+
+
+def _combine_partials(dataarray: xr.DataArray, variable_dim: str, partials: List) -> QualityStats:
+    """Combines the partial statistics of the blocks of a DataArray"""
+    if variable_dim in dataarray.dims:
+        variables = [str(v) for v in dataarray[variable_dim].values]
+    else:
+        variables = [str(dataarray.name)]
+    num_channels = len(variables)
+
+    totals = np.zeros((len(_PARTIALS), num_channels))
+    totals[4], totals[5] = np.inf, -np.inf
+    for offset, block in partials:
+        channels = slice(offset, offset + block.shape[1])
+        totals[:4, channels] += block[:4]
+        totals[4, channels] = np.minimum(totals[4, channels], block[4])
+        totals[5, channels] = np.maximum(totals[5, channels], block[5])
+    zeros, nans, non_finite, sums, mins, maxs = totals
+
+    size = int(dataarray.size)
+    finite = size // max(num_channels, 1) - non_finite
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(finite > 0, sums / finite, np.nan)
+    no_values = finite == 0
+    mins[no_values], maxs[no_values] = np.nan, np.nan
+
+    return QualityStats(
+        size=size,
+        zero_fraction=float(zeros.sum() / size) if size else 0.0,
+        nan_fraction=float(nans.sum() / size) if size else 0.0,
+        non_finite_count=int(non_finite.sum()),
+        variables=variables,
+        mins=mins.tolist(),
+        maxs=maxs.tolist(),
+        means=means.tolist(),
+    )
+
+
+def compute_quality_stats(dataarray: xr.DataArray, variable_dim: str = "variable") -> QualityStats:
+    """
+    Compute the data quality statistics of a DataArray in one pass over its data
+
+    Args:
+        dataarray: Data to check, numpy or dask backed
+        variable_dim: Dimension of the channels, the whole array is one channel if missing
+
+    Returns:
+        The statistics of the whole array and of each channel
+    """
+    return compute_dataset_quality_stats(dataarray.to_dataset(name="data"), variable_dim)["data"]
+
+
+def compute_dataset_quality_stats(
+    ds: xr.Dataset, variable_dim: str = "variable"
+) -> Dict[str, QualityStats]:
+    """
+    Compute the data quality statistics of every data variable of a Dataset in one pass
+
+    Args:
+        ds: Dataset to check
+        variable_dim: Dimension of the channels, see `compute_quality_stats`
+
+    Returns:
+        The statistics of each data variable
+    """
+    lazy = {var: _quality_partials(ds[var], variable_dim) for var in ds.data_vars}
+    (computed,) = dask.compute(lazy)
+    return {
+        var: _combine_partials(ds[var], variable_dim, partials)
+        for var, partials in computed.items()
+    }
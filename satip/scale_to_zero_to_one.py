@@ -6,18 +6,35 @@ Usage Example:
   scaler.fit(dataset, dims)  # Optional, if you want to set new limits based on `dataset`
   data_array = scaler.scale(data_array)
   mask = scaler.compress_masks(mask)
+
+To fit the limits over an archive larger than memory, in one pass over the files:
+  scaler = ScaleToZeroToOne().fit_streaming(zarr_paths, lower_quantile=0.001, upper_quantile=0.999)
 """
 
-from typing import Iterable, Union
+import os
+import warnings
+from typing import Callable, Iterable, Optional, Sequence, Tuple, Union
 
+import dask
+import dask.array as da
+import fsspec
 import numpy as np
 import structlog
 import xarray as xr
 
+from satip.quality import QualityStats, compute_quality_stats
 from satip.serialize import serialize_attrs
 
 log = structlog.stdlib.get_logger()
 
+# Number of pixels rescaled at once within a block, bounding the size of the temporaries
+RESCALE_SLAB_SIZE = 2**18
+
+# Range and number of bins of the histograms the streaming fit estimates quantiles from,
+# covering the reflectances and brightness temperatures of all the channels at 0.05 resolution
+FIT_HISTOGRAM_RANGE = (-200.0, 400.0)
+FIT_HISTOGRAM_BINS = 12000
+
 
 class ScaleToZeroToOne:
     """ScaleToZeroToOne: rescales dataarrays so all values lie in the range [0, 1]."""
@@ -105,15 +122,62 @@ class ScaleToZeroToOne:
 
         return self
 
-    def rescale(self, dataarray: xr.DataArray) -> Union[xr.DataArray, None]:
+    def fit_streaming(
+        self,
+        datasets: Iterable[Union[xr.Dataset, xr.DataArray, str]],
+        lower_quantile: Optional[float] = None,
+        upper_quantile: Optional[float] = None,
+        fitter: Optional["StreamingScaleFitter"] = None,
+    ) -> object:
+        """
+        Calculate new min and max values in one pass over many datasets
+
+        Unlike `fit`, the datasets are never all loaded at once, see `StreamingScaleFitter`.
+
+        Args:
+            datasets: Datasets, DataArrays or paths of zarr files, with a `variable` dimension
+            lower_quantile: Quantile to use as the min values, None for the exact min
+            upper_quantile: Quantile to use as the max values, None for the exact max
+            fitter: Fitter to continue, e.g. loaded from a checkpoint, or a new one if None
+
+        """
+        fitter = StreamingScaleFitter() if fitter is None else fitter
+        fitter.fit(datasets)
+        self.mins, self.maxs = fitter.bounds(lower_quantile, upper_quantile)
+        self.variable_order = fitter.variable_order
+
+        log.debug(
+            "Calculated new min and max values",
+            mins=self.mins,
+            maxes=self.maxs,
+            variableorder=self.variable_order,
+        )
+
+        return self
+
+    def _per_variable(self, values) -> np.ndarray:
+        """Returns per-variable values as a float array in `variable_order`"""
+        if isinstance(values, xr.DataArray):
+            values = values.reindex({"variable": self.variable_order})
+        return np.asarray(values, dtype=np.float64)
+
+    def rescale(
+        self, dataarray: xr.DataArray, dtype: Optional[np.dtype] = None
+    ) -> Union[xr.DataArray, None]:
         """
         Rescale Xarray DataArray so all values lie in the range [0, 1].
 
-        Warning: The original `dataarray` will be modified in-place.
+        The rescaling is fused into one pass per block of data: each block is written
+        straight into its float32 (or `dtype`) output, computing `(x - min) / range`
+        and clipping in small slabs, instead of making a full-size temporary per step.
+        Dask arrays are rescaled lazily, block by block.
 
         Args:
             dataarray: DataArray to rescale.
                 Dims MUST be named ('time', 'x_geostationary', 'y_geostationary', 'variable')!
+            dtype: Output dtype, float32 by default. An unsigned integer dtype, such as
+                uint8 or uint16, quantises [0, 1] to [0, max - 1] of the dtype, and stores
+                NaNs as the max of the dtype.
 
         Returns:
             The DataArray rescaled to [0, 1]. NaNs in the original `dataarray` will still
@@ -124,16 +188,25 @@ class ScaleToZeroToOne:
                 getattr(self, attr) is not None
             ), f"{attr} must be set in initialisation or through `fit`"
 
-        dataarray = dataarray.reindex({"variable": self.variable_order}).transpose(
-            "time", "y_geostationary", "x_geostationary", "variable"
-        )
+        if list(dataarray["variable"].values) != list(self.variable_order):
+            dataarray = dataarray.reindex({"variable": self.variable_order})
+        dataarray = dataarray.transpose("time", "y_geostationary", "x_geostationary", "variable")
+
+        mins = self._per_variable(self.mins)
+        ranges = self._per_variable(self.maxs) - mins
+        dtype = np.dtype(np.float32 if dtype is None else dtype)
 
-        range = self.maxs - self.mins
-        dataarray -= self.mins
-        dataarray /= range
-        dataarray = dataarray.clip(min=0, max=1)
-        dataarray = dataarray.astype(np.float32)
-        dataarray.attrs = serialize_attrs(dataarray.attrs)  # Must be serializable
+        attrs = serialize_attrs(dataarray.attrs)  # Must be serializable
+        dataarray = xr.apply_ufunc(
+            _rescale_block,
+            dataarray,
+            xr.DataArray(mins, dims=["variable"]),
+            xr.DataArray(ranges, dims=["variable"]),
+            kwargs={"dtype": dtype},
+            dask="parallelized",
+            output_dtypes=[dtype],
+        )
+        dataarray.attrs = attrs
         return dataarray
 
     def compress_mask(self, dataarray: xr.DataArray) -> Union[xr.DataArray, None]:
@@ -142,6 +215,318 @@ class ScaleToZeroToOne:
         return compress_mask(dataarray)
 
 
+class StreamingScaleFitter:
+    """
+    Fits the per-variable min and max values of ScaleToZeroToOne in one pass over many datasets.
+
+    Keeps running min and max values and a fixed-bin histogram per variable, from which
+    approximate quantiles give bounds robust to outliers. Each dataset is reduced chunk by
+    chunk, in one read, so archives larger than memory can be fitted. Fitters updated on
+    different parts of an archive, e.g. by different workers, can be merged, and saved as
+    checkpoints to resume from.
+    """
+
+    def __init__(
+        self,
+        value_range: Tuple[float, float] = FIT_HISTOGRAM_RANGE,
+        num_bins: int = FIT_HISTOGRAM_BINS,
+        variable_order: Optional[Sequence] = None,
+    ):
+        """Init
+
+        Args:
+            value_range: Range of the histograms, values outside are only counted as outliers
+            num_bins: Number of bins of the histograms, which sets the quantiles' precision
+            variable_order: Order of the variables, or taken from the first dataset if None
+        """
+        self.value_range = (float(value_range[0]), float(value_range[1]))
+        self.num_bins = int(num_bins)
+        self.edges = np.linspace(*self.value_range, self.num_bins + 1)
+        self.variable_order = None
+        self.num_datasets = 0
+        if variable_order is not None:
+            self._reset(variable_order)
+
+    def _reset(self, variable_order: Sequence):
+        """Sets the variables, with empty statistics"""
+        self.variable_order = np.asarray(variable_order)
+        num_variables = len(self.variable_order)
+        self.mins = np.full(num_variables, np.inf)
+        self.maxs = np.full(num_variables, -np.inf)
+        self.below = np.zeros(num_variables, dtype=np.int64)
+        self.above = np.zeros(num_variables, dtype=np.int64)
+        self.histograms = np.zeros((num_variables, self.num_bins), dtype=np.int64)
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Number of non-NaN values per variable"""
+        return self.histograms.sum(axis=1) + self.below + self.above
+
+    def update(self, dataset: Union[xr.Dataset, xr.DataArray, str]) -> object:
+        """
+        Add the values of a dataset to the statistics
+
+        Args:
+            dataset: Dataset with a `data` variable, DataArray, or path of a zarr file,
+                with a `variable` dimension. All the other dimensions are reduced over.
+
+        """
+        if isinstance(dataset, (str, os.PathLike)):
+            dataset = _open_zarr(str(dataset))
+        dataarray = dataset["data"] if isinstance(dataset, xr.Dataset) else dataset
+
+        if self.variable_order is None:
+            self._reset(dataarray.coords["variable"].values)
+        elif list(dataarray["variable"].values) != list(self.variable_order):
+            dataarray = dataarray.reindex({"variable": self.variable_order})
+        values = da.asarray(dataarray.transpose(..., "variable").data)
+
+        # All the reductions are computed together, reading each chunk once
+        reductions = []
+        for i in range(len(self.variable_order)):
+            channel = values[..., i]
+            histogram, _ = da.histogram(channel, bins=self.num_bins, range=self.value_range)
+            reductions.append(
+                (
+                    histogram,
+                    da.nanmin(channel),
+                    da.nanmax(channel),
+                    (channel < self.value_range[0]).sum(),
+                    (channel > self.value_range[1]).sum(),
+                )
+            )
+        with warnings.catch_warnings():
+            # All-NaN variables, which leave the min and max as they are
+            warnings.simplefilter("ignore", RuntimeWarning)
+            reductions = dask.compute(*reductions)
+
+        for i, (histogram, channel_min, channel_max, below, above) in enumerate(reductions):
+            self.histograms[i] += histogram
+            self.mins[i] = np.fmin(self.mins[i], channel_min)
+            self.maxs[i] = np.fmax(self.maxs[i], channel_max)
+            self.below[i] += below
+            self.above[i] += above
+        self.num_datasets += 1
+        return self
+
+    def fit(self, datasets: Iterable[Union[xr.Dataset, xr.DataArray, str]]) -> object:
+        """
+        Add the values of many datasets to the statistics, one dataset at a time
+
+        Args:
+            datasets: Datasets, DataArrays or paths of zarr files, see `update`
+
+        """
+        for dataset in datasets:
+            self.update(dataset)
+            log.debug("Added dataset to scaler fit", num_datasets=self.num_datasets)
+        return self
+
+    def merge(self, other: "StreamingScaleFitter") -> object:
+        """
+        Add the statistics of another fitter, e.g. fitted on another part of the archive
+
+        Args:
+            other: Fitter with the same histogram range and number of bins
+        """
+        if other.value_range != self.value_range or other.num_bins != self.num_bins:
+            raise ValueError("Can only merge fitters with the same histogram bins")
+        if other.variable_order is None:
+            return self
+        if self.variable_order is None:
+            self._reset(other.variable_order)
+        elif list(other.variable_order) != list(self.variable_order):
+            raise ValueError(
+                f"Can't merge fitters of variables {list(other.variable_order)} "
+                f"into {list(self.variable_order)}"
+            )
+
+        self.histograms += other.histograms
+        self.mins = np.fmin(self.mins, other.mins)
+        self.maxs = np.fmax(self.maxs, other.maxs)
+        self.below += other.below
+        self.above += other.above
+        self.num_datasets += other.num_datasets
+        return self
+
+    def quantile(self, q: float) -> np.ndarray:
+        """
+        Approximate quantile of the values of each variable
+
+        The quantile is interpolated within its histogram bin, so is precise to a bin width
+        when it lies in the histogram's range, and the exact min or max at 0 or 1.
+
+        Args:
+            q: Quantile, between 0 and 1
+
+        Returns:
+            The quantile per variable, in `variable_order`, NaN for variables without values
+        """
+        assert 0 <= q <= 1, f"Quantile must be between 0 and 1, not {q}"
+        bin_width = self.edges[1] - self.edges[0]
+        quantiles = np.full(len(self.variable_order), np.nan)
+        for i, count in enumerate(self.counts):
+            if count == 0:
+                continue
+            rank = q * count
+            cumulative = self.below[i] + np.cumsum(self.histograms[i])
+            index = np.searchsorted(cumulative, rank)
+            if rank <= self.below[i]:
+                quantiles[i] = self.mins[i]
+            elif index >= self.num_bins:
+                quantiles[i] = self.maxs[i]
+            else:
+                in_bin = self.histograms[i, index]
+                before = cumulative[index] - in_bin
+                quantiles[i] = self.edges[index] + (rank - before) / in_bin * bin_width
+        return np.clip(quantiles, self.mins, self.maxs)
+
+    def bounds(
+        self, lower_quantile: Optional[float] = None, upper_quantile: Optional[float] = None
+    ) -> Tuple[xr.DataArray, xr.DataArray]:
+        """
+        Min and max values to rescale with, as set by `ScaleToZeroToOne.fit`
+
+        Args:
+            lower_quantile: Quantile to use as the min values, None for the exact min
+            upper_quantile: Quantile to use as the max values, None for the exact max
+
+        Returns:
+            2-tuple of the min and max values, as DataArrays along the `variable` dimension
+        """
+        mins = self.mins if lower_quantile is None else self.quantile(lower_quantile)
+        maxs = self.maxs if upper_quantile is None else self.quantile(upper_quantile)
+        coords = {"variable": self.variable_order}
+        return (
+            xr.DataArray(mins, dims=["variable"], coords=coords),
+            xr.DataArray(maxs, dims=["variable"], coords=coords),
+        )
+
+    def save(self, path: str):
+        """
+        Save the statistics as a checkpoint, which `load` resumes from
+
+        Args:
+            path: Path of the .npz checkpoint, local or remote
+        """
+        variable_order = self.variable_order
+        if variable_order is not None and variable_order.dtype == object:
+            variable_order = variable_order.astype(str)
+        with fsspec.open(path, "wb") as f:
+            np.savez(
+                f,
+                value_range=np.asarray(self.value_range),
+                num_bins=self.num_bins,
+                num_datasets=self.num_datasets,
+                **(
+                    {}
+                    if variable_order is None
+                    else dict(
+                        variable_order=variable_order,
+                        mins=self.mins,
+                        maxs=self.maxs,
+                        below=self.below,
+                        above=self.above,
+                        histograms=self.histograms,
+                    )
+                ),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "StreamingScaleFitter":
+        """
+        Load a fitter from a checkpoint saved by `save`
+
+        Args:
+            path: Path of the .npz checkpoint, local or remote
+        """
+        with fsspec.open(path, "rb") as f:
+            checkpoint = dict(np.load(f))
+        fitter = cls(value_range=tuple(checkpoint["value_range"]), num_bins=checkpoint["num_bins"])
+        fitter.num_datasets = int(checkpoint["num_datasets"])
+        if "variable_order" in checkpoint:
+            fitter._reset(checkpoint["variable_order"])
+            for name in ["mins", "maxs", "below", "above", "histograms"]:
+                setattr(fitter, name, checkpoint[name])
+        return fitter
+
+
+def _open_zarr(path: str) -> xr.Dataset:
+    """Opens a zarr file, zipped or not, lazily with dask"""
+    if path.endswith(".zip") and not path.startswith("zip::"):
+        path = f"zip::{path}"
+    return xr.open_dataset(path, engine="zarr", chunks={})
+
+
+def map_row_slabs(
+    block: np.ndarray, dtype: np.dtype, process: Callable[[np.ndarray], np.ndarray]
+) -> np.ndarray:
+    """
+    Applies an element-wise operation to a block, slab of rows by slab of rows
+
+    Each slab is copied into a small temporary in the floating precision of the block,
+    which `process` modifies in-place, then cast into the output. This bounds the size of
+    the temporaries, and gives the same results as the operations done in-place on the
+    whole block.
+
+    Args:
+        block: Data with at least 2 dimensions, the rows being the third to last dimension
+        dtype: Output dtype
+        process: Function modifying a slab of the block in-place, and returning it
+
+    Returns:
+        The processed block
+    """
+    work_dtype = block.dtype if np.issubdtype(block.dtype, np.floating) else np.float64
+    out = np.empty(block.shape, dtype=dtype)
+
+    # Slabs of rows along the y axis, as views, so a transposed block is never copied whole
+    row_size = int(np.prod(block.shape[-2:]))
+    slab_rows = max(1, RESCALE_SLAB_SIZE // max(1, row_size))
+    for index in np.ndindex(block.shape[:-3]):
+        rows, out_rows = block[index], out[index]
+        for start in range(0, rows.shape[0], slab_rows):
+            slab = rows[start : start + slab_rows].astype(work_dtype, copy=True)
+            out_rows[start : start + slab_rows] = process(slab)
+    return out
+
+
+def _rescale_block(
+    block: np.ndarray, mins: np.ndarray, ranges: np.ndarray, dtype: np.dtype
+) -> np.ndarray:
+    """
+    Rescales a block of data to [0, 1] into a new array of `dtype`
+
+    Args:
+        block: Data with the variables along the last axis
+        mins: Min values per variable, broadcastable against `block`
+        ranges: Max - min values per variable, broadcastable against `block`
+        dtype: Output dtype, either floating or an unsigned integer to quantise to
+
+    Returns:
+        The rescaled block
+    """
+    mins = np.asarray(mins).reshape(block.shape[-1])
+    ranges = np.asarray(ranges).reshape(block.shape[-1])
+    is_integer = np.issubdtype(dtype, np.integer)
+    if is_integer:
+        nan_value = np.iinfo(dtype).max
+        scale = nan_value - 1
+
+    def process(slab):
+        slab -= mins
+        slab /= ranges
+        np.clip(slab, 0, 1, out=slab)
+        if is_integer:
+            nans = np.isnan(slab)
+            slab *= scale
+            np.rint(slab, out=slab)
+            slab[nans] = nan_value
+        return slab
+
+    return map_row_slabs(block, dtype, process)
+
+
 def compress_mask(dataarray: xr.DataArray) -> xr.DataArray:
     """
     Compresses Cloud masks DataArrays.
@@ -161,16 +546,17 @@ def compress_mask(dataarray: xr.DataArray) -> xr.DataArray:
     return dataarray
 
 
-def is_dataset_clean(dataarray: xr.DataArray) -> bool:
+def is_dataset_clean(dataarray: xr.DataArray, stats: Optional[QualityStats] = None) -> bool:
     """
     Checks if all the data values in a Dataset are not NaNs
 
     Args:
         dataarray: Xarray DataArray containing the data to check
+        stats: Quality statistics of `dataarray`, computed in one pass over the data if None
 
     Returns:
         Bool of whether the dataset is clean or not
     """
-    return (
-        dataarray.notnull().compute().all().values and np.isfinite(dataarray).compute().all().values
-    )
+    if stats is None:
+        stats = compute_quality_stats(dataarray)
+    return stats.is_clean
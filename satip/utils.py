@@ -11,17 +11,21 @@ Collection of helper functions and utilities around
 import datetime
 import gc
 import glob
+import json
 import os
 import secrets
 import shutil
 import subprocess
 import tempfile
+import threading
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from stat import S_ISDIR
-from typing import Any, Tuple
-from zipfile import ZipFile
+from typing import Any, Dict, List, Optional, Tuple
+from zipfile import ZIP_STORED, ZipFile
 
+import dask
 import fsspec
 import numcodecs
 import numpy as np
@@ -30,9 +34,16 @@ import psutil
 import structlog
 import xarray as xr
 import zarr
+from fsspec.implementations.local import LocalFileSystem
 from ocf_blosc2 import Blosc2
 from satpy import Scene
 
+from satip.compression import (
+    EncodingPolicy,
+    get_encoding_policy,
+    get_output_compression,
+    set_output_compression,
+)
 from satip.constants import (
     ALL_BANDS,
     HRV_SCALER_MAX,
@@ -41,13 +52,43 @@ from satip.constants import (
     SCALER_MAXS,
     SCALER_MINS,
 )
-from satip.geospatial import GEOGRAPHIC_BOUNDS, lat_lon_to_osgb
-from satip.scale_to_zero_to_one import ScaleToZeroToOne, compress_mask
+from satip.daily_store import (
+    DailyZarrStore,
+    get_daily_store,
+    get_daily_store_dir,
+    set_daily_store_dir,
+)
+from satip.geospatial import (
+    GEOGRAPHIC_BOUNDS,
+    area_to_osgb,
+    get_crop_slices,
+    osgb_grid_cache,
+    set_osgb_grid_cache_dir,
+)
+from satip.manifest import Manifest
+from satip.quality import QualityStats, compute_dataset_quality_stats
+from satip.scale_to_zero_to_one import ScaleToZeroToOne, compress_mask, map_row_slabs
 from satip.serialize import serialize_attrs
 
 LATEST_DIR_NAME = "latest"
+
+# Number of files copied or deleted at once when moving files around on remote filesystems
+HOUSEKEEPING_BATCH_SIZE = 32
+
+# Keyword of `rm` bounding the number of files deleted at once, for the filesystems which take
+# one. s3fs takes none, and deletes in bulk requests of up to 1000 keys instead
+RM_BATCH_SIZE_KEYWORDS = {"gs": "batchsize", "gcs": "batchsize"}
+
+# Memory used by the chunks being collated at once into the latest files, in MB
+COLLATION_MEMORY_BUDGET_MB = 512
+
+# Copies of a chunk in memory while it is written: read, encoded, and compressed
+CHUNK_WRITE_COPIES = 3
 log = structlog.get_logger()
 
+# Where the lookup tables for resampling the 15 minutely data are saved and reused from
+RESAMPLE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "satip_resample_cache")
+
 warnings.filterwarnings("ignore", message="divide by zero encountered in true_divide")
 warnings.filterwarnings("ignore", message="invalid value encountered in sin")
 warnings.filterwarnings("ignore", message="invalid value encountered in cos")
@@ -243,6 +284,37 @@ def load_cloudmask_to_dataarray(
         return None
 
 
+def crop_scene(scene: Scene, band: str, area: str) -> Scene:
+    """
+    Crops a Scene to a geographic area, with slices cached per area definition
+
+    Same as `scene.crop(ll_bbox=GEOGRAPHIC_BOUNDS[area])`, but the slices are only worked
+    out once per area definition, then applied as plain array slicing.
+
+    Args:
+        scene: The satpy.Scene containing the satellite data
+        band: The name of the band whose area definition is used
+        area: Name of the geographic area to use, such as 'UK'
+
+    Returns:
+        The cropped Scene
+    """
+    slices = get_crop_slices(scene[band].attrs["area"], area)
+    if slices is None:
+        # 15 minutely data by default doesn't work for some reason, have to resample it.
+        # The resampling lookup tables are saved in the cache directory and reused.
+        scene = scene.resample(
+            "msg_seviri_rss_1km" if band == "HRV" else "msg_seviri_rss_3km",
+            cache_dir=RESAMPLE_CACHE_DIR,
+        )
+        log.debug("Finished resample", memory=get_memory())
+        slices = get_crop_slices(scene[band].attrs["area"], area)
+
+    if slices is None or not scene.all_same_area:
+        return scene.crop(ll_bbox=GEOGRAPHIC_BOUNDS[area])
+    return scene.slice(slices)
+
+
 def convert_scene_to_dataarray(
     scene: Scene, band: str, area: str, calculate_osgb: bool = True
 ) -> xr.DataArray:
@@ -263,13 +335,7 @@ def convert_scene_to_dataarray(
         raise ValueError(f"`area` must be one of {GEOGRAPHIC_BOUNDS.keys()}, not '{area}'")
     log.debug("Starting scene conversion", memory=get_memory())
     if area != "RSS":
-        try:
-            scene = scene.crop(ll_bbox=GEOGRAPHIC_BOUNDS[area])
-        except NotImplementedError:
-            # 15 minutely data by default doesn't work for some reason, have to resample it
-            scene = scene.resample("msg_seviri_rss_1km" if band == "HRV" else "msg_seviri_rss_3km")
-            log.debug("Finished resample", memory=get_memory())
-            scene = scene.crop(ll_bbox=GEOGRAPHIC_BOUNDS[area])
+        scene = crop_scene(scene, band=band, area=area)
     log.debug("Finished crop", memory=get_memory())
     # Remove acq time from all bands because it is not useful, and can actually
     # get in the way of combining multiple Zarr datasets.
@@ -285,12 +351,12 @@ def convert_scene_to_dataarray(
 
     # Lat and Lon are the same for all the channels now
     if calculate_osgb:
-        lon, lat = scene[band].attrs["area"].get_lonlats()
-        osgb_x, osgb_y = lat_lon_to_osgb(lat, lon)
+        # The grid of a cropped area is the same from image to image, so is cached
+        osgb_x, osgb_y = area_to_osgb(scene[band].attrs["area"])
         # Assign x_osgb and y_osgb and set some attributes
         dataarray = dataarray.assign_coords(
-            x_osgb=(("y", "x"), np.float32(osgb_x)),
-            y_osgb=(("y", "x"), np.float32(osgb_y)),
+            x_osgb=(("y", "x"), osgb_x),
+            y_osgb=(("y", "x"), osgb_y),
         )
         for name in ["x_osgb", "y_osgb"]:
             dataarray[name].attrs = {
@@ -326,6 +392,11 @@ def do_v15_rescaling(
     """
     Performs old version of compression, same as v15 dataset
 
+    The subtraction, division, scaling, rounding, clipping and cast to int16 are fused
+    into a single pass per block, which writes int16 straight from the float input,
+    lazily for dask arrays. The operations and their precision are the same as the v15
+    operations, so the output is bit-for-bit identical.
+
     Args:
         dataarray: Input DataArray
         mins: Min values per channel
@@ -335,22 +406,51 @@ def do_v15_rescaling(
     Returns:
         Xarray DataArray
     """
-    dataarray = dataarray.reindex({"variable": variable_order}).transpose(
-        "time", "y_geostationary", "x_geostationary", "variable"
+    if list(dataarray["variable"].values) != list(variable_order):
+        dataarray = dataarray.reindex({"variable": variable_order})
+    dataarray = dataarray.transpose("time", "y_geostationary", "x_geostationary", "variable")
+
+    mins = np.asarray(mins)
+    ranges = maxs - mins
+    attrs = dataarray.attrs
+    dataarray = xr.apply_ufunc(
+        _v15_quantise_block,
+        dataarray,
+        xr.DataArray(mins, dims=["variable"]),
+        xr.DataArray(ranges, dims=["variable"]),
+        dask="parallelized",
+        output_dtypes=[np.int16],
     )
+    dataarray.attrs = attrs
+    return dataarray
+
+
+def _v15_quantise_block(block: np.ndarray, mins: np.ndarray, ranges: np.ndarray) -> np.ndarray:
+    """Quantises a block of data to the v15 10 bit integers, with the variables last"""
     upper_bound = (2**10) - 1
-    new_max = maxs - mins
+    mins = mins.reshape(block.shape[-1])
+    ranges = ranges.reshape(block.shape[-1])
 
-    dataarray -= mins
-    dataarray /= new_max
-    dataarray *= upper_bound
-    dataarray = dataarray.round().clip(min=0, max=upper_bound).astype(np.int16)
-    return dataarray
+    def process(slab):
+        slab -= mins
+        slab /= ranges
+        slab *= upper_bound
+        np.rint(slab, out=slab)
+        np.clip(slab, 0, upper_bound, out=slab)
+        return slab
 
+    with np.errstate(invalid="ignore"):
+        # NaNs are cast to int16 the same way as the v15 `astype`
+        return map_row_slabs(block, np.int16, process)
 
-def get_dataset_from_scene(filename: str, hrv_scaler, use_rescaler: bool, save_dir, using_backup):
+
+def get_dataset_from_scene(
+    filename: str, hrv_scaler, use_rescaler: bool, save_dir, using_backup
+) -> Optional[str]:
     """
-    Returns the Xarray dataset from the filename
+    Saves the HRV Xarray dataset from the filename
+
+    Returns the saved filename, or None if the data quality was too low
     """
     if ".nat" in filename:
         log.debug(f"Loading Native {filename}", memory=get_memory())
@@ -366,6 +466,17 @@ def get_dataset_from_scene(filename: str, hrv_scaler, use_rescaler: bool, save_d
     )
 
     log.debug("Loaded HRV", memory=get_memory())
+    return save_hrv_scene_to_zarr(hrv_scene, hrv_scaler, use_rescaler, save_dir, using_backup)
+
+
+def save_hrv_scene_to_zarr(
+    hrv_scene: Scene, hrv_scaler, use_rescaler: bool, save_dir, using_backup
+) -> Optional[str]:
+    """
+    Saves the HRV Xarray dataset from a Scene with the HRV band loaded
+
+    Returns the saved filename, or None if the data quality was too low
+    """
     hrv_dataarray: xr.DataArray = convert_scene_to_dataarray(
         hrv_scene, band="HRV", area="UK", calculate_osgb=True
     )
@@ -385,40 +496,58 @@ def get_dataset_from_scene(filename: str, hrv_scaler, use_rescaler: bool, save_d
         "time", "y_geostationary", "x_geostationary", "variable"
     )
     log.info("Rescaled HRV", memory=get_memory())
-    hrv_dataarray = hrv_dataarray.chunk((1, 512, 512, 1))
-    hrv_dataset = hrv_dataarray.to_dataset(name="data")
+    encoding_policy = get_encoding_policy(hrv=True)
+    hrv_dataset = encoding_policy.chunk(hrv_dataarray.to_dataset(name="data"))
     hrv_dataset.attrs.update(attrs)
     log.debug("Converted HRV to DataArray", memory=get_memory())
     now_time = pd.Timestamp(hrv_dataset["time"].values[0]).strftime("%Y%m%d%H%M")
 
     # Check for data quality
-    if not data_quality_filter(hrv_dataset):
+    if not check_and_annotate_quality(hrv_dataset):
         del hrv_dataset
         gc.collect()
-        return
+        return None
 
-    save_file = os.path.join(save_dir, f"{'15_' if using_backup else ''}hrv_{now_time}.zarr.zip")
-    log.debug(f"Saving HRV netcdf in {save_file}", memory=get_memory())
-    save_to_zarr_to_backend(hrv_dataset, save_file)
+    daily_store = get_daily_store(hrv=True, using_backup=using_backup)
+    if daily_store is not None:
+        log.debug(f"Writing HRV into daily store in {daily_store.root}", memory=get_memory())
+        (save_file,) = daily_store.write(
+            hrv_dataset, encoding=encoding_policy.encoding(hrv_dataset)
+        )
+    else:
+        save_file = os.path.join(
+            save_dir, f"{'15_' if using_backup else ''}hrv_{now_time}.zarr.zip"
+        )
+        log.debug(f"Saving HRV netcdf in {save_file}", memory=get_memory())
+        save_to_zarr_to_backend(hrv_dataset, save_file, encoding_policy=encoding_policy)
     del hrv_dataset
     gc.collect()
     log.debug("Saved HRV to NetCDF", memory=get_memory())
+    return save_file
 
 
-def data_quality_filter(ds: xr.Dataset, threshold_fraction: float = 0.9) -> bool:
+def data_quality_filter(
+    ds: xr.Dataset,
+    threshold_fraction: float = 0.9,
+    stats: Optional[Dict[str, QualityStats]] = None,
+) -> bool:
     """
     Filter out datasets with a high fraction of zeros
 
     Args:
         ds: Dataset to check
         threshold_fraction: Fraction of 0's where the data quality is too low, so fail the check
+        stats: Quality statistics of the data variables of `ds`, computed in one pass over
+            the data if None
 
     Returns:
         False, if the data contains too many zeros
         True, if not
     """
+    if stats is None:
+        stats = compute_dataset_quality_stats(ds)
     for var in ds.data_vars:
-        fraction_of_zeros = np.isclose(ds[var], 0.0).mean()
+        fraction_of_zeros = stats[var].zero_fraction
         if fraction_of_zeros > threshold_fraction:
             log.debug(
                 f"Ignoring dataset {ds} as {var} has {fraction_of_zeros} fraction of zeros"
@@ -428,11 +557,33 @@ def data_quality_filter(ds: xr.Dataset, threshold_fraction: float = 0.9) -> bool
     return True
 
 
+def check_and_annotate_quality(ds: xr.Dataset, threshold_fraction: float = 0.9) -> bool:
+    """
+    Checks the data quality of a dataset, storing its statistics in its attrs
+
+    The statistics of the `data` variable are computed in one pass over the data, logged,
+    and stored as JSON in the `quality_stats` attribute, so they are saved with the file.
+
+    Args:
+        ds: Dataset to check
+        threshold_fraction: Fraction of 0's where the data quality is too low
+
+    Returns:
+        Whether the dataset passes `data_quality_filter`
+    """
+    stats = compute_dataset_quality_stats(ds)
+    log.debug("Computed data quality statistics", **stats["data"].to_dict())
+    ds.attrs["quality_stats"] = stats["data"].to_json()
+    return data_quality_filter(ds, threshold_fraction=threshold_fraction, stats=stats)
+
+
 def get_nonhrv_dataset_from_scene(
     filename: str, scaler, use_rescaler: bool, save_dir, using_backup
-):
+) -> Optional[str]:
     """
-    Returns the Xarray dataset from the filename
+    Saves the non-HRV Xarray dataset from the filename
+
+    Returns the saved filename, or None if the data quality was too low
     """
     if ".nat" in filename:
         scene = load_native_from_zip(filename)
@@ -440,10 +591,21 @@ def get_nonhrv_dataset_from_scene(
         scene = load_hrit_from_zip(filename, sections=list(range(6, 9)))
     scene.load(NON_HRV_BANDS, generate=False,)
     log.debug(f"Loaded non-hrv file: {filename}", memory=get_memory())
+    return save_nonhrv_scene_to_zarr(scene, scaler, use_rescaler, save_dir, using_backup)
+
+
+def save_nonhrv_scene_to_zarr(
+    scene: Scene, scaler, use_rescaler: bool, save_dir, using_backup
+) -> Optional[str]:
+    """
+    Saves the non-HRV Xarray dataset from a Scene with the non-HRV bands loaded
+
+    Returns the saved filename, or None if the data quality was too low
+    """
     dataarray: xr.DataArray = convert_scene_to_dataarray(
         scene, band="IR_016", area="UK", calculate_osgb=True
     )
-    log.debug(f"Converted non-HRV file {filename} to dataarray", memory=get_memory())
+    log.debug("Converted non-HRV scene to dataarray", memory=get_memory())
     del scene
     attrs = serialize_attrs(dataarray.attrs)
     if use_rescaler:
@@ -456,36 +618,79 @@ def get_nonhrv_dataset_from_scene(
             variable_order=NON_HRV_BANDS,
         )
     dataarray = dataarray.transpose("time", "y_geostationary", "x_geostationary", "variable")
-    dataarray = dataarray.chunk((1, 256, 256, 1))
-    dataset = dataarray.to_dataset(name="data")
+    encoding_policy = get_encoding_policy(hrv=False)
+    dataset = encoding_policy.chunk(dataarray.to_dataset(name="data"))
     log.debug("Converted non-HRV to dataset", memory=get_memory())
     del dataarray
     dataset.attrs.update(attrs)
     log.debug("Deleted return list", memory=get_memory())
     now_time = pd.Timestamp(dataset["time"].values[0]).strftime("%Y%m%d%H%M")
 
-    if not data_quality_filter(dataset):
+    if not check_and_annotate_quality(dataset):
         del dataset
         gc.collect()
-        return
+        return None
 
-    save_file = os.path.join(save_dir, f"{'15_' if using_backup else ''}{now_time}.zarr.zip")
-    log.debug(f"Saving non-HRV netcdf in {save_file}", memory=get_memory())
-    save_to_zarr_to_backend(dataset, save_file)
+    daily_store = get_daily_store(hrv=False, using_backup=using_backup)
+    if daily_store is not None:
+        log.debug(f"Writing non-HRV into daily store in {daily_store.root}", memory=get_memory())
+        (save_file,) = daily_store.write(dataset, encoding=encoding_policy.encoding(dataset))
+    else:
+        save_file = os.path.join(save_dir, f"{'15_' if using_backup else ''}{now_time}.zarr.zip")
+        log.debug(f"Saving non-HRV netcdf in {save_file}", memory=get_memory())
+        save_to_zarr_to_backend(dataset, save_file, encoding_policy=encoding_policy)
     del dataset
     gc.collect()
     log.debug(f"Saved non-HRV file {save_file}", memory=get_memory())
+    return save_file
+
+
+def get_datasets_from_native_scene(
+    filename: str, hrv_scaler, scaler, use_rescaler: bool, save_dir, using_backup
+) -> List[Optional[str]]:
+    """
+    Saves the HRV and non-HRV Xarray datasets from a native file, decoding it only once
+
+    The file is opened, and its headers parsed, by a single Scene loading all the bands,
+    which is then split into an HRV and a non-HRV Scene, as the HRV band is on a
+    different grid.
+
+    Returns the saved HRV and non-HRV filenames, None if the data quality was too low
+    """
+    log.debug(f"Loading Native {filename}", memory=get_memory())
+    scene = load_native_from_zip(filename)
+    scene.load(["HRV"] + NON_HRV_BANDS, generate=False)
+    log.debug(f"Loaded HRV and non-HRV from {filename}", memory=get_memory())
+
+    hrv_scene = split_scene(scene, ["HRV"])
+    nonhrv_scene = split_scene(scene, NON_HRV_BANDS)
+    del scene
+
+    return [
+        save_hrv_scene_to_zarr(hrv_scene, hrv_scaler, use_rescaler, save_dir, using_backup),
+        save_nonhrv_scene_to_zarr(nonhrv_scene, scaler, use_rescaler, save_dir, using_backup),
+    ]
+
+
+def split_scene(scene: Scene, bands: list) -> Scene:
+    """Returns a new Scene with only some of the loaded bands of a Scene, sharing their data"""
+    new_scene = Scene()
+    for band in bands:
+        new_scene[band] = scene[band]
+    return new_scene
 
 
 def load_hrit_from_zip(filename: str, sections: list) -> Scene:
     """Load HRIT Zip from Data Tailor to Scene for use downstream tasks"""
-    if os.path.exists("temp_hrit"):
-        shutil.rmtree("temp_hrit/")
+    # One directory per process and thread, so files can be converted in parallel
+    temp_hrit = f"temp_hrit_{os.getpid()}_{threading.get_ident()}"
+    if os.path.exists(temp_hrit):
+        shutil.rmtree(temp_hrit)
     with ZipFile(filename, "r") as zipObj:
         # Extract all the contents of zip file in current directory
-        zipObj.extractall(path="temp_hrit")
+        zipObj.extractall(path=temp_hrit)
     the_files = []
-    for f in list(glob.glob("temp_hrit/*")):
+    for f in list(glob.glob(f"{temp_hrit}/*")):
         if "PRO" in f or "EPI" in f:
             the_files.append(f)
         for segment in [f"-0000{str(i).zfill(2)}" for i in sections]:
@@ -501,29 +706,26 @@ def load_native_from_zip(filename: str) -> Scene:
     return scene
 
 
-def save_native_to_zarr(
-    list_of_native_files: list,
+def save_native_file_to_zarr(
+    native_file: str,
     bands: list = ALL_BANDS,
     save_dir: str = "./",
     use_rescaler: bool = False,
     using_backup: bool = False,
-) -> None:
+) -> List[str]:
     """
-    Saves native files to NetCDF for consumer
+    Saves a single native file to NetCDF for consumer
 
     Args:
-        list_of_native_files: List of native files to convert into a single NetCDF file
+        native_file: Native or HRIT file to convert
         bands: Bands to save
         save_dir: Directory to save the netcdf files
         use_rescaler: Whether to rescale between 0 and 1 or not
         using_backup: Whether the input data is the backup 15 minutely data or not
-    """
-
-    log.debug(
-        f"Converting from {'HRIT' if using_backup else 'native'} to zarr in {save_dir}",
-        memory=get_memory(),
-    )
 
+    Returns:
+        List of the saved filenames
+    """
     scaler = ScaleToZeroToOne(
         mins=SCALER_MINS,
         maxs=SCALER_MAXS,
@@ -532,26 +734,168 @@ def save_native_to_zarr(
     hrv_scaler = ScaleToZeroToOne(
         variable_order=["HRV"], maxs=HRV_SCALER_MAX, mins=HRV_SCALER_MIN
     )
-    for f in list_of_native_files:
-        log.debug(f"Processing {f}", memory=get_memory())
-        if "EPCT" in f:
-            log.debug(f"Processing HRIT file {f}", memory=get_memory())
-            if "HRV" in f:
-                log.debug(f"Processing HRV {f}", memory=get_memory())
+    f = native_file
+    log.debug(f"Processing {f}", memory=get_memory())
+    if "EPCT" in f:
+        log.debug(f"Processing HRIT file {f}", memory=get_memory())
+        if "HRV" in f:
+            log.debug(f"Processing HRV {f}", memory=get_memory())
+            saved_files = [
                 get_dataset_from_scene(f, hrv_scaler, use_rescaler, save_dir, using_backup)
-            else:
-                log.debug(f"Processing non-HRV {f}", memory=get_memory())
-                get_nonhrv_dataset_from_scene(f, scaler, use_rescaler, save_dir, using_backup)
+            ]
         else:
-            if "HRV" in bands:
-                log.debug(f"Processing HRV {f}", memory=get_memory())
-                get_dataset_from_scene(f, hrv_scaler, use_rescaler, save_dir, using_backup)
-
             log.debug(f"Processing non-HRV {f}", memory=get_memory())
+            saved_files = [
+                get_nonhrv_dataset_from_scene(f, scaler, use_rescaler, save_dir, using_backup)
+            ]
+    elif "HRV" in bands:
+        log.debug(f"Processing HRV and non-HRV {f}", memory=get_memory())
+        saved_files = get_datasets_from_native_scene(
+            f, hrv_scaler, scaler, use_rescaler, save_dir, using_backup
+        )
+    else:
+        log.debug(f"Processing non-HRV {f}", memory=get_memory())
+        saved_files = [
             get_nonhrv_dataset_from_scene(f, scaler, use_rescaler, save_dir, using_backup)
+        ]
+
+    return [saved_file for saved_file in saved_files if saved_file is not None]
+
+
+def _init_conversion_worker(
+    memory_limit_mb: Optional[int],
+    osgb_cache_dir: Optional[str],
+    daily_store_dir: Optional[str] = None,
+    output_compression: Optional[Tuple[str, int, str]] = None,
+):
+    """Sets up a conversion worker process, capping its memory if asked"""
+    # Each worker converts one file at a time, the parallelism is across the workers
+    dask.config.set(scheduler="synchronous")
+    set_osgb_grid_cache_dir(osgb_cache_dir)
+    set_daily_store_dir(daily_store_dir)
+    if output_compression is not None:
+        set_output_compression(*output_compression)
+    if memory_limit_mb is not None:
+        import resource
+
+        memory_limit_bytes = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+
+
+def save_native_files_to_zarr_in_parallel(
+    list_of_native_files: list,
+    bands: list = ALL_BANDS,
+    save_dir: str = "./",
+    use_rescaler: bool = False,
+    using_backup: bool = False,
+    num_workers: int = 2,
+    worker_memory_limit_mb: Optional[int] = None,
+) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    """
+    Saves native files to NetCDF for consumer, converting files in parallel processes
+
+    Args:
+        list_of_native_files: List of native files to convert
+        bands: Bands to save
+        save_dir: Directory to save the netcdf files
+        use_rescaler: Whether to rescale between 0 and 1 or not
+        using_backup: Whether the input data is the backup 15 minutely data or not
+        num_workers: Number of worker processes, each converting one file at a time
+        worker_memory_limit_mb: Maximum address space of each worker process in MB,
+            a file making a worker go over it fails with a MemoryError. None for no limit
+
+    Returns:
+        Dictionary of the saved filenames per native file, and dictionary of the error
+        per native file which failed to convert
+    """
+    log.debug(
+        f"Converting {len(list_of_native_files)} files to zarr in {save_dir} "
+        f"with {num_workers} workers",
+        memory=get_memory(),
+    )
+
+    results = {}
+    failures = {}
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        initializer=_init_conversion_worker,
+        initargs=(
+            worker_memory_limit_mb,
+            osgb_grid_cache.cache_dir,
+            get_daily_store_dir(),
+            get_output_compression(),
+        ),
+    ) as executor:
+        futures = {
+            executor.submit(
+                save_native_file_to_zarr, f, bands, save_dir, use_rescaler, using_backup
+            ): f
+            for f in list_of_native_files
+        }
+        for future in as_completed(futures):
+            f = futures[future]
+            try:
+                results[f] = future.result()
+                log.debug(f"Finished processing {f}", memory=get_memory())
+            except Exception as e:
+                log.error(f"Failed to convert {f}: {e!r}", memory=get_memory())
+                failures[f] = repr(e)
+
+    return results, failures
+
+
+def save_native_to_zarr(
+    list_of_native_files: list,
+    bands: list = ALL_BANDS,
+    save_dir: str = "./",
+    use_rescaler: bool = False,
+    using_backup: bool = False,
+    num_workers: int = 1,
+    worker_memory_limit_mb: Optional[int] = None,
+) -> List[str]:
+    """
+    Saves native files to NetCDF for consumer
+
+    Args:
+        list_of_native_files: List of native files to convert into a single NetCDF file
+        bands: Bands to save
+        save_dir: Directory to save the netcdf files
+        use_rescaler: Whether to rescale between 0 and 1 or not
+        using_backup: Whether the input data is the backup 15 minutely data or not
+        num_workers: Number of files converted in parallel processes, 1 to convert them
+            one after the other in this process. In parallel, files which fail to convert
+            are logged and skipped instead of raising
+        worker_memory_limit_mb: Maximum address space of each worker process in MB
+
+    Returns:
+        List of the saved filenames
+    """
+
+    log.debug(
+        f"Converting from {'HRIT' if using_backup else 'native'} to zarr in {save_dir}",
+        memory=get_memory(),
+    )
+
+    if num_workers > 1 and len(list_of_native_files) > 1:
+        results, _ = save_native_files_to_zarr_in_parallel(
+            list_of_native_files,
+            bands=bands,
+            save_dir=save_dir,
+            use_rescaler=use_rescaler,
+            using_backup=using_backup,
+            num_workers=num_workers,
+            worker_memory_limit_mb=worker_memory_limit_mb,
+        )
+        return [saved_file for f in list_of_native_files for saved_file in results.get(f, [])]
+
+    saved_files = []
+    for f in list_of_native_files:
+        saved_files += save_native_file_to_zarr(f, bands, save_dir, use_rescaler, using_backup)
 
         log.debug(f"Finished processing files: {list_of_native_files}", memory=get_memory())
 
+    return saved_files
+
 
 def save_dataarray_to_zarr(
     dataarray: xr.DataArray,
@@ -692,52 +1036,218 @@ def create_markdown_table(table_info: dict, index_name: str = "Id") -> str:
     return md_str
 
 
-def save_to_zarr_to_backend(dataset: xr.Dataset, filename: str):
-    """Save xarray to netcdf in a Database of your choice, by default: s3
+class _UnseekableWriter:
+    """Write-only file wrapper, making zipfile stream to it without seeking back"""
+
+    def __init__(self, fileobj):
+        """Init"""
+        self._fileobj = fileobj
+        self._position = 0
+
+    def write(self, data) -> int:
+        """Write data to the underlying file"""
+        self._fileobj.write(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        """Number of bytes written so far"""
+        return self._position
+
+    def seek(self, *args):
+        """Seeking is not supported, which zipfile detects"""
+        raise OSError("Stream is not seekable")
+
+    def flush(self):
+        """Flush the underlying file"""
+        self._fileobj.flush()
+
+
+class StreamingZipStore(zarr.storage.ZipStore):
+    """
+    Zarr store writing a zip file to a stream, such as a file being uploaded to s3 or gcs
+
+    The zip entries are written one after the other, with their sizes after their data,
+    so the stream is never read or seeked back, and a remote file is uploaded in parts as
+    it is written. The metadata written is also kept in memory, so it can be consolidated.
+    """
+
+    def __init__(self, fileobj, compression=ZIP_STORED, allowZip64=True):
+        """Init
+
+        Args:
+            fileobj: File opened for writing, e.g. with `fsspec.open(filename, "wb")`
+            compression: Compression of the zip entries
+            allowZip64: Whether to allow zip files larger than 4 GB
+        """
+        self.path = getattr(fileobj, "path", str(fileobj))
+        self.compression = compression
+        self.allowZip64 = allowZip64
+        self.mode = "w"
+        self._dimension_separator = None
+        self.mutex = threading.RLock()
+        self._metadata = {}
+        self.zf = ZipFile(
+            _UnseekableWriter(fileobj), mode="w", compression=compression, allowZip64=allowZip64
+        )
+
+    def __setitem__(self, key, value):
+        """Write an entry, keeping the metadata entries in memory"""
+        if os.path.basename(key).startswith(".z"):
+            self._metadata[key] = bytes(numcodecs.compat.ensure_contiguous_ndarray(value))
+        super().__setitem__(key, value)
+
+    def __getitem__(self, key):
+        """Read back a metadata entry, the only ones kept"""
+        with self.mutex:
+            return self._metadata[key]
+
+    def flush(self):
+        """Entries are flushed as they are written"""
+
+    def clear(self):
+        """A stream can't be cleared"""
+        raise NotImplementedError
+
+
+def _num_chunk_writers(dataset: xr.Dataset, max_memory_mb: float) -> int:
+    """Number of chunks of a dataset which can be written at once within a memory budget"""
+    chunk_nbytes = max(
+        (
+            variable.dtype.itemsize * int(np.prod([max(c) for c in variable.chunks]))
+            for variable in dataset.data_vars.values()
+            if variable.chunks
+        ),
+        default=1,
+    )
+    num_chunks = int(max_memory_mb * 1024**2 // (CHUNK_WRITE_COPIES * chunk_nbytes))
+    return max(1, min(num_chunks, os.cpu_count() or 1))
+
+
+def _to_zarr_within_memory_budget(
+    dataset: xr.Dataset, store, max_memory_mb: Optional[float] = None, **kwargs
+):
+    """
+    Writes a dataset to zarr, with at most `max_memory_mb` of chunks in memory at once
+
+    The dataset should be chunked as it is saved, so every chunk is read, encoded and
+    written on its own, and the write is computed by as many threads as there are chunks
+    fitting in the budget.
+
+    Args:
+        dataset: Dataset to write, lazily loaded
+        store: Zarr store to write to
+        max_memory_mb: Memory budget of the chunks being written, in MB, None to write
+            with dask's default scheduler
+        **kwargs: Arguments of `Dataset.to_zarr`
+    """
+    if max_memory_mb is None:
+        dataset.to_zarr(store, compute=True, **kwargs)
+        return
+    num_workers = _num_chunk_writers(dataset, max_memory_mb)
+    log.debug(f"Writing with {num_workers} chunks at once", memory=get_memory())
+    delayed_write = dataset.to_zarr(store, compute=False, **kwargs)
+    delayed_write.compute(scheduler="threads", num_workers=num_workers)
 
-    1. Save in temp local dir
-    2. upload to the Database
+
+def save_to_zarr_to_backend(
+    dataset: xr.Dataset,
+    filename: str,
+    encoding_policy: Optional[EncodingPolicy] = None,
+    max_memory_mb: Optional[float] = None,
+):
+    """Save xarray to zarr zip in a Database of your choice, by default: s3
+
+    A local file is written directly, then renamed into place, and a remote file is
+    streamed to the Database as it is written, without a local copy, then moved into place.
     :param dataset: The Xarray Dataset to be save
     :param filename: The Database filename
+    :param encoding_policy: Compression and chunking of the variables, or else the data
+        is saved as int16 with the default compressor, in the chunks of the dataset
+    :param max_memory_mb: Memory budget of the chunks being written at once, in MB,
+        see `_to_zarr_within_memory_budget`
     """
 
     gc.collect()
     log.info(f"Saving file to {filename}", memory=get_memory())
 
-    with tempfile.TemporaryDirectory() as dir:
-        # save locally
-        path = f"{dir}/temp.zarr.zip"
+    if encoding_policy is None:
         encoding = {"data": {"dtype": "int16"}}
+    else:
+        dataset = encoding_policy.chunk(dataset)
+        encoding = encoding_policy.encoding(dataset)
 
-        # make sure variable is string
-        dataset = dataset.assign_coords({"variable": dataset.coords["variable"].astype(str)})
-
-        log.debug(f"Dataset time: {dataset.time}", memory=get_memory())
-
-        with zarr.ZipStore(path) as store:
-            dataset.to_zarr(store, compute=True, mode="w", encoding=encoding, consolidated=True)
-
-        new_times = xr.open_dataset(f"zip::{path}", engine="zarr").time
-        log.debug(f"New times for {path}: {new_times}", memory=get_memory())
-
-        log.debug(f"Saved to temporary file {path}, now pushing to {filename}", memory=get_memory())
-        # save to Database
-        filesystem = fsspec.open(filename).fs
-        filesystem.put(path, filename)
+    # make sure variable is string
+    dataset = dataset.assign_coords({"variable": dataset.coords["variable"].astype(str)})
 
+    # The times are logged from the dataset in memory, rather than read back from the file
+    log.debug(f"Dataset times for {filename}: {dataset.time.values}", memory=get_memory())
 
-def filter_dataset_ids_on_current_files(datasets: list, save_dir: str) -> list:
+    filesystem = fsspec.open(filename).fs
+    if isinstance(filesystem, LocalFileSystem):
+        path = filesystem._strip_protocol(filename)
+        # Write then rename, so the file is never read while partially written
+        temp_path = f"{path}.{secrets.token_hex(6)}.tmp"
+        try:
+            with zarr.ZipStore(temp_path, mode="w") as store:
+                _to_zarr_within_memory_budget(
+                    dataset,
+                    store,
+                    max_memory_mb,
+                    mode="w",
+                    encoding=encoding,
+                    consolidated=True,
+                )
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    else:
+        # Streamed to a temporary file, then moved into place, so a failed write never
+        # leaves a file at `filename`, which would be taken as saved
+        temp_filename = f"{filename}.{secrets.token_hex(6)}.tmp"
+        try:
+            with filesystem.open(temp_filename, "wb") as f:
+                with StreamingZipStore(f) as store:
+                    _to_zarr_within_memory_budget(
+                        dataset,
+                        store,
+                        max_memory_mb,
+                        mode="w",
+                        encoding=encoding,
+                        consolidated=True,
+                    )
+            filesystem.mv(temp_filename, filename)
+        except BaseException:
+            if filesystem.exists(temp_filename):
+                filesystem.rm(temp_filename)
+            raise
+
+    log.debug(f"Saved {filename}", memory=get_memory())
+
+
+def filter_dataset_ids_on_current_files(
+    datasets: list,
+    save_dir: str,
+    manifest: Optional[Manifest] = None,
+    daily_store: Optional[DailyZarrStore] = None,
+) -> list:
     """
     Filter dataset ids on files in a directory
 
     The following occurs:
     1. get ids of files that will be downloaded
-    2. get datetimes of already downloaded files
+    2. get datetimes of already downloaded files, from the daily store or the manifest if
+       given, or else by listing the directory and its latest directory
     3. only keep indexes where we need to download them
 
     Args:
         datasets: list of datasets with ids
         save_dir: The directory where files wil be saved
+        manifest: Manifest of the files saved in `save_dir`, loaded once per run, so no
+            listing is needed
+        daily_store: Daily store of the non-HRV data, when the data is written into daily
+            stores instead of files in `save_dir`
 
     Returns:
         The filtered list of new datasets ids to download
@@ -745,6 +1255,44 @@ def filter_dataset_ids_on_current_files(datasets: list, save_dir: str) -> list:
     from satip.eumetsat import eumetsat_filename_to_datetime
 
     ids = [dataset["id"] for dataset in datasets]
+    if daily_store is not None:
+        is_finished = daily_store.__contains__
+    elif manifest is not None:
+        log.debug(f"Found {len(manifest)} already downloaded in the manifest")
+        is_finished = manifest.__contains__
+    else:
+        finished_datetimes = _list_finished_datetimes(save_dir)
+        is_finished = set(finished_datetimes).__contains__
+
+    datetimes = [pd.Timestamp(eumetsat_filename_to_datetime(idx)).round("5 min") for idx in ids]
+    if not datetimes:  # Empty list
+        log.debug("No datetimes to download")
+        return []
+    log.debug(f"The latest datetime that we want to downloaded is {max(datetimes)}")
+
+    # find which indexes to remove, if file is already there
+    idx_to_remove = []
+    for idx, date in enumerate(datetimes):
+        if is_finished(date):
+            idx_to_remove.append(idx)
+            log.debug(f"Will not be downloading file with {date=} as already downloaded")
+        else:
+            log.debug(f"Will be downloading file with {date=}")
+    log.debug(
+        f"Will be not be downloading {len(idx_to_remove)} files "
+        f"as they have already been downloaded"
+    )
+
+    # remove index
+    indices = sorted(idx_to_remove, reverse=True)
+    for idx in indices:
+        if idx < len(datasets):
+            datasets.pop(idx)
+    return datasets
+
+
+def _list_finished_datetimes(save_dir: str) -> list:
+    """Gets the datetimes of the files in a directory and its latest directory"""
     filesystem = fsspec.open(save_dir).fs
     finished_files_not_latest = list(filesystem.glob(f"{save_dir}/*.zarr.zip"))
     log.debug(f"Found {len(finished_files_not_latest)} already downloaded in data folder")
@@ -758,12 +1306,6 @@ def filter_dataset_ids_on_current_files(datasets: list, save_dir: str) -> list:
     finished_files = finished_files_not_latest + finished_files_latest
     log.debug(f"Found {len(finished_files)} already downloaded")
 
-    datetimes = [pd.Timestamp(eumetsat_filename_to_datetime(idx)).round("5 min") for idx in ids]
-    if not datetimes:  # Empty list
-        log.debug("No datetimes to download")
-        return []
-    log.debug(f"The latest datetime that we want to downloaded is {max(datetimes)}")
-
     finished_datetimes = []
 
     # get datetimes of the finished files
@@ -781,26 +1323,7 @@ def filter_dataset_ids_on_current_files(datasets: list, save_dir: str) -> list:
         log.debug(f"The already downloaded finished datetime are {finished_datetimes}")
     else:
         log.debug("There are no files already downloaded")
-
-    # find which indexes to remove, if file is already there
-    idx_to_remove = []
-    for idx, date in enumerate(datetimes):
-        if date in finished_datetimes:
-            idx_to_remove.append(idx)
-            log.debug(f"Will not be downloading file with {date=} as already downloaded")
-        else:
-            log.debug(f"Will be downloading file with {date=}")
-    log.debug(
-        f"Will be not be downloading {len(idx_to_remove)} files "
-        f"as they have already been downloaded"
-    )
-
-    # remove index
-    indices = sorted(idx_to_remove, reverse=True)
-    for idx in indices:
-        if idx < len(datasets):
-            datasets.pop(idx)
-    return datasets
+    return finished_datetimes
 
 
 def get_latest_subdir_path(save_dir: str, mkdir=False) -> str:
@@ -819,10 +1342,69 @@ def get_latest_subdir_path(save_dir: str, mkdir=False) -> str:
     return latest_dir
 
 
+def _saved_file_time(filename: str) -> pd.Timestamp:
+    """Gets the UTC time of a saved HRV or non-HRV file from its name, NaT if it has none"""
+    name = filename.replace("15_", "").split(".zarr.zip")[0].split("/")[-1]
+    if "hrv" in filename:
+        name = name.split("_")[-1]
+    return pd.to_datetime(name, format="%Y%m%d%H%M", errors="coerce", utc=True)
+
+
+def _move_files(filesystem: fsspec.AbstractFileSystem, moves: Dict[str, str]):
+    """
+    Moves files, in batches on remote filesystems
+
+    On object stores, a move is a copy then a delete, so all the files are copied
+    concurrently, `HOUSEKEEPING_BATCH_SIZE` at a time, then deleted in bulk.
+
+    Args:
+        filesystem: Filesystem of the files
+        moves: Destination path of each file to move
+    """
+    if not moves:
+        return
+    if isinstance(filesystem, LocalFileSystem):
+        for source, destination in moves.items():
+            filesystem.mv(source, destination)
+        return
+    filesystem.copy(list(moves), list(moves.values()), **_copy_kwargs(filesystem))
+    _remove_files(filesystem, list(moves))
+
+
+def _remove_files(filesystem: fsspec.AbstractFileSystem, paths: List[str]):
+    """Deletes files, in bulk on remote filesystems"""
+    if not paths:
+        return
+    if isinstance(filesystem, LocalFileSystem):
+        for path in paths:
+            filesystem.rm(path)
+        return
+    filesystem.rm(paths, **_rm_kwargs(filesystem))
+
+
+def _copy_kwargs(filesystem: fsspec.AbstractFileSystem) -> dict:
+    """Bounds the concurrency of the bulk copies of async filesystems, like s3 and gcs"""
+    return {"batch_size": HOUSEKEEPING_BATCH_SIZE} if filesystem.async_impl else {}
+
+
+def _rm_kwargs(filesystem: fsspec.AbstractFileSystem) -> dict:
+    """Bounds the concurrency of the bulk deletes, with the keyword of the filesystem if any"""
+    protocols = filesystem.protocol
+    if isinstance(protocols, str):
+        protocols = (protocols,)
+    for protocol in protocols:
+        if protocol in RM_BATCH_SIZE_KEYWORDS:
+            return {RM_BATCH_SIZE_KEYWORDS[protocol]: HOUSEKEEPING_BATCH_SIZE}
+    return {}
+
+
 def move_older_files_to_different_location(save_dir: str, history_time: pd.Timestamp):
     """
     Move older files in save_dir to a different location
 
+    Each directory is listed once, all the moves and deletes are planned from the
+    listings, then run in batches.
+
     Args:
         save_dir: Directory where data is being saved
         history_time: History time to keep files
@@ -832,76 +1414,68 @@ def move_older_files_to_different_location(save_dir: str, history_time: pd.Times
 
     filesystem = fsspec.open(save_dir).fs
 
-    # Now to move into latest
     finished_files = filesystem.glob(f"{save_dir}/*.zarr.zip")
+    latest_files = filesystem.glob(f"{latest_dir}/*.zarr.zip")
+    latest_names = {filename.split("/")[-1] for filename in latest_files}
 
+    into_latest = {}
+    to_remove = []
     log.info(f"Checking {save_dir}/ for moving newer files into {latest_dir}")
-
-    # get datetimes of the finished files
-
     for date in finished_files:
         log.debug(f"Looking at file {date}")
-        if "latest.zarr" in date or "tmp" in date:
+        if "latest.zarr" in date or "tmp" in date.split("/")[-1]:
+            continue
+        file_time = _saved_file_time(date)
+        if pd.isna(file_time):
+            log.debug(f"Skipping file {date}, its name has no time")
             continue
-        if "hrv" in date:
-            file_time = pd.to_datetime(
-                date.replace("15_", "").split(".zarr.zip")[0].split("/")[-1].split("_")[-1],
-                format="%Y%m%d%H%M",
-                errors="ignore",
-                utc=True,
-            )
-        else:
-            file_time = pd.to_datetime(
-                date.replace("15_", "").split(".zarr.zip")[0].split("/")[-1],
-                format="%Y%m%d%H%M",
-                errors="ignore",
-                utc=True,
-            )
         if file_time > history_time:
-            log.debug("Moving file into {LATEST_DIR_NAME} folder")
             # Move HRV and non-HRV to new place
-            filename = f"{latest_dir}/{date.split('/')[-1]}"
-            if filesystem.exists(filename):
-                log.debug(f"File already in {LATEST_DIR_NAME} folder, so not moving {filename}")
+            name = date.split("/")[-1]
+            if name in latest_names:
+                log.debug(f"File already in {LATEST_DIR_NAME} folder, so not moving {name}")
             else:
-                filesystem.move(date, f"{latest_dir}/{date.split('/')[-1]}")
+                log.debug(f"Moving file {name} into {LATEST_DIR_NAME} folder")
+                into_latest[date] = f"{latest_dir}/{name}"
         elif file_time < (history_time - pd.Timedelta("2 days")):
             # Delete files over 2 days old
-            log.debug("Removing file over 2 days over")
-            filesystem.rm(date)
+            log.debug(f"Removing file {date} over 2 days old")
+            to_remove.append(date)
 
-    finished_files = filesystem.glob(f"{latest_dir}/*.zarr.zip")
+    out_of_latest = {}
     log.info(f"Checking {latest_dir} for older files")
-    # get datetimes of the finished files
-    for date in finished_files:
+    for date in latest_files:
         log.debug(f"Looking at file {date}")
-        if "latest.zarr" in date or "latest_15.zarr" in date or "tmp" in date:
+        if "latest.zarr" in date or "latest_15.zarr" in date or "tmp" in date.split("/")[-1]:
+            continue
+        file_time = _saved_file_time(date)
+        if pd.isna(file_time):
+            log.debug(f"Skipping file {date}, its name has no time")
             continue
-        if "hrv" in date:
-            file_time = pd.to_datetime(
-                date.replace("15_", "").split(".zarr.zip")[0].split("/")[-1].split("_")[-1],
-                format="%Y%m%d%H%M",
-                errors="ignore",
-                utc=True,
-            )
-        else:
-            file_time = pd.to_datetime(
-                date.replace("15_", "").split(".zarr.zip")[0].split("/")[-1],
-                format="%Y%m%d%H%M",
-                errors="ignore",
-                utc=True,
-            )
         if file_time < history_time:
-            log.debug("Moving file out of {LATEST_DIR_NAME} folder")
-            # Move HRV and non-HRV to new place
-            filesystem.move(date, f"{save_dir}/{date.split('/')[-1]}")
+            log.debug(f"Moving file {date} out of {LATEST_DIR_NAME} folder")
+            out_of_latest[date] = f"{save_dir}/{date.split('/')[-1]}"
+
+    log.info(
+        f"Moving {len(into_latest)} files into and {len(out_of_latest)} files out of "
+        f"{LATEST_DIR_NAME} folder, removing {len(to_remove)} files"
+    )
+    _move_files(filesystem, into_latest)
+    _remove_files(filesystem, to_remove)
+    _move_files(filesystem, out_of_latest)
 
 
-def check_both_final_files_exists(save_dir: str, using_backup: bool = False):
-    """Check that both final files exists"""
+def check_both_final_files_exists(
+    save_dir: str, using_backup: bool = False, incremental: bool = False
+):
+    """Check that both final files exists, or the appendable latest stores if `incremental`"""
     latest_dir = get_latest_subdir_path(save_dir)
     hrv_filename = f"{latest_dir}/hrv_latest{'_15' if using_backup else ''}.zarr.zip"
     filename = f"{latest_dir}/latest{'_15' if using_backup else ''}.zarr.zip"
+    if incremental:
+        hrv_filename, filename = map(
+            _latest_store_pointer, get_latest_store_paths(save_dir, using_backup)
+        )
 
     log.debug(f"Checking {hrv_filename} and or {filename} exists")
 
@@ -938,15 +1512,33 @@ def add_backend_to_filenames(files, backend):
         raise ValueError(f"Unsupported backend: {backend}")
 
 
-def collate_files_into_latest(save_dir: str, using_backup: bool = False, backend: str = "s3"):
+def collate_files_into_latest(
+    save_dir: str,
+    using_backup: bool = False,
+    backend: str = "s3",
+    incremental: bool = False,
+    max_memory_mb: float = COLLATION_MEMORY_BUDGET_MB,
+):
     """
     Convert individual files into single latest file for HRV and non-HRV
 
+    The files are read lazily in their chunks on disk, and written chunk by chunk, so the
+    whole data is never in memory at once.
+
     Args:
         save_dir: Directory where data is being saved
         using_backup: Whether the input data is made up of the 15 minutely backup data or not
         backend: Backend type, e.g., "s3", "gs", "az", or "local"
+        incremental: Append the new files to appendable latest stores instead of rewriting
+            the latest zips, see `append_files_into_latest_stores`
+        max_memory_mb: Memory budget of the chunks being collated at once, in MB
     """
+    if incremental:
+        append_files_into_latest_stores(
+            save_dir, using_backup=using_backup, backend=backend, max_memory_mb=max_memory_mb
+        )
+        return
+
     filesystem = fsspec.open(save_dir).fs
     latest_dir = get_latest_subdir_path(save_dir)
     hrv_files = list(
@@ -958,25 +1550,15 @@ def collate_files_into_latest(save_dir: str, using_backup: bool = False, backend
     filename = f"{latest_dir}/hrv_latest{'_15' if using_backup else ''}.zarr.zip"
     filename_temp = f"{latest_dir}/hrv_tmp_{secrets.token_hex(6)}.zarr.zip"
     log.debug(f"Collating HRV files {filename}")
-    hrv_files = add_backend_to_filenames(hrv_files, backend)  # Added backend prefix for hrv files
     log.debug(hrv_files)
-    dataset = (
-        xr.open_mfdataset(
-            hrv_files,
-            concat_dim="time",
-            combine="nested",
-            engine="zarr",
-            consolidated=True,
-            chunks="auto",
-            mode="r",
-        )
-        .sortby("time")
-        .drop_duplicates("time")
-    )
+    dataset = _open_timestep_files(hrv_files, backend)
     log.debug(dataset.time.values)
-    save_to_zarr_to_backend(dataset, filename_temp)
-    new_times = xr.open_dataset(f"zip::{filename_temp}", engine="zarr").time
-    log.debug(f"{filename_temp}  {new_times}")
+    save_to_zarr_to_backend(
+        dataset,
+        filename_temp,
+        encoding_policy=get_encoding_policy(hrv=True),
+        max_memory_mb=max_memory_mb,
+    )
 
     # rename
     log.debug("Renaming")
@@ -986,32 +1568,21 @@ def collate_files_into_latest(save_dir: str, using_backup: bool = False, backend
     except Exception as e:
         log.warn(f"Error removing {filename}: {e}", exc_info=True)
     filesystem.mv(filename_temp, filename)
-    new_times = xr.open_dataset(f"zip::{filename}", engine="zarr").time
-    log.debug(f"{filename} {new_times}")
+    log.debug(f"{filename} {dataset.time.values}")
 
     filename = f"{latest_dir}/latest{'_15' if using_backup else ''}.zarr.zip"
     filename_temp = f"{latest_dir}/tmp_{secrets.token_hex(6)}.zarr.zip"
     log.debug(f"Collating non-HRV files {filename}")
     nonhrv_files = list(filesystem.glob(f"{latest_dir}/{'15_' if using_backup else ''}2*.zarr.zip"))
-    nonhrv_files = add_backend_to_filenames(nonhrv_files, backend)  # backend prefix for nonhrv
     log.debug(nonhrv_files)
-    o_dataset = (
-        xr.open_mfdataset(
-            nonhrv_files,
-            concat_dim="time",
-            combine="nested",
-            engine="zarr",
-            consolidated=True,
-            chunks="auto",
-            mode="r",
-        )
-        .sortby("time")
-        .drop_duplicates("time")
-    )
+    o_dataset = _open_timestep_files(nonhrv_files, backend)
     log.debug(o_dataset.time.values)
-    save_to_zarr_to_backend(o_dataset, filename_temp)
-    new_times = xr.open_dataset(f"zip::{filename_temp}", engine="zarr").time
-    log.debug(f"{filename_temp} {new_times}")
+    save_to_zarr_to_backend(
+        o_dataset,
+        filename_temp,
+        encoding_policy=get_encoding_policy(hrv=False),
+        max_memory_mb=max_memory_mb,
+    )
 
     log.debug("Renaming")
     filesystem = fsspec.open(filename_temp).fs
@@ -1020,9 +1591,247 @@ def collate_files_into_latest(save_dir: str, using_backup: bool = False, backend
     except Exception as e:
         log.warn(f"Error removing {filename}: {e}", exc_info=True)
     filesystem.mv(filename_temp, filename)
+    log.debug(f"{filename} {o_dataset.time.values}")
+
+
+def get_latest_store_paths(save_dir: str, using_backup: bool = False) -> Tuple[str, str]:
+    """
+    Gets the paths of the appendable HRV and non-HRV latest stores
+
+    The data of a store is in versioned zarr directory stores next to it, and the current
+    version is the one named by the pointer of the store, see `resolve_latest_store`.
+
+    Args:
+        save_dir: Directory where data is being saved
+        using_backup: Whether the data is the 15 minutely backup data or not
+
+    Returns:
+        2-tuple of the HRV and non-HRV latest store paths in the latest directory
+    """
+    latest_dir = get_latest_subdir_path(save_dir)
+    suffix = "_15" if using_backup else ""
+    return f"{latest_dir}/hrv_latest{suffix}.zarr", f"{latest_dir}/latest{suffix}.zarr"
+
+
+def _filename_to_time(filename: str) -> pd.Timestamp:
+    """Gets the time of a timestep file from its name, e.g. 15_hrv_202301011205.zarr.zip"""
+    name = filename.split("/")[-1].split(".zarr.zip")[0].replace("15_", "").split("_")[-1]
+    return pd.to_datetime(name, format="%Y%m%d%H%M")
+
+
+def _order_timestep_files(files: List[str]) -> List[str]:
+    """Sorts timestep files by the times in their names, keeping the first file of each time"""
+    files_by_time = {}
+    for filename in sorted(files, key=lambda f: (_filename_to_time(f), f)):
+        files_by_time.setdefault(_filename_to_time(filename), filename)
+    return list(files_by_time.values())
+
+
+def _open_timestep_files(files: List[str], backend: str) -> xr.Dataset:
+    """
+    Opens timestep files as one lazy dataset, sorted by time, without duplicate times
+
+    The order of the timesteps is worked out from the filenames, rather than by sorting
+    and de-duplicating the opened dataset, which would reindex it across the files. So the
+    data keeps the chunks of the files, one timestep per chunk, and every chunk of the
+    dataset is read from exactly one chunk of a file.
+    """
+    dataset = xr.open_mfdataset(
+        add_backend_to_filenames(_order_timestep_files(files), backend),
+        concat_dim="time",
+        combine="nested",
+        engine="zarr",
+        consolidated=True,
+        chunks={},
+        mode="r",
+    )
+    return dataset.assign_coords({"variable": dataset.coords["variable"].astype(str)})
+
+
+def _latest_store_pointer(store_path: str) -> str:
+    """Path of the pointer file naming the current version of a latest store"""
+    return f"{store_path}.json"
+
 
-    new_times = xr.open_dataset(f"zip::{filename}", engine="zarr", cache=False).time
-    log.debug(f"{filename} {new_times}")
+def resolve_latest_store(store_path: str) -> Optional[str]:
+    """
+    Gets the current version of an appendable latest store, as readers should open it
+
+    Args:
+        store_path: Path of the latest store, as returned by `get_latest_store_paths`
+
+    Returns:
+        The path of the zarr directory store of the current version, or None if there is
+        no store yet
+    """
+    pointer = _latest_store_pointer(store_path)
+    filesystem = fsspec.open(pointer).fs
+    if not filesystem.exists(pointer):
+        return None
+    with filesystem.open(pointer, "r") as f:
+        version = json.load(f)["store"]
+    return f"{store_path.rsplit('/', 1)[0]}/{version}"
+
+
+def _update_latest_store_pointer(store_path: str, version_path: str):
+    """
+    Points a latest store to a new version, then removes the versions before the previous
+
+    The previous version is kept, so readers which resolved it just before the update can
+    still read it, until the next rewrite.
+    """
+    pointer = _latest_store_pointer(store_path)
+    filesystem = fsspec.open(pointer).fs
+    previous_path = resolve_latest_store(store_path)
+    contents = json.dumps({"store": version_path.rsplit("/", 1)[-1]})
+    if isinstance(filesystem, LocalFileSystem):
+        # Write then rename, as a local file could be read while being written
+        temp_pointer = f"{pointer}.{secrets.token_hex(6)}.tmp"
+        with filesystem.open(temp_pointer, "w") as f:
+            f.write(contents)
+        filesystem.mv(temp_pointer, pointer)
+    else:
+        # Objects in object stores are replaced atomically when the upload completes
+        with filesystem.open(pointer, "w") as f:
+            f.write(contents)
+
+    kept = {filesystem._strip_protocol(p) for p in [version_path, previous_path] if p}
+    stale = [
+        path
+        for path in filesystem.glob(f"{store_path[:-len('.zarr')]}.v*.zarr")
+        if filesystem._strip_protocol(path) not in kept
+    ]
+    if stale:
+        log.debug(f"Removing {len(stale)} old versions of {store_path}")
+        filesystem.rm(stale, recursive=True)
+
+
+def append_files_into_latest_store(
+    files: List[str],
+    store_path: str,
+    backend: str = "s3",
+    encoding_policy: Optional[EncodingPolicy] = None,
+    max_memory_mb: float = COLLATION_MEMORY_BUDGET_MB,
+):
+    """
+    Updates an appendable latest store with the timestep files in the latest directory
+
+    Only the timesteps which are not in the store yet are read and appended, so an update
+    costs the size of the new data, not of the whole history. Zarr arrays can't be cut from
+    the front, so the timesteps whose files have left the latest directory are trimmed by
+    rewriting the store from the files, but only once they outnumber the timesteps kept,
+    which keeps the cost of the rewrites proportional to the appended data too. Until
+    then, the store keeps some timesteps older than the latest directory.
+
+    A directory can't be renamed atomically on object stores, so a rewrite is written to a
+    new version of the store, which the pointer of the store is then updated to, see
+    `resolve_latest_store`. Readers never see a missing or partially written store.
+
+    Args:
+        files: Timestep files in the latest directory, without backend prefix
+        store_path: Path of the zarr directory store, with backend prefix
+        backend: Backend type, e.g., "s3", "gs", "az", or "local"
+        encoding_policy: Compression and chunking of the variables of the store, by default
+            that of the non-HRV data
+        max_memory_mb: Memory budget of the chunks being written at once, in MB
+    """
+    if not files:  # Empty set of files, don't do anything
+        return
+    if encoding_policy is None:
+        encoding_policy = get_encoding_policy(hrv=False)
+    file_times = {_filename_to_time(f): f for f in files}
+
+    version_path = resolve_latest_store(store_path)
+    store_times = pd.DatetimeIndex([])
+    if version_path is not None:
+        store = xr.open_zarr(fsspec.get_mapper(version_path), consolidated=True)
+        store_times = pd.DatetimeIndex(store.time.values).floor("min")
+
+    new_times = sorted(set(file_times) - set(store_times))
+    num_expired = len(set(store_times) - set(file_times))
+    rewrite = (
+        len(store_times) == 0
+        or (len(new_times) > 0 and new_times[0] <= store_times.max())
+        or num_expired > len(store_times) - num_expired
+    )
+
+    if rewrite:
+        log.debug(f"Rewriting {store_path} from {len(files)} files, trimming {num_expired}")
+        dataset = encoding_policy.chunk(_open_timestep_files(sorted(file_times.values()), backend))
+        # Units fine enough for any later timestep to be appended exactly
+        encoding = {
+            **encoding_policy.encoding(dataset),
+            "time": {"units": "nanoseconds since 1970-01-01", "dtype": "int64"},
+        }
+        # Write a new version, then point to it, so the store is never read while partially
+        # written
+        version_path = f"{store_path[:-len('.zarr')]}.v{secrets.token_hex(6)}.zarr"
+        _to_zarr_within_memory_budget(
+            dataset,
+            fsspec.get_mapper(version_path),
+            max_memory_mb,
+            mode="w",
+            encoding=encoding,
+            consolidated=True,
+        )
+        _update_latest_store_pointer(store_path, version_path)
+    elif new_times:
+        log.debug(f"Appending {len(new_times)} timesteps to {version_path}")
+        dataset = _open_timestep_files([file_times[t] for t in new_times], backend)
+        dataset = encoding_policy.chunk(dataset)
+        _to_zarr_within_memory_budget(
+            dataset,
+            fsspec.get_mapper(version_path),
+            max_memory_mb,
+            append_dim="time",
+            consolidated=True,
+        )
+    else:
+        log.debug(f"No new timesteps for {store_path}")
+        return
+    log.debug(f"{version_path} {dataset.time.values}")
+
+
+def append_files_into_latest_stores(
+    save_dir: str,
+    using_backup: bool = False,
+    backend: str = "s3",
+    max_memory_mb: float = COLLATION_MEMORY_BUDGET_MB,
+):
+    """
+    Updates the appendable HRV and non-HRV latest stores with new timestep files
+
+    The latest data is kept in zarr directory stores, `hrv_latest.zarr` and `latest.zarr`,
+    which new timesteps are appended to, see `append_files_into_latest_store`, and which
+    are opened through `resolve_latest_store`.
+
+    Args:
+        save_dir: Directory where data is being saved
+        using_backup: Whether the input data is made up of the 15 minutely backup data or not
+        backend: Backend type, e.g., "s3", "gs", "az", or "local"
+        max_memory_mb: Memory budget of the chunks being written at once, in MB
+    """
+    filesystem = fsspec.open(save_dir).fs
+    latest_dir = get_latest_subdir_path(save_dir)
+    prefix = "15_" if using_backup else ""
+    hrv_store, store = get_latest_store_paths(save_dir, using_backup)
+
+    hrv_files = list(filesystem.glob(f"{latest_dir}/{prefix}hrv_2*.zarr.zip"))
+    append_files_into_latest_store(
+        hrv_files,
+        hrv_store,
+        backend,
+        encoding_policy=get_encoding_policy(hrv=True),
+        max_memory_mb=max_memory_mb,
+    )
+    nonhrv_files = list(filesystem.glob(f"{latest_dir}/{prefix}2*.zarr.zip"))
+    append_files_into_latest_store(
+        nonhrv_files,
+        store,
+        backend,
+        encoding_policy=get_encoding_policy(hrv=False),
+        max_memory_mb=max_memory_mb,
+    )
 
 
 def get_memory() -> str:
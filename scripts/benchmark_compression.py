@@ -0,0 +1,122 @@
+""" Benchmark the compression codecs of the saved zarr files
+
+Saves SEVIRI frames with every codec and shuffle filter of `satip.compression`, in the
+chunks of the live outputs, and reports the write time, the read time and the
+compression ratio of each. The frames are read from saved zarr.zip files if given, or
+else are synthetic int16 frames, smooth like cloud fields with some sensor noise.
+
+Usage example:
+  python3 scripts/benchmark_compression.py --num-frames 12
+  python3 scripts/benchmark_compression.py /data/202301011200.zarr.zip /data/202301011205.zarr.zip
+"""
+
+import itertools
+import os
+import tempfile
+import time
+
+import click
+import numpy as np
+import pandas as pd
+import xarray as xr
+import zarr
+
+from satip.compression import CODECS, HRV_CHUNKS, NONHRV_CHUNKS, SHUFFLES, EncodingPolicy
+
+# The non-HRV channels, and the size of the frames cropped to the UK
+NONHRV_CHANNELS = [
+    "IR_016",
+    "IR_039",
+    "IR_087",
+    "IR_097",
+    "IR_108",
+    "IR_120",
+    "IR_134",
+    "VIS006",
+    "VIS008",
+    "WV_062",
+    "WV_073",
+]
+NONHRV_SHAPE = (298, 615)
+HRV_SHAPE = (891, 1843)
+
+
+def make_frames(num_frames: int, hrv: bool, seed: int = 0) -> xr.Dataset:
+    """Synthetic frames, of int16 values from 0 to 1023 as saved after rescaling"""
+    rng = np.random.default_rng(seed)
+    channels = ["HRV"] if hrv else NONHRV_CHANNELS
+    shape = HRV_SHAPE if hrv else NONHRV_SHAPE
+    y, x = np.meshgrid(np.linspace(0, 1, shape[0]), np.linspace(0, 1, shape[1]), indexing="ij")
+    data = np.empty((num_frames, *shape, len(channels)), dtype=np.int16)
+    for t, c in itertools.product(range(num_frames), range(len(channels))):
+        # Large scale structure which drifts between frames, plus noise
+        phase = rng.uniform(0, 2 * np.pi, size=3) + 0.05 * t
+        field = (
+            np.sin(6 * x + phase[0]) * np.cos(4 * y + phase[1])
+            + 0.5 * np.sin(17 * (x + y) + phase[2])
+            + 0.05 * rng.standard_normal(shape)
+        )
+        data[t, :, :, c] = np.clip((field + 2) / 4 * 1023, 0, 1023)
+    return xr.DataArray(
+        data,
+        dims=("time", "y_geostationary", "x_geostationary", "variable"),
+        coords={
+            "time": pd.date_range("2023-01-01 12:00", periods=num_frames, freq="5min"),
+            "variable": channels,
+        },
+    ).to_dataset(name="data")
+
+
+def load_frames(filenames) -> xr.Dataset:
+    """Frames of saved zarr.zip files, loaded in memory"""
+    datasets = [xr.open_dataset(f"zip::{filename}", engine="zarr") for filename in filenames]
+    return xr.concat(datasets, dim="time").load()
+
+
+def benchmark(dataset: xr.Dataset, policy: EncodingPolicy, directory: str) -> dict:
+    """Write time, read time and compression ratio of the frames saved with a policy"""
+    path = os.path.join(directory, "benchmark.zarr")
+    dataset = policy.chunk(dataset.copy())
+
+    start = time.perf_counter()
+    dataset.to_zarr(path, mode="w", encoding=policy.encoding(dataset), consolidated=True)
+    write_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    xr.open_zarr(path, consolidated=True)["data"].values
+    read_time = time.perf_counter() - start
+
+    array = zarr.open(path, mode="r")["data"]
+    ratio = array.nbytes / array.nbytes_stored
+    return {
+        "codec": policy.codec,
+        "shuffle": policy.shuffle,
+        "write_s": round(write_time, 3),
+        "read_s": round(read_time, 3),
+        "ratio": round(ratio, 2),
+    }
+
+
+@click.command()
+@click.argument("filenames", nargs=-1)
+@click.option("--num-frames", default=6, help="Number of synthetic frames", type=int)
+@click.option("--hrv", default=False, is_flag=True, help="Benchmark HRV frames and chunks")
+@click.option("--clevel", default=5, help="Compression level", type=int)
+def main(filenames, num_frames: int, hrv: bool, clevel: int):
+    """Benchmark the codecs on saved or synthetic frames"""
+    dataset = load_frames(filenames) if filenames else make_frames(num_frames, hrv)
+    chunks = {"data": HRV_CHUNKS if hrv else NONHRV_CHUNKS}
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for codec in CODECS:
+            # Only the blosc codecs have a shuffle filter
+            shuffles = SHUFFLES if codec in ("zstd", "lz4") else ["byte"]
+            for shuffle in shuffles:
+                policy = EncodingPolicy(codec=codec, clevel=clevel, shuffle=shuffle, chunks=chunks)
+                results.append(benchmark(dataset, policy, directory))
+    print(f"{dataset['data'].shape} {dataset['data'].dtype} frames, {dataset['data'].nbytes} bytes")
+    print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Unit Tests for satip.catalogue_cache."""
+import os
+import tempfile
+
+import pandas as pd
+from freezegun import freeze_time
+
+from satip.catalogue_cache import CatalogueCache
+
+
+def _make_search(calls, max_features=None):
+    """Fake catalogue search returning one feature every 5 minutes in the window."""
+
+    def search(start_date, end_date, product_id):
+        calls.append((start_date, end_date))
+        times = pd.date_range(
+            pd.Timestamp(start_date).ceil("5min"), pd.Timestamp(end_date), freq="5min"
+        )
+        features = [
+            {
+                "id": f"MSG3-SEVI-MSG15-0100-NA-{t:%Y%m%d%H%M%S}.000000000Z-NA",
+                "properties": {
+                    "date": f"{t - pd.Timedelta('4min'):%Y-%m-%dT%H:%M:%SZ}/{t:%Y-%m-%dT%H:%M:%SZ}"
+                },
+            }
+            for t in times
+        ]
+        return features[:max_features], len(features)
+
+    return search
+
+
+def test_closed_windows_are_only_searched_once():
+    """A repeated search is served from the cache, an overlapping one only searches the gap."""
+    calls = []
+    search = _make_search(calls)
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        cache = CatalogueCache(os.path.join(tmpdirname, "catalogue.sqlite"))
+
+        first = cache.search("2022-06-28 11:00", "2022-06-28 12:00", "RSS", search=search)
+        assert len(calls) == 1
+
+        second = cache.search("2022-06-28 11:00", "2022-06-28 12:00", "RSS", search=search)
+        assert len(calls) == 1
+        assert [f["id"] for f in first] == [f["id"] for f in second]
+
+        third = cache.search("2022-06-28 11:30", "2022-06-28 12:30", "RSS", search=search)
+        assert calls[-1] == ("2022-06-28T12:00:00Z", "2022-06-28T12:30:00Z")
+        assert len(third) == len({f["id"] for f in third})
+        assert third[0]["id"].startswith("MSG3-SEVI-MSG15-0100-NA-20220628123000")
+
+
+@freeze_time("2022-06-28 12:00:00")
+def test_recent_edge_is_always_searched():
+    """The open window close to now is not cached."""
+    calls = []
+    search = _make_search(calls)
+    now = pd.Timestamp.now(tz="UTC").floor("5min")
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        cache = CatalogueCache(os.path.join(tmpdirname, "catalogue.sqlite"))
+
+        cache.search(now - pd.Timedelta("60min"), now, "RSS", search=search)
+        cache.search(now - pd.Timedelta("60min"), now, "RSS", search=search)
+
+        assert len(calls) == 3
+        assert calls[1][1] == calls[2][1]
+
+
+def test_truncated_windows_are_not_cached():
+    """A window whose results were not all listed is searched again."""
+    calls = []
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        cache = CatalogueCache(os.path.join(tmpdirname, "catalogue.sqlite"))
+
+        truncated = cache.search(
+            "2022-06-28 11:00", "2022-06-28 12:00", "RSS", search=_make_search(calls, 5)
+        )
+        assert len(truncated) == 5
+        assert cache.cached_windows("RSS") == []
+
+        complete = cache.search(
+            "2022-06-28 11:00", "2022-06-28 12:00", "RSS", search=_make_search(calls)
+        )
+        assert len(calls) == 2
+        assert len(complete) == 13
+        assert len(cache.cached_windows("RSS")) == 1
+
+
+def test_old_windows_are_pruned():
+    """Windows and features older than the retention before a search are removed."""
+    calls = []
+    search = _make_search(calls)
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        cache = CatalogueCache(
+            os.path.join(tmpdirname, "catalogue.sqlite"), retention=pd.Timedelta("30min")
+        )
+
+        cache.search("2022-06-28 10:00", "2022-06-28 11:00", "RSS", search=search)
+        cache.search("2022-06-28 11:00", "2022-06-28 12:00", "RSS", search=search)
+        assert cache.cached_windows("RSS") == [("2022-06-28T10:30:00Z", "2022-06-28T12:00:00Z")]
+        assert len(cache.get_features("RSS", "2022-06-28 00:00", "2022-06-28 10:25")) == 0
+
+        # The clipped window is still served from the cache, with all its features
+        features = cache.search("2022-06-28 10:30", "2022-06-28 12:00", "RSS", search=search)
+        assert len(calls) == 2
+        assert len(features) == 19
@@ -0,0 +1,61 @@
+"""Unit Tests for satip.compression."""
+import tempfile
+
+import numpy as np
+import pytest
+import xarray as xr
+import zarr
+
+from satip.compression import (
+    CODECS,
+    EncodingPolicy,
+    get_encoding_policy,
+    get_output_compression,
+    set_output_compression,
+)
+
+
+def _dataset() -> xr.Dataset:
+    """Two timesteps of smooth int16 data"""
+    values = np.arange(2 * 300 * 20 * 3).reshape((2, 300, 20, 3)) % 1024
+    return xr.DataArray(
+        values.astype(np.float32),
+        dims=("time", "y_geostationary", "x_geostationary", "variable"),
+        coords={"variable": ["IR_016", "IR_039", "VIS006"]},
+    ).to_dataset(name="data")
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_encoding_policy(codec):
+    policy = EncodingPolicy(codec=codec, clevel=3, shuffle="bit")
+    dataset = policy.chunk(_dataset())
+    assert dataset["data"].chunks == ((1, 1), (256, 44), (20,), (1, 1, 1))
+
+    encoding = policy.encoding(dataset)
+    assert encoding["data"]["dtype"] == "int16"
+    assert encoding["data"]["chunks"] == (1, 256, 20, 1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        dataset.to_zarr(directory, mode="w", encoding=encoding)
+        array = zarr.open(directory, mode="r")["data"]
+        assert array.chunks == (1, 256, 20, 1)
+        if codec != "default":
+            assert array.compressor.codec_id == policy.compressor().codec_id
+        loaded = xr.open_zarr(directory)
+        assert loaded["data"].encoding["dtype"] == np.int16
+        np.testing.assert_array_equal(loaded["data"].values, dataset["data"].values)
+
+
+def test_output_compression():
+    with pytest.raises(ValueError):
+        set_output_compression("gzip")
+    assert get_output_compression() == ("default", 5, "byte")
+
+    set_output_compression("zstd", 7, "bit")
+    try:
+        policy = get_encoding_policy(hrv=True)
+    finally:
+        set_output_compression()
+    assert (policy.codec, policy.clevel, policy.shuffle) == ("zstd", 7, "bit")
+    assert policy.chunks["data"]["y_geostationary"] == 512
+    assert get_encoding_policy(hrv=False).chunks["data"]["y_geostationary"] == 256
@@ -0,0 +1,106 @@
+"""Unit Tests for satip.daily_store."""
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from satip import utils
+from satip.daily_store import DailyZarrStore, get_daily_store, set_daily_store_dir
+
+
+def _timestep_dataset(time: str, value: int) -> xr.Dataset:
+    """A small dataset of one timestep, as saved by the conversion"""
+    dataarray = xr.DataArray(
+        np.full((1, 3, 4, 2), value, dtype=np.int16),
+        dims=("time", "y_geostationary", "x_geostationary", "variable"),
+        coords={
+            "time": np.array([time], dtype="datetime64[ns]"),
+            "variable": ["IR_016", "IR_039"],
+            "x_osgb": (("y_geostationary", "x_geostationary"), np.ones((3, 4), np.float32)),
+        },
+        attrs={"description": "test"},
+    )
+    return dataarray.chunk({"time": 1, "y_geostationary": 2}).to_dataset(name="data")
+
+
+def test_daily_zarr_store():
+    with tempfile.TemporaryDirectory() as root:
+        store = DailyZarrStore(root, name="nonhrv", retention_days=1)
+
+        # Out of order, across two days, and written again
+        for time, value in [
+            ("2023-01-01T23:55", 1),
+            ("2023-01-01T12:00", 2),
+            ("2023-01-02T00:05", 3),
+            ("2023-01-01T12:00", 4),
+        ]:
+            assert store.write(_timestep_dataset(time, value)) == [store.path(time)]
+        assert sorted(os.listdir(root)) == ["nonhrv_20230101.zarr", "nonhrv_20230102.zarr"]
+
+        dataset = store.open("2023-01-01T00:00", "2023-01-02T12:00")
+        assert list(dataset.time.dt.strftime("%d %H:%M").values) == [
+            "01 12:00",
+            "01 23:55",
+            "02 00:05",
+        ]
+        np.testing.assert_array_equal(dataset["data"].max(dim=dataset["data"].dims[1:]), [4, 1, 3])
+        assert list(dataset["variable"].values) == ["IR_016", "IR_039"]
+        assert dataset["x_osgb"].shape == (3, 4)
+        assert dataset["data"].attrs["description"] == "test"
+        assert store.open("2023-01-01T12:05", "2023-01-01T23:50") is None
+
+        # Written timesteps are looked up like in a manifest
+        assert pd.Timestamp("2023-01-01T23:55", tz="UTC") in store
+        assert pd.Timestamp("2023-01-01T12:05") not in store
+        store.write(_timestep_dataset("2023-01-01T12:05", 5))
+        assert pd.Timestamp("2023-01-01T12:05") in store
+
+        assert store.apply_retention(pd.Timestamp("2023-01-03T01:00")) == [
+            store.path("2023-01-01")
+        ]
+        assert os.listdir(root) == ["nonhrv_20230102.zarr"]
+
+
+def test_daily_zarr_store_concurrent_create():
+    with tempfile.TemporaryDirectory() as root:
+        store = DailyZarrStore(root, name="nonhrv")
+        store.write(_timestep_dataset("2023-01-01T12:00", 1))
+
+        # A second process found the store missing before it was created, and creates it
+        # after the write, passing the existence check of zarr like the metadata was not
+        # written yet
+        path = store.path("2023-01-01")
+        for key in [".zgroup", ".zattrs", ".zmetadata"]:
+            os.remove(os.path.join(path, key))
+        dataset = _timestep_dataset("2023-01-01T12:05", 2)
+        store._create(path, dataset)
+        assert pd.Timestamp("2023-01-01T12:00") in store
+        store.write(dataset)
+        assert pd.Timestamp("2023-01-01T12:00") in store
+        assert pd.Timestamp("2023-01-01T12:05") in store
+
+
+def test_save_native_to_daily_stores(monkeypatch):
+    from tests.unit_test.test_unit_utils import make_scene
+
+    monkeypatch.setattr(utils, "load_native_from_zip", lambda filename: make_scene())
+
+    with tempfile.TemporaryDirectory() as root:
+        set_daily_store_dir(root)
+        try:
+            saved_files = utils.save_native_to_zarr(["test.nat"], save_dir=root)
+            hrv = get_daily_store(hrv=True).open("2023-01-01", "2023-01-02")
+            nonhrv = get_daily_store(hrv=False).open("2023-01-01", "2023-01-02")
+        finally:
+            set_daily_store_dir(None)
+
+        assert [os.path.basename(f) for f in saved_files] == [
+            "hrv_20230101.zarr",
+            "nonhrv_20230101.zarr",
+        ]
+        assert list(nonhrv.time.values) == [np.datetime64("2023-01-01T12:05")]
+        assert list(hrv["variable"].values) == ["HRV"]
+        assert nonhrv["data"].dtype == np.int16
+        assert nonhrv["data"].chunks[0] == (1,)
@@ -0,0 +1,131 @@
+"""Unit Tests for satip.data_tailor_scheduler."""
+import itertools
+
+from satip.data_tailor_scheduler import DataTailorScheduler
+
+
+class FakeCustomisation:
+    """Customisation which is done after being polled a given number of times."""
+
+    def __init__(self, _id, polls_until_done, datatailor):
+        self._id = _id
+        self.polls_until_done = polls_until_done
+        self.datatailor = datatailor
+        self.killed = False
+        self.deleted = False
+
+    @property
+    def _properties(self):
+        if self.killed:
+            return {"status": "KILLED"}
+        return {"status": "DONE" if self.polls_until_done <= 0 else "RUNNING"}
+
+    def kill(self):
+        self.killed = True
+
+    def delete(self):
+        self.deleted = True
+        self.datatailor.running.remove(self)
+
+
+class FakeDataTailor:
+    """Data Tailor running at most 3 customisations, recording the most ever running."""
+
+    def __init__(self):
+        self.running = []
+        self.ids = itertools.count()
+        self.max_running = 0
+        self.num_listings = 0
+        self.listing_error = None
+
+    @property
+    def customisations(self):
+        if self.listing_error is not None:
+            raise self.listing_error
+        self.num_listings += 1
+        for customisation in self.running:
+            customisation.polls_until_done -= 1
+        return list(self.running)
+
+    def num_running(self):
+        return len([c for c in self.running if c._properties["status"] == "RUNNING"])
+
+    def new_customisation(self, product, chain):
+        if self.num_running() >= 3:
+            raise Exception("Too many customisations")
+        customisation = FakeCustomisation(str(next(self.ids)), 3, self)
+        self.running.append(customisation)
+        self.max_running = max(self.max_running, self.num_running())
+        return customisation
+
+
+class FakeDownloadManager:
+    def __init__(self):
+        self.datatailor = FakeDataTailor()
+
+    def copy_from_native_file_store(self, dataset_id, tailor_id):
+        return "native.zip" if dataset_id == "in_store" else None
+
+    def download_customisation_output(self, customisation, dataset_id, tailor_id):
+        customisation.delete()
+        return f"{dataset_id}_{tailor_id}.zip"
+
+
+def test_data_tailor_scheduler():
+    download_manager = FakeDownloadManager()
+    # A single download worker still keeps the 3 customisation slots busy
+    scheduler = DataTailorScheduler(download_manager, download_workers=1, poll_interval=0)
+    scheduler.poller.fast_poll_interval = 0
+    scheduler.poller.queued_poll_interval = 0
+
+    jobs = [scheduler.submit(f"dataset_{i}") for i in range(7)]
+    jobs.append(scheduler.submit("in_store"))
+    assert len(scheduler.pending) == 7
+
+    scheduler.run()
+
+    assert [job.filename for job in jobs] == [
+        f"dataset_{i}_HRSEVIRI.zip" for i in range(7)
+    ] + ["native.zip"]
+    assert all(job.error is None for job in jobs)
+    assert download_manager.datatailor.max_running == 3
+    assert download_manager.datatailor.running == []
+    # One listing per tick for all the customisations: 3 batches of 3 polls, plus the first
+    assert download_manager.datatailor.num_listings <= 10
+
+
+def test_data_tailor_scheduler_creation_timeout():
+    download_manager = FakeDownloadManager()
+
+    def new_customisation(product, chain):
+        raise Exception("Invalid credentials")
+
+    download_manager.datatailor.new_customisation = new_customisation
+    scheduler = DataTailorScheduler(download_manager, poll_interval=0, creation_timeout_seconds=0)
+
+    jobs = [scheduler.submit(f"dataset_{i}") for i in range(2)]
+    scheduler.run()
+
+    assert [job.status for job in jobs] == ["FAILED", "FAILED"]
+    assert str(jobs[0].error) == "Invalid credentials"
+
+
+def test_data_tailor_scheduler_listing_timeout():
+    download_manager = FakeDownloadManager()
+    datatailor = download_manager.datatailor
+    scheduler = DataTailorScheduler(download_manager, poll_interval=0, listing_timeout_seconds=0)
+    scheduler.poller.fast_poll_interval = 0
+    scheduler.poller.queued_poll_interval = 0
+
+    # Two jobs already running when the listing starts failing, and one pending
+    jobs = [scheduler.submit(f"dataset_{i}") for i in range(2)]
+    scheduler._submit_pending()
+    assert len(scheduler.active) == 2
+    jobs.append(scheduler.submit("dataset_2"))
+    datatailor.listing_error = Exception("Service unavailable")
+    scheduler.run()
+
+    assert [job.status for job in jobs] == ["FAILED", "FAILED", "FAILED"]
+    assert all(str(job.error) == "Service unavailable" for job in jobs)
+    # The customisations of the active jobs are removed
+    assert datatailor.running == []
@@ -1,4 +1,5 @@
 """Unit Tests for satip.eumetsat."""
+import asyncio
 import glob
 import os
 import tempfile
@@ -17,3 +18,166 @@ def test_filename_to_datetime():
     expected_datetime = datetime(2023, 8, 14, 8, 59, 17)
     actual_datetime = eumetsat_filename_to_datetime(filename)
     assert actual_datetime == expected_datetime
+
+
+class _FakeStreamedResponse:
+    """Minimal stand-in for a streamed `requests` response."""
+
+    def __init__(self, content):
+        self.content = content
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i : i + chunk_size]
+
+
+def test_download_single_dataset_streams_zip(monkeypatch):
+    """The zipped product is streamed in chunks and extracted into the data directory."""
+    import io
+    import types
+    import zipfile
+
+    from satip import eumetsat
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("MSG3-SEVI-MSG15-0100-NA-20200601115916.810000000Z-NA.nat", b"x" * 10_000)
+    session = eumetsat.make_session()
+    monkeypatch.setattr(
+        session, "get", lambda *args, **kwargs: _FakeStreamedResponse(buffer.getvalue())
+    )
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        download_manager = EUMETSATDownloadManager.__new__(EUMETSATDownloadManager)
+        download_manager.session = session
+        download_manager.token = types.SimpleNamespace(access_token="token")
+        download_manager.data_dir = tmpdirname
+        download_manager.download_chunk_size = 1024
+
+        download_manager.download_single_dataset("https://example.com/product")
+
+        native_files = glob.glob(os.path.join(tmpdirname, "*.nat"))
+        assert len(native_files) == 1
+        assert os.path.getsize(native_files[0]) == 10_000
+
+
+def test_access_token_provider_refreshes_before_expiry(monkeypatch):
+    """The token is cached until it is within the refresh margin of expiring."""
+    import pickle
+
+    from satip import eumetsat
+
+    token_data = iter(
+        [
+            {"access_token": "first", "expires_in": 3600},
+            {"access_token": "second", "expires_in": 30},
+            {"access_token": "third", "expires_in": 3600},
+        ]
+    )
+    monkeypatch.setattr(
+        eumetsat, "_request_access_token_data", lambda *args, **kwargs: next(token_data)
+    )
+
+    token = eumetsat.AccessTokenProvider("key", "secret", refresh_margin=60)
+    assert token.access_token == "first"
+    assert token.access_token == "first"
+
+    # A forced refresh returns a token expiring inside the margin, so the next use refreshes it
+    token.refresh()
+    assert token.access_token == "third"
+    assert token.auth.token == "third"
+
+    # The provider can be sent to other processes
+    assert pickle.loads(pickle.dumps(token)).access_token == "third"
+
+
+def _fake_search(features):
+    """Fake search API response, listing at most `num_features` of the features in a range."""
+
+    def search(start_date, end_date, num_features=10_000, **kwargs):
+        start = pd.Timestamp(start_date).tz_localize(None)
+        end = pd.Timestamp(end_date).tz_localize(None)
+        matching = []
+        for feature in reversed(features):
+            feature_start, feature_end = feature["properties"]["date"].split("/")
+            if (
+                pd.Timestamp(feature_start).tz_localize(None) <= end
+                and pd.Timestamp(feature_end).tz_localize(None) >= start
+            ):
+                matching.append(feature)
+        return {"totalResults": len(matching), "features": matching[:num_features]}
+
+    return search
+
+
+def _paginated_features(times):
+    """A feature ending at each time, more than fit in a page of the search API."""
+    return [
+        {
+            "id": f"MSG3-SEVI-MSG15-0100-NA-{t:%Y%m%d%H%M%S}.000000000Z-NA",
+            "properties": {
+                "date": f"{t - pd.Timedelta('5min'):%Y-%m-%dT%H:%M:%SZ}/{t:%Y-%m-%dT%H:%M:%SZ}"
+            },
+        }
+        for t in times
+    ]
+
+
+def test_identify_available_datasets_paginates_in_parallel(monkeypatch):
+    """Results spread over several pages are all found once, newest first."""
+    from satip import eumetsat
+
+    times = pd.date_range("2022-01-01", periods=1_200, freq="5min")
+    features = _paginated_features(times)
+    search = _fake_search(features)
+
+    class FakeResponse:
+        def __init__(self, r_json):
+            self.r_json = r_json
+
+        def json(self):
+            return self.r_json
+
+    def fake_query_data_products(*args, **kwargs):
+        return FakeResponse(search(*args, **kwargs))
+
+    monkeypatch.setattr(eumetsat, "query_data_products", fake_query_data_products)
+
+    datasets = eumetsat.identify_available_datasets(
+        start_date=times[0].strftime("%Y-%m-%d-%H:%M:%S"),
+        end_date=times[-1].strftime("%Y-%m-%d-%H:%M:%S"),
+    )
+
+    assert len(datasets) == 1_200
+    assert [d["id"] for d in datasets] == [f["id"] for f in reversed(features)]
+
+
+def test_async_identify_available_datasets_paginates(monkeypatch):
+    """The asyncio search splits the time range like the threaded one."""
+    from satip import eumetsat_async
+
+    times = pd.date_range("2022-01-01", periods=1_200, freq="5min")
+    features = _paginated_features(times)
+    search = _fake_search(features)
+
+    async def fake_query_data_products(session, *args, **kwargs):
+        return search(*args, **kwargs)
+
+    monkeypatch.setattr(eumetsat_async, "query_data_products", fake_query_data_products)
+
+    datasets = asyncio.run(
+        eumetsat_async.identify_available_datasets(
+            None, times[0].strftime("%Y-%m-%d-%H:%M:%S"), times[-1].strftime("%Y-%m-%d-%H:%M:%S")
+        )
+    )
+
+    assert [d["id"] for d in datasets] == [f["id"] for f in reversed(features)]
@@ -0,0 +1,33 @@
+"""Unit Tests for satip.geospatial."""
+import os
+import tempfile
+
+import numpy as np
+from satpy.resample import get_area_def
+
+from satip.geospatial import OSGBGridCache, lat_lon_to_osgb
+
+
+def test_osgb_grid_cache():
+    area = get_area_def("msg_seviri_rss_3km")[700:760, 1500:1580]
+    lon, lat = area.get_lonlats()
+    expected_x, expected_y = lat_lon_to_osgb(lat, lon)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = OSGBGridCache(cache_dir=cache_dir)
+        osgb_x, osgb_y = cache.get(area)
+        np.testing.assert_array_equal(osgb_x, np.float32(expected_x))
+        np.testing.assert_array_equal(osgb_y, np.float32(expected_y))
+        assert len(os.listdir(cache_dir)) == 2
+
+        # The same arrays are reused from memory
+        assert cache.get(area)[0] is osgb_x
+
+        # A new cache, e.g. in another process, loads the saved grids
+        cached_x, cached_y = OSGBGridCache(cache_dir=cache_dir).get(area)
+        np.testing.assert_array_equal(cached_x, osgb_x)
+        np.testing.assert_array_equal(cached_y, osgb_y)
+
+        # Another area gets its own grid
+        other_x, _ = cache.get(get_area_def("msg_seviri_rss_3km")[700:760, 1400:1480])
+        assert not np.array_equal(other_x, osgb_x)
@@ -0,0 +1,51 @@
+"""Unit Tests for satip.manifest."""
+import os
+import tempfile
+
+import pandas as pd
+
+from satip import utils
+from satip.manifest import MANIFEST_FILENAME, Manifest
+
+
+def _dataset(time: str) -> dict:
+    """A dataset as returned by `identify_available_datasets`"""
+    return {"id": f"MSG3-SEVI-MSG15-0100-NA-{time}00.000000000Z-NA"}
+
+
+def test_manifest():
+    with tempfile.TemporaryDirectory() as save_dir:
+        latest_dir = utils.get_latest_subdir_path(save_dir, mkdir=True)
+        for filename in [
+            f"{save_dir}/202301011200.zarr.zip",
+            f"{save_dir}/hrv_202301011200.zarr.zip",
+            f"{latest_dir}/202301011205.zarr.zip",
+            f"{latest_dir}/hrv_202301011210.zarr.zip",
+            f"{latest_dir}/latest.zarr.zip",
+        ]:
+            open(filename, "w").close()
+
+        # Built from the files the first time, only complete with the non-HRV file
+        manifest = Manifest.load(save_dir)
+        assert manifest.completed_timesteps() == {"202301011200", "202301011205"}
+        assert os.path.exists(os.path.join(save_dir, MANIFEST_FILENAME))
+
+        datasets = [_dataset(t) for t in ["202301011200", "202301011205", "202301011210"]]
+        filtered = utils.filter_dataset_ids_on_current_files(
+            list(datasets), save_dir, manifest=manifest
+        )
+        assert filtered == datasets[2:]
+
+        # Then loaded without listing, with the saved files recorded
+        manifest.add_files([f"{save_dir}/15_202301011210.zarr.zip", None])
+        manifest.prune(pd.Timestamp("2023-01-01 12:05", tz="UTC"))
+        manifest.save()
+        os.remove(f"{save_dir}/202301011200.zarr.zip")
+        loaded = Manifest.load(save_dir)
+        assert loaded.completed_timesteps() == {"202301011205", "202301011210"}
+        assert pd.Timestamp("2023-01-01 12:10") in loaded
+        assert loaded.timesteps["202301011210"] == {
+            "hrv": "hrv_202301011210.zarr.zip",
+            "nonhrv": "15_202301011210.zarr.zip",
+        }
+        assert not [f for f in os.listdir(save_dir) if f.endswith(".tmp")]
@@ -0,0 +1,76 @@
+"""Unit Tests for satip.pipeline."""
+import os
+import tempfile
+
+from satip import pipeline
+
+
+class FakeDownloadManager:
+    """Download manager writing an empty native file per dataset."""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def download_single_dataset_with_retry(self, dataset_id, product_id):
+        if dataset_id == "broken":
+            raise ValueError("Download failed")
+        filename = os.path.join(self.data_dir, f"{dataset_id}.nat")
+        open(filename, "w").close()
+        return [filename]
+
+
+def fake_save_native_to_zarr(list_of_native_files, save_dir, use_rescaler, using_backup):
+    saved_files = []
+    for native_file in list_of_native_files:
+        name = os.path.basename(native_file).replace(".nat", "")
+        for prefix in ["", "hrv_"]:
+            saved_file = os.path.join(save_dir, f"{prefix}{name}.zarr.zip")
+            open(saved_file, "w").close()
+            saved_files.append(saved_file)
+    return saved_files
+
+
+def test_run_pipeline(monkeypatch):
+    monkeypatch.setattr(pipeline.utils, "save_native_to_zarr", fake_save_native_to_zarr)
+
+    with tempfile.TemporaryDirectory() as data_dir, tempfile.TemporaryDirectory() as save_dir:
+        datasets = [{"id": f"dataset_{i}"} for i in range(5)] + [{"id": "broken"}]
+        saved_files = pipeline.run_pipeline(
+            FakeDownloadManager(data_dir),
+            datasets,
+            save_dir=save_dir,
+            download_concurrency=2,
+            conversion_workers=2,
+            queue_size=1,
+        )
+
+        expected = [
+            f"{prefix}dataset_{i}.zarr.zip" for i in range(5) for prefix in ["", "hrv_"]
+        ]
+        assert sorted(os.path.basename(f) for f in saved_files) == sorted(expected)
+        assert sorted(os.listdir(save_dir)) == sorted(expected)
+        # The native files are removed once converted
+        assert os.listdir(data_dir) == []
+
+
+def test_run_pipeline_upload_failure(monkeypatch):
+    """The conversions are not blocked when the save directory can't be opened."""
+    monkeypatch.setattr(pipeline.utils, "save_native_to_zarr", fake_save_native_to_zarr)
+
+    def fail_to_open(path, *args, **kwargs):
+        raise PermissionError("No access")
+
+    monkeypatch.setattr(pipeline.fsspec, "open", fail_to_open)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        datasets = [{"id": f"dataset_{i}"} for i in range(5)]
+        saved_files = pipeline.run_pipeline(
+            FakeDownloadManager(data_dir),
+            datasets,
+            save_dir="s3://bucket/data",
+            conversion_workers=2,
+            queue_size=1,
+        )
+
+        assert saved_files == []
+        assert os.listdir(data_dir) == []
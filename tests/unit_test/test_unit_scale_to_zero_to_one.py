@@ -1,11 +1,19 @@
 """Unit Tests for scale_to_zero_to_one.py."""
+import os
+import tempfile
+
 import pytest
 
 import numpy as np
 import pandas as pd
 import xarray as xr
 
-from satip.scale_to_zero_to_one import ScaleToZeroToOne, is_dataset_clean
+from satip.quality import QualityStats, compute_quality_stats
+from satip.scale_to_zero_to_one import (
+    ScaleToZeroToOne,
+    StreamingScaleFitter,
+    is_dataset_clean,
+)
 
 
 @pytest.fixture
@@ -98,3 +106,96 @@ class TestScaleToZeroToOne:
 
         # While we are at it, let's also test the is_dataset_clean-method:
         assert is_dataset_clean(dataset)
+
+    def test_rescale_fused_matches_stepwise(self, dataset):
+        scaler = ScaleToZeroToOne(
+            mins=np.asarray([-5.0, 0.0]), maxs=np.asarray([5.0, 20.0]), variable_order=[0, 1]
+        )
+        dataset = dataset.assign_coords(variable=[0, 1]).astype(np.float32)
+
+        # The unfused rescaling, one full-size operation after the other
+        expected = dataset.transpose("time", "y_geostationary", "x_geostationary", "variable")
+        expected = expected.copy()
+        expected -= scaler.mins
+        expected /= scaler.maxs - scaler.mins
+        expected = expected.clip(min=0, max=1).astype(np.float32)
+
+        rescaled = scaler.rescale(dataset)
+        assert rescaled.dtype == np.float32
+        np.testing.assert_array_equal(rescaled.values, expected.values)
+
+        # Dask arrays are rescaled lazily, block by block
+        lazy = scaler.rescale(dataset.chunk({"time": 3, "variable": 1}))
+        assert lazy.chunks is not None
+        np.testing.assert_array_equal(lazy.values, expected.values)
+
+        # Quantised to uint8, with NaNs as 255
+        quantised = scaler.rescale(dataset, dtype=np.uint8)
+        assert quantised.dtype == np.uint8
+        np.testing.assert_array_equal(
+            quantised.values,
+            np.where(np.isnan(expected.values), 255, np.rint(expected.values * 254.0)),
+        )
+
+
+def test_streaming_fit(dataset):
+    dataset = dataset.assign_coords(variable=["a", "b"])
+    dims = ("x_geostationary", "y_geostationary", "time")
+    expected = ScaleToZeroToOne().fit(dataset, dims=dims)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # One part of the archive as a zarr file, the other in memory
+        path = os.path.join(tmpdir, "part.zarr")
+        dataset.isel(time=slice(5, None)).to_dataset(name="data").to_zarr(path)
+        first = StreamingScaleFitter().update(dataset.isel(time=slice(None, 5)).chunk({"time": 2}))
+        second = StreamingScaleFitter().fit([path])
+
+        # The first worker checkpoints, then the fits are merged
+        checkpoint = os.path.join(tmpdir, "fit.npz")
+        first.save(checkpoint)
+        fitter = StreamingScaleFitter.load(checkpoint).merge(second)
+
+    assert fitter.num_datasets == 2
+    assert list(fitter.variable_order) == ["a", "b"]
+    assert fitter.counts.tolist() == [59, 59]
+
+    scaler = ScaleToZeroToOne().fit_streaming([], fitter=fitter)
+    np.testing.assert_array_equal(scaler.mins.values, expected.mins.values)
+    np.testing.assert_array_equal(scaler.maxs.values, expected.maxs.values)
+    np.testing.assert_array_equal(fitter.quantile(0), expected.mins.values)
+    np.testing.assert_array_equal(fitter.quantile(1), expected.maxs.values)
+
+    # Quantiles are precise to a bin width
+    bin_width = fitter.edges[1] - fitter.edges[0]
+    for q in [0.1, 0.5, 0.9]:
+        np.testing.assert_allclose(
+            fitter.quantile(q),
+            dataset.quantile(q, dim=dims, method="inverted_cdf").values,
+            atol=bin_width * 2,
+        )
+    mins, maxs = fitter.bounds(lower_quantile=0.1, upper_quantile=0.9)
+    assert (mins > expected.mins).all() and (maxs < expected.maxs).all()
+
+
+def test_quality_stats(dataset):
+    dataset = dataset.assign_coords(variable=["a", "b"])
+    dataset[0, 0, :4, 0] = 0.0
+    dataset[1, 1, 0, 1] = np.inf
+
+    for data in [dataset, dataset.chunk({"time": 3, "variable": 1})]:
+        stats = compute_quality_stats(data)
+
+        assert stats.size == 120
+        assert stats.zero_fraction == 4 / 120
+        assert stats.nan_fraction == 2 / 120
+        assert stats.non_finite_count == 3
+        assert stats.variables == ["a", "b"]
+        finite = dataset.where(np.isfinite(dataset))
+        dims = ("x_geostationary", "y_geostationary", "time")
+        np.testing.assert_array_equal(stats.mins, finite.min(dims).values)
+        np.testing.assert_array_equal(stats.maxs, finite.max(dims).values)
+        np.testing.assert_allclose(stats.means, finite.mean(dims).values)
+        assert QualityStats.from_json(stats.to_json()) == stats
+        assert not is_dataset_clean(data, stats=stats)
+
+    assert is_dataset_clean(dataset.fillna(1).where(np.isfinite(dataset), 1))
@@ -0,0 +1,376 @@
+"""Unit Tests for satip.utils."""
+import datetime
+import os
+import tempfile
+
+import dask.array as da
+import fsspec
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from fsspec.asyn import AsyncFileSystem
+from satpy import Scene
+from satpy.resample import add_crs_xy_coords, get_area_def
+
+from satip import utils
+from satip.constants import NON_HRV_BANDS, SCALER_MAXS, SCALER_MINS
+from satip.geospatial import GEOGRAPHIC_BOUNDS
+from satip.quality import QualityStats
+
+
+def make_scene() -> Scene:
+    """Synthetic RSS scene with all the bands loaded, as read from a native file."""
+    scene = Scene()
+    bands = [("HRV", "msg_seviri_rss_1km")] + [(b, "msg_seviri_rss_3km") for b in NON_HRV_BANDS]
+    for band, area_name in bands:
+        area = get_area_def(area_name)
+        data = da.random.RandomState(0).uniform(10, 250, area.shape, chunks=1024)
+        scene[band] = add_crs_xy_coords(
+            xr.DataArray(
+                data.astype(np.float32),
+                dims=("y", "x"),
+                attrs={
+                    "name": band,
+                    "area": area,
+                    "start_time": datetime.datetime(2023, 1, 1, 12, 0),
+                    "end_time": datetime.datetime(2023, 1, 1, 12, 4),
+                },
+            ),
+            area,
+        )
+    scene.load = lambda *args, **kwargs: None
+    return scene
+
+
+def test_save_native_to_zarr_single_scene(monkeypatch):
+    loaded = []
+
+    def load_native_from_zip(filename):
+        loaded.append(filename)
+        return make_scene()
+
+    monkeypatch.setattr(utils, "load_native_from_zip", load_native_from_zip)
+
+    with tempfile.TemporaryDirectory() as save_dir:
+        saved_files = utils.save_native_to_zarr(["test.nat"], save_dir=save_dir)
+
+        # The native file is only opened once for both outputs
+        assert loaded == ["test.nat"]
+        assert [os.path.basename(f) for f in saved_files] == [
+            "hrv_202301011205.zarr.zip",
+            "202301011205.zarr.zip",
+        ]
+
+        hrv = xr.open_dataset(f"zip::{saved_files[0]}", engine="zarr")
+        nonhrv = xr.open_dataset(f"zip::{saved_files[1]}", engine="zarr")
+        assert list(hrv["variable"].values) == ["HRV"]
+        assert list(nonhrv["variable"].values) == NON_HRV_BANDS
+        assert QualityStats.from_json(nonhrv.attrs["quality_stats"]).variables == NON_HRV_BANDS
+        assert hrv["x_osgb"].shape == (hrv.sizes["y_geostationary"], hrv.sizes["x_geostationary"])
+
+
+def test_crop_scene_matches_satpy_crop():
+    scene = utils.split_scene(make_scene(), NON_HRV_BANDS)
+
+    expected = scene.crop(ll_bbox=GEOGRAPHIC_BOUNDS["UK"])
+    for _ in range(2):
+        cropped = utils.crop_scene(scene, band="IR_016", area="UK")
+        assert cropped["IR_016"].attrs["area"] == expected["IR_016"].attrs["area"]
+        xr.testing.assert_equal(cropped["IR_039"], expected["IR_039"])
+
+
+def test_save_native_files_to_zarr_in_parallel(monkeypatch):
+    def load_native_from_zip(filename):
+        if "broken" in filename:
+            raise ValueError(f"Could not read {filename}")
+        return make_scene()
+
+    monkeypatch.setattr(utils, "load_native_from_zip", load_native_from_zip)
+
+    with tempfile.TemporaryDirectory() as save_dir:
+        results, failures = utils.save_native_files_to_zarr_in_parallel(
+            ["test.nat", "broken.nat"], save_dir=save_dir, num_workers=2
+        )
+
+        assert [os.path.basename(f) for f in results["test.nat"]] == [
+            "hrv_202301011205.zarr.zip",
+            "202301011205.zarr.zip",
+        ]
+        assert list(failures) == ["broken.nat"]
+        assert "Could not read broken.nat" in failures["broken.nat"]
+
+
+def _v15_rescaling_reference(dataarray, mins, maxs, variable_order):
+    """The v15 rescaling as originally implemented, one full-size operation at a time."""
+    dataarray = dataarray.reindex({"variable": variable_order}).transpose(
+        "time", "y_geostationary", "x_geostationary", "variable"
+    )
+    upper_bound = (2**10) - 1
+    new_max = maxs - mins
+
+    dataarray -= mins
+    dataarray /= new_max
+    dataarray *= upper_bound
+    dataarray = dataarray.round().clip(min=0, max=upper_bound).astype(np.int16)
+    return dataarray
+
+
+def test_do_v15_rescaling_is_bit_exact():
+    rng = np.random.default_rng(0)
+    for dtype in [np.float32, np.float64]:
+        data = rng.uniform(-100, 400, (2, len(NON_HRV_BANDS), 30, 40)).astype(dtype)
+        # Values exactly halfway between two integers after scaling, and NaNs
+        data[0, 0, 0, :3] = SCALER_MINS[0] + np.array([0.5, 1.5, 2.5]) * (
+            (SCALER_MAXS[0] - SCALER_MINS[0]) / 1023
+        )
+        data[1, 2, 5, :10] = np.nan
+        dataarray = xr.DataArray(
+            data,
+            dims=("time", "variable", "y_geostationary", "x_geostationary"),
+            coords={"variable": NON_HRV_BANDS},
+        )
+
+        with np.errstate(invalid="ignore"):
+            expected = _v15_rescaling_reference(
+                dataarray.copy(), SCALER_MINS, SCALER_MAXS, NON_HRV_BANDS
+            )
+        rescaled = utils.do_v15_rescaling(dataarray, SCALER_MINS, SCALER_MAXS, NON_HRV_BANDS)
+        lazy = utils.do_v15_rescaling(
+            dataarray.chunk({"time": 1, "variable": 1, "y_geostationary": 16}),
+            SCALER_MINS,
+            SCALER_MAXS,
+            NON_HRV_BANDS,
+        )
+
+        assert rescaled.dtype == np.int16
+        assert rescaled.dims == expected.dims
+        np.testing.assert_array_equal(rescaled.values, expected.values)
+        assert lazy.chunks is not None
+        np.testing.assert_array_equal(lazy.values, expected.values)
+
+
+def test_save_to_zarr_to_backend_local_and_streamed():
+    dataset = xr.DataArray(
+        np.arange(2 * 3 * 4 * 2, dtype=np.int16).reshape(2, 3, 4, 2),
+        dims=("time", "y_geostationary", "x_geostationary", "variable"),
+        coords={
+            "time": np.array(["2023-01-01T12:00", "2023-01-01T12:05"], dtype="datetime64[ns]"),
+            "variable": ["IR_016", "IR_039"],
+        },
+    ).chunk({"time": 1}).to_dataset(name="data")
+
+    with tempfile.TemporaryDirectory() as save_dir:
+        local_file = os.path.join(save_dir, "local.zarr.zip")
+        utils.save_to_zarr_to_backend(dataset, local_file)
+        assert os.listdir(save_dir) == ["local.zarr.zip"]
+        xr.testing.assert_equal(xr.open_dataset(f"zip::{local_file}", engine="zarr"), dataset)
+
+        # A remote file is streamed, then is a valid zip with consolidated metadata
+        utils.save_to_zarr_to_backend(dataset, "memory://satip-test/remote.zarr.zip")
+        streamed_file = os.path.join(save_dir, "streamed.zarr.zip")
+        fsspec.filesystem("memory").get("memory://satip-test/remote.zarr.zip", streamed_file)
+        streamed = xr.open_dataset(f"zip::{streamed_file}", engine="zarr", consolidated=True)
+        xr.testing.assert_equal(streamed, dataset)
+
+
+def test_save_to_zarr_to_backend_failure():
+    def fail(block):
+        raise RuntimeError("Failed to load")
+
+    dataset = _timestep_dataset("2023-01-01T00:00")
+    dataset["data"] = dataset["data"].copy(data=dataset["data"].data.map_blocks(fail, dtype=np.int16))
+
+    for filename in [
+        "memory://satip-test-failure/202301010000.zarr.zip",
+        f"{tempfile.mkdtemp()}/202301010000.zarr.zip",
+    ]:
+        with pytest.raises(RuntimeError):
+            utils.save_to_zarr_to_backend(dataset, filename)
+        # Nothing is left behind, so the timestep is converted again
+        filesystem = fsspec.open(filename).fs
+        assert filesystem.glob(f"{os.path.dirname(filename)}/*") == []
+
+
+def _timestep_dataset(time: str) -> xr.Dataset:
+    """A small dataset of one timestep, as saved by the conversion"""
+    dataarray = xr.DataArray(
+        np.full((1, 3, 4, 2), int(time[-2:]), dtype=np.int16),
+        dims=("time", "y_geostationary", "x_geostationary", "variable"),
+        coords={
+            "time": np.array([time], dtype="datetime64[ns]"),
+            "variable": ["IR_016", "IR_039"],
+            "x_osgb": (("y_geostationary", "x_geostationary"), np.ones((3, 4), np.float32)),
+        },
+    )
+    return dataarray.chunk({"time": 1}).to_dataset(name="data")
+
+
+def test_append_files_into_latest_stores():
+    with tempfile.TemporaryDirectory() as save_dir:
+        latest_dir = utils.get_latest_subdir_path(save_dir, mkdir=True)
+        _, store = utils.get_latest_store_paths(save_dir)
+
+        def add_timestep(time):
+            name = f"{pd.Timestamp(time).strftime('%Y%m%d%H%M')}.zarr.zip"
+            utils.save_to_zarr_to_backend(_timestep_dataset(time), f"{latest_dir}/{name}")
+            return f"{latest_dir}/{name}"
+
+        def collate():
+            utils.collate_files_into_latest(save_dir, backend="local", incremental=True)
+            return xr.open_zarr(utils.resolve_latest_store(store)).compute()
+
+        files = [add_timestep(t) for t in ["2023-01-01T12:00", "2023-01-01T12:05"]]
+        assert collate().time.size == 2
+        first_version = utils.resolve_latest_store(store)
+        assert utils.check_both_final_files_exists(save_dir, incremental=True) is False
+
+        # Only the new timestep is appended, the others are never read again
+        files.append(add_timestep("2023-01-01T12:10"))
+        os.remove(files[0])
+        dataset = collate()
+        assert list(dataset.time.dt.minute.values) == [0, 5, 10]
+        assert list(dataset["data"].isel(y_geostationary=0, x_geostationary=0, variable=0)) == [
+            0,
+            5,
+            10,
+        ]
+
+        # Once the expired timesteps outnumber the others, they are trimmed into a new
+        # version of the store, the previous version being kept for the current readers
+        files.append(add_timestep("2023-01-01T12:15"))
+        os.remove(files[1])
+        os.remove(files[2])
+        dataset = collate()
+        assert list(dataset.time.dt.minute.values) == [15]
+        assert dataset["x_osgb"].shape == (3, 4)
+        assert utils.resolve_latest_store(store) != first_version
+        assert xr.open_zarr(first_version).time.size == 3
+        assert sorted(os.listdir(latest_dir)) == sorted(
+            [
+                "202301011215.zarr.zip",
+                os.path.basename(first_version),
+                os.path.basename(utils.resolve_latest_store(store)),
+                "latest.zarr.json",
+            ]
+        )
+        assert utils.check_both_final_files_exists(save_dir, incremental=True) is False
+
+        # Older versions are removed at the next rewrite
+        os.remove(files[3])
+        add_timestep("2023-01-01T12:05")
+        assert list(collate().time.dt.minute.values) == [5]
+        assert not os.path.exists(first_version)
+
+
+def test_collate_files_into_latest():
+    with tempfile.TemporaryDirectory() as save_dir:
+        latest_dir = utils.get_latest_subdir_path(save_dir, mkdir=True)
+        for time in ["2023-01-01T12:10", "2023-01-01T12:00", "2023-01-01T12:05"]:
+            name = f"{pd.Timestamp(time).strftime('%Y%m%d%H%M')}.zarr.zip"
+            for prefix in ["", "hrv_"]:
+                utils.save_to_zarr_to_backend(
+                    _timestep_dataset(time), f"{latest_dir}/{prefix}{name}"
+                )
+
+        # Ordered from the filenames, in the chunks of the files
+        files = sorted(os.listdir(latest_dir), reverse=True)[:3]
+        dataset = utils._open_timestep_files([f"{latest_dir}/{f}" for f in files], "local")
+        assert list(dataset.time.dt.minute.values) == [0, 5, 10]
+        assert dataset["data"].chunks[0] == (1, 1, 1)
+
+        utils.collate_files_into_latest(save_dir, backend="local", max_memory_mb=0.01)
+        for name in ["latest.zarr.zip", "hrv_latest.zarr.zip"]:
+            dataset = xr.open_dataset(f"zip::{latest_dir}/{name}", engine="zarr", chunks={})
+            assert dataset["data"].chunks[0] == (1, 1, 1)
+            assert list(dataset["data"].isel(y_geostationary=0, x_geostationary=0, variable=0)) == [
+                0,
+                5,
+                10,
+            ]
+
+
+class RecordingFileSystem(AsyncFileSystem):
+    """Async filesystem recording the keywords of its bulk copies and deletes"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    async def _copy(
+        self, path1, path2, recursive=False, on_error=None, maxdepth=None, batch_size=None, **kwargs
+    ):
+        self.calls.append(("copy", len(path1), {"batch_size": batch_size, **kwargs}))
+
+
+class RecordingGCSFileSystem(RecordingFileSystem):
+    """Takes the same `rm` keywords as gcsfs"""
+
+    protocol = ("gs", "gcs")
+
+    async def _rm(self, path, recursive=False, maxdepth=None, batchsize=20):
+        self.calls.append(("rm", len(path), {"batchsize": batchsize}))
+
+
+class RecordingS3FileSystem(RecordingFileSystem):
+    """Takes the same `rm` keywords as s3fs"""
+
+    protocol = ("s3", "s3a")
+
+    async def _rm(self, path, recursive=False, **kwargs):
+        self.calls.append(("rm", len(path), kwargs))
+
+
+@pytest.mark.parametrize(
+    "filesystem_class, rm_kwargs",
+    [
+        (RecordingGCSFileSystem, {"batchsize": utils.HOUSEKEEPING_BATCH_SIZE}),
+        (RecordingS3FileSystem, {}),
+    ],
+)
+def test_move_files_on_async_filesystems(filesystem_class, rm_kwargs):
+    filesystem = filesystem_class(skip_instance_cache=True)
+    moves = {
+        "bucket/a.zarr.zip": "bucket/latest/a.zarr.zip",
+        "bucket/b.zarr.zip": "bucket/latest/b.zarr.zip",
+    }
+    utils._move_files(filesystem, moves)
+    assert filesystem.calls == [
+        ("copy", 2, {"batch_size": utils.HOUSEKEEPING_BATCH_SIZE}),
+        ("rm", 2, rm_kwargs),
+    ]
+
+
+def test_move_older_files_to_different_location():
+    with tempfile.TemporaryDirectory() as local_dir:
+        for save_dir in [local_dir, "memory://satip-test-housekeeping"]:
+            filesystem = fsspec.open(save_dir).fs
+            latest_dir = utils.get_latest_subdir_path(save_dir, mkdir=True)
+            for filename in [
+                f"{save_dir}/202301011200.zarr.zip",  # new, moved into latest
+                f"{save_dir}/hrv_202301011200.zarr.zip",
+                f"{save_dir}/202212251200.zarr.zip",  # over 2 days old, removed
+                f"{save_dir}/202301011100.zarr.zip",  # old, stays
+                f"{latest_dir}/202301011000.zarr.zip",  # old, moved out of latest
+                f"{latest_dir}/202301011205.zarr.zip",  # new, stays
+                f"{latest_dir}/latest.zarr.zip",
+                f"{save_dir}/notes.zarr.zip",  # no time, stays
+            ]:
+                filesystem.pipe(filename, b"data")
+
+            utils.move_older_files_to_different_location(
+                save_dir, history_time=pd.Timestamp("2023-01-01 11:30", tz="UTC")
+            )
+
+            names = lambda path: sorted(f.split("/")[-1] for f in filesystem.glob(path))  # noqa
+            assert names(f"{save_dir}/*.zarr.zip") == [
+                "202301011000.zarr.zip",
+                "202301011100.zarr.zip",
+                "notes.zarr.zip",
+            ]
+            assert names(f"{latest_dir}/*.zarr.zip") == [
+                "202301011200.zarr.zip",
+                "202301011205.zarr.zip",
+                "hrv_202301011200.zarr.zip",
+                "latest.zarr.zip",
+            ]